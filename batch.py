@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Base directory configuration (allow 'python batch.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+# Estate Defaults (Override via AFARA_BATCH_PROCESSES / AFARA_BATCH_SSH_BUDGET)
+DEFAULT_PROCESSES = 4
+DEFAULT_SSH_BUDGET = 32     # SSH sessions open at once across every project process
+SCHEDULE_EXTENSIONS = (".xlsx", ".xlsm")
+
+def find_schedules(folder):
+    """Project schedules in a directory (Excel lock files '~$...' skipped), sorted by name."""
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(SCHEDULE_EXTENSIONS) and not name.startswith("~$"))
+
+def project_env(stem, workers, ssh_share):
+    """
+    Per-project driver state and limits. Sites reuse the same private IP
+    ranges, so fingerprints, latency, port counters and backups keyed by IP
+    must not be shared between schedules.
+    """
+    state = os.path.join(BASE_DIR, "cache", "projects", stem)
+    return {
+        "AFARA_FINGERPRINT_PATH": os.path.join(state, "fingerprints.json"),
+        "AFARA_LATENCY_PATH": os.path.join(state, "latency.json"),
+        "AFARA_PORT_COUNTERS_PATH": os.path.join(state, "port_counters.json"),
+        "AFARA_SITE_PROBE_PATH": os.path.join(state, "site_probes.json"),
+        "AFARA_TRACE_EXPORT": os.path.join(state, "spans.jsonl"),
+        "AFARA_SSH_DEBUG_LOG": os.path.join(state, "ssh_debug.log"),
+        "AFARA_BACKUP_DIR": os.path.join(BASE_DIR, "backups", stem),
+        "AFARA_METRICS_DB": "off",      # No live loop in batch mode
+        "AFARA_MAX_WORKERS": str(workers),
+        "AFARA_SSH_LIMIT": str(ssh_share),
+        "AFARA_SSH_POOL_MAX": str(ssh_share),
+    }
+
+def _row(job, **fields):
+    """Estate summary row for one project."""
+    row = {"project": job["stem"], "schedule": job["schedule"], "log": job["log"], "report": None,
+           "ref_number": None, "devices": 0, "pass": 0, "fail": 0, "seconds": 0.0, "failures": [], "error": None}
+    row.update(fields)
+    return row
+
+def _failures(report_data, limit):
+    """First 'limit' failed devices of a finished run: [(name, ip, error)]."""
+    failed = []
+    for entries in report_data.get('groups', {}).values():
+        for entry in entries or []:
+            if entry and not entry.get('status_bool'):
+                failed.append((entry.get('name'), entry.get('ip'), str(entry.get('error') or 'Offline')[:40]))
+                if len(failed) >= limit: return failed
+    return failed
+
+def run_project(job):
+    """
+    Worker process: audits one schedule with its own orchestrator and report.
+    Console output goes to the project's log; returns the summary row.
+    """
+    os.environ.update(job["env"])
+    os.chdir(BASE_DIR)
+    started = time.perf_counter()
+    row = _row(job)
+    orchestrator = None
+
+    with open(job["log"], "w", buffering=1) as log:
+        sys.stdout = sys.stderr = log
+        try:
+            # Imported here so each process loads drivers after its environment is set
+            from core.loader import load_project_topology
+            from core.orchestrator import CommissioningOrchestrator
+            from core.plan import compile_plans
+
+            project_meta, devices = load_project_topology(job["yaml"], excel_path=job["schedule"])
+            row["ref_number"] = project_meta.get('ref_number')
+            if not devices:
+                row["error"] = "No devices in schedule"
+                return row
+
+            orchestrator = CommissioningOrchestrator(project_meta, devices, plans=compile_plans(devices),
+                                                     audit_depth=job["depth"])
+            orchestrator.report_filename = job["report"]
+            orchestrator.run_full_sequence()
+
+            row.update(devices=orchestrator.stats['total'], report=orchestrator.report_path,
+                       failures=_failures(orchestrator.report_data, job["max_failures"]))
+            row["pass"], row["fail"] = orchestrator.stats['pass'], orchestrator.stats['fail']
+        except Exception as e:
+            print(f"\n[ERROR] Batch run crashed: {e}")
+            row["error"] = str(e)[:200]
+        finally:
+            # Spooled report groups stay readable until the failure tally is taken
+            if orchestrator: orchestrator.close()
+            row["seconds"] = round(time.perf_counter() - started, 1)
+            sys.stdout.flush()
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    return row
+
+def print_summary(rows, wall):
+    """Consolidated estate table (one line per project, failed devices listed below)."""
+    total = sum(r["devices"] for r in rows)
+    passed = sum(r["pass"] for r in rows)
+    print("\n" + "="*50)
+    print("   ESTATE SUMMARY")
+    print("="*50)
+    print(f"   {'PROJECT':<28} | {'DEVICES':>7} | {'PASS':>5} | {'FAIL':>5} | {'TIME':>7} | RESULT")
+    print("   " + "-"*80)
+    for r in rows:
+        result = f"[ERROR] {r['error']}" if r["error"] else os.path.basename(r["report"] or "no report")
+        print(f"   {r['project'][:28]:<28} | {r['devices']:>7} | {r['pass']:>5} | {r['fail']:>5} | "
+              f"{r['seconds']:>6.0f}s | {result}")
+    print("   " + "-"*80)
+    print(f"   {'ESTATE':<28} | {total:>7} | {passed:>5} | {total - passed:>5} | {wall:>6.0f}s | "
+          f"{sum(1 for r in rows if r['error'])} project(s) crashed")
+
+    failing = [r for r in rows if r["failures"]]
+    if failing:
+        print("\n   FAILED DEVICES")
+        for r in failing:
+            for name, ip, error in r["failures"]:
+                print(f"   - {r['project'][:20]:<20} {str(name)[:25]:<25} {str(ip):<15} {error}")
+            if r["fail"] > len(r["failures"]):
+                print(f"   - {r['project'][:20]:<20} ... {r['fail'] - len(r['failures'])} more (see {r['log']})")
+    print("="*50 + "\n")
+
+def main():
+    """
+    Estate batch mode: audits every project schedule in a directory, one
+    worker process per project (each with its own orchestrator, driver state
+    and PDF report), then writes a consolidated estate summary.
+    """
+    parser = argparse.ArgumentParser(description="Afara estate batch audit")
+    parser.add_argument("schedules", help="Directory of project schedules (.xlsx)")
+    parser.add_argument("--yaml", default=os.path.join(BASE_DIR, 'templates', 'project_demo.yaml'))
+    parser.add_argument("--processes", type=int, default=int(os.getenv("AFARA_BATCH_PROCESSES", DEFAULT_PROCESSES)),
+                        help="Projects audited in parallel")
+    parser.add_argument("--ssh-budget", type=int, default=int(os.getenv("AFARA_BATCH_SSH_BUDGET", DEFAULT_SSH_BUDGET)),
+                        help="Total SSH sessions across all project processes")
+    parser.add_argument("--workers", type=int, help="Audit threads per project (default: AFARA_MAX_WORKERS or 16)")
+    parser.add_argument("--depth", default=os.getenv("AFARA_AUDIT_DEPTH"), help="heartbeat | standard | deep")
+    parser.add_argument("--out", help="Output folder under reports/ (default: batch_<timestamp>)")
+    parser.add_argument("--max-failures", type=int, default=10, help="Failed devices listed per project")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.schedules):
+        print(f"[ERROR] Not a directory: {args.schedules}")
+        sys.exit(1)
+    schedules = find_schedules(args.schedules)
+    if not schedules:
+        print(f"[ERROR] No project schedules (.xlsx) in {args.schedules}")
+        sys.exit(1)
+
+    # Each process gets an equal share of the SSH budget (never below one session)
+    processes = max(1, min(args.processes, len(schedules)))
+    ssh_share = max(1, args.ssh_budget // processes)
+    workers = args.workers or int(os.getenv("AFARA_MAX_WORKERS", 16))
+
+    out_name = args.out or f"batch_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}"
+    out_dir = os.path.join(BASE_DIR, "reports", out_name)
+    os.makedirs(out_dir, exist_ok=True)
+
+    jobs = []
+    for path in schedules:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        jobs.append({
+            "stem": stem,
+            "schedule": os.path.abspath(path),
+            "yaml": args.yaml,
+            "depth": args.depth,
+            "report": f"{out_name}/{stem}.pdf",
+            "log": os.path.join(out_dir, f"{stem}.log"),
+            "max_failures": args.max_failures,
+            "env": project_env(stem, workers, ssh_share),
+        })
+
+    print(f"[INFO] Auditing {len(jobs)} projects, {processes} at a time "
+          f"({ssh_share} SSH sessions each, {processes * ssh_share} max)")
+    print(f"[INFO] Logs and reports: {out_dir}\n")
+
+    started = time.perf_counter()
+    rows = []
+    # Fresh interpreter per project (one single-process pool each): driver
+    # singletons (pools, caches) never leak between sites
+    context = multiprocessing.get_context("spawn")
+    queued = list(jobs)
+    running = {}   # future -> (job, pool)
+    try:
+        while queued or running:
+            while queued and len(running) < processes:
+                job = queued.pop(0)
+                pool = ProcessPoolExecutor(max_workers=1, mp_context=context)
+                running[pool.submit(run_project, job)] = (job, pool)
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                job, pool = running.pop(future)
+                try:
+                    row = future.result()
+                except Exception as e:
+                    # Worker died (killed, out of memory): keep the estate summary going
+                    row = _row(job, error=f"Worker failed: {e}"[:200])
+                pool.shutdown(wait=True)
+                rows.append(row)
+                status = "[ERROR]" if row["error"] else "[DONE]"
+                print(f"   {status:<7} {row['project']:<28} {row['pass']}/{row['devices']} passed in {row['seconds']:.0f}s")
+    except KeyboardInterrupt:
+        print("\n\n[STOP] Batch aborted by user.")
+        for _, pool in running.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        return
+
+    wall = time.perf_counter() - started
+    rows.sort(key=lambda r: r["project"])
+    print_summary(rows, wall)
+
+    summary_path = os.path.join(out_dir, "estate_summary.json")
+    with open(summary_path, "w") as f:
+        json.dump({"generated": datetime.datetime.now().isoformat(timespec="seconds"), "wall_s": round(wall, 1),
+                   "processes": processes, "ssh_budget": processes * ssh_share, "projects": rows}, f, indent=2)
+    print(f"[INFO] Estate summary written to {summary_path}")
+
+if __name__ == "__main__":
+    main()
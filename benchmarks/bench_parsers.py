@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+
+# Base directory configuration (allow 'python benchmarks/bench_parsers.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from drivers.parsers import TemplateIndex
+from drivers.port_counters import parse_interface_counters
+
+DEFAULT_CORPUS = os.path.join(BASE_DIR, "benchmarks", "corpus")
+
+# Parser platform -> commands the drivers send (what a corpus should contain)
+COMMANDS = {
+    "cisco_ios": ["show version", "show vlan brief", "show interfaces", "show power inline",
+                  "show ip interface brief", "show ip arp"],
+    "cisco_s300": ["show version", "show system", "show inventory", "show vlan brief", "show interfaces"],
+    "crestron": ["ver", "uptime", "ipconfig /all", "reportcresnet", "autodiscover query table"],
+    "draytek": ["sys version", "sys iface", "ip route status"],
+}
+
+# Netmiko device types for --record (the drivers' own choices)
+DEVICE_TYPES = {"cisco_ios": "cisco_ios", "cisco_s300": "cisco_s300",
+                "crestron": "generic_termserver", "draytek": "generic_termserver"}
+
+# The drivers' hand-rolled regexes before the parsing layer (baseline column)
+def _legacy_version(text):
+    return (re.search(r"Processor board ID\s+(\w+)", text, re.IGNORECASE),
+            re.search(r"Version\s+([0-9a-zA-Z\.\(\)\-]+)", text, re.IGNORECASE),
+            re.search(r"uptime is (.*)", text, re.IGNORECASE))
+
+LEGACY = {
+    "show version": _legacy_version,
+    "show vlan brief": lambda text: re.findall(r"^(\d+)\s+", text, re.MULTILINE),
+    "show interfaces": parse_interface_counters,
+    "show ip interface brief": lambda text: re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", text),
+    "show ip arp": lambda text: re.search(r"([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4})", text),
+    "ip route status": lambda text: re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", text),
+    "reportcresnet": lambda text: re.findall(r"^(\d{2}|[0-9A-F]{2})\s+:\s+(.+)", text, re.MULTILINE),
+    "autodiscover query table": lambda text: [l.split(":") for l in text.splitlines() if ":" in l],
+}
+
+# ==================================================
+# CORPUS (benchmarks/corpus/<platform>/<command_words>.txt)
+# ==================================================
+def corpus_path(corpus, platform, command):
+    name = re.sub(r"[^\w.-]+", "_", command).strip("_")
+    return os.path.join(corpus, platform, f"{name}.txt")
+
+def load_corpus(corpus):
+    """[(platform, command, text)] for every recorded output on disk."""
+    samples = []
+    for platform, commands in COMMANDS.items():
+        for command in commands:
+            path = corpus_path(corpus, platform, command)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    samples.append((platform, command, f.read()))
+    return samples
+
+def save_sample(corpus, platform, command, text):
+    path = corpus_path(corpus, platform, command)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+def record(corpus, host, platform, username, password):
+    """Captures the driver command set from a live device into the corpus."""
+    from netmiko import ConnectHandler
+    conn = ConnectHandler(device_type=DEVICE_TYPES[platform], host=host, username=username,
+                          password=password, secret=password, conn_timeout=15)
+    try:
+        if platform.startswith("cisco"):
+            try: conn.enable()
+            except Exception: pass
+        for command in COMMANDS[platform]:
+            sent = f"{command} {host}" if command == "show ip arp" else command
+            try:
+                out = conn.send_command_timing(sent, read_timeout=30)
+            except Exception as e:
+                print(f"[WARN] {host} '{sent}': {e}")
+                continue
+            print(f"[INFO] Recorded {save_sample(corpus, platform, command, out)} ({len(out)} chars)")
+    finally:
+        conn.disconnect()
+
+def seed_from_simulator(corpus):
+    """Synthetic corpus from the simulator platforms (for runs without real captures)."""
+    from simulator.platforms import CiscoIOS, CiscoSMB, CiscoRouter, Crestron, Draytek, Identity
+    sources = {"cisco_ios": [CiscoIOS, CiscoRouter], "cisco_s300": [CiscoSMB],
+               "crestron": [Crestron], "draytek": [Draytek]}
+    for platform, classes in sources.items():
+        for command in COMMANDS[platform]:
+            for cls in classes:
+                sim = cls(Identity("10.0.0.1", 1))
+                out = sim.handle(f"{command} 10.0.0.1" if command == "show ip arp" else command)
+                if out and out != sim.invalid:
+                    save_sample(corpus, platform, command, out.replace("\r\n", "\n"))
+                    break
+
+# ==================================================
+# MEASUREMENT
+# ==================================================
+def per_call(fn, runs):
+    """Median seconds of one call over 'runs' calls."""
+    samples = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return statistics.median(samples)
+
+def measure(samples, runs, ntc_runs):
+    """One row per sample: cached template vs. legacy regex vs. ntc_templates.parse_output (compiles per call)."""
+    cold = TemplateIndex()
+    t = time.perf_counter()
+    for platform, command, text in samples:
+        cold.parse(platform, command, text)
+    cold_s = time.perf_counter() - t
+
+    index = TemplateIndex()
+    for platform, command, text in samples:
+        index.parse(platform, command, text)   # warm: index loaded, templates compiled
+
+    rows = []
+    for platform, command, text in samples:
+        template = index.template_for(platform, command)
+        via_template = index.parse_template(platform, command, text)
+        records = index.parse(platform, command, text)
+        path = "template" if via_template else "fallback" if index.parse_fallback(platform, command, text) is not None \
+            else "none"
+        row = {"platform": platform, "command": command, "bytes": len(text), "template": template,
+               "path": path, "records": len(records),
+               "layer_ms": per_call(lambda: index.parse(platform, command, text), runs) * 1000}
+        legacy = LEGACY.get(command)
+        row["regex_ms"] = per_call(lambda: legacy(text), runs) * 1000 if legacy else None
+        row["ntc_ms"] = None
+        if template and ntc_runs:
+            from ntc_templates.parse import parse_output
+            def uncached():
+                try: parse_output(platform=platform, command=command, data=text)
+                except Exception: pass
+            row["ntc_ms"] = per_call(uncached, ntc_runs) * 1000
+        rows.append(row)
+    return cold_s, cold.load_seconds, rows
+
+def main():
+    """
+    Benchmarks the structured parsing layer against a corpus of recorded CLI
+    outputs: cached TextFSM templates vs. the drivers' legacy regexes vs.
+    ntc_templates' parse_output (template file re-read and compiled per call).
+    """
+    parser = argparse.ArgumentParser(description="Afara CLI parser benchmark")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Recorded outputs (<platform>/<command>.txt)")
+    parser.add_argument("--record", metavar="HOST", help="Capture the driver commands from a live device")
+    parser.add_argument("--platform", choices=sorted(COMMANDS), help="Platform of --record HOST")
+    parser.add_argument("--username", default=os.getenv("SWITCH_USER"))
+    parser.add_argument("--password", default=os.getenv("SWITCH_PASS"))
+    parser.add_argument("--seed-simulator", action="store_true", help="Fill the corpus from the simulator platforms")
+    parser.add_argument("--runs", type=int, default=200, help="Calls per sample (median reported)")
+    parser.add_argument("--ntc-runs", type=int, default=3, help="Calls per sample for parse_output (0 = skip)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.platform: parser.error("--record needs --platform")
+        record(args.corpus, args.record, args.platform, args.username, args.password)
+        return
+    if args.seed_simulator:
+        seed_from_simulator(args.corpus)
+        print(f"[INFO] Simulator corpus written to {args.corpus}")
+
+    samples = load_corpus(args.corpus)
+    if not samples:
+        print(f"[ERROR] No recorded outputs in {args.corpus} (use --record HOST --platform P, or --seed-simulator)")
+        sys.exit(1)
+
+    cold_s, index_s, rows = measure(samples, args.runs, args.ntc_runs)
+
+    fmt = lambda ms: f"{ms:>8.3f}" if ms is not None else f"{'-':>8}"
+    print(f"{'PLATFORM':<11} | {'COMMAND':<25} | {'PATH':<8} | {'RECS':>5} | {'LAYER ms':>8} | "
+          f"{'REGEX ms':>8} | {'NTC ms':>8}")
+    print("-" * 93)
+    for r in rows:
+        print(f"{r['platform']:<11} | {r['command']:<25} | {r['path']:<8} | {r['records']:>5} | "
+              f"{fmt(r['layer_ms'])} | {fmt(r['regex_ms'])} | {fmt(r['ntc_ms'])}")
+    total = sum(len(text) for _, _, text in samples)
+    layer_s = sum(r['layer_ms'] for r in rows) / 1000
+    print(f"\n[INFO] {len(rows)} samples, {total / 1024:.1f}KB: cold start {cold_s * 1000:.0f}ms "
+          f"(index {index_s * 1000:.0f}ms), warm pass {layer_s * 1000:.2f}ms "
+          f"({total / 1024 / 1024 / layer_s if layer_s else 0:.1f}MB/s)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "cold_s": cold_s, "index_s": index_s, "results": rows},
+                      f, indent=2)
+        print(f"\n[INFO] Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
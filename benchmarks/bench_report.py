@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+# Base directory configuration (allow 'python benchmarks/bench_report.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from core.reporter import build_report, REPORT_SECTIONS
+from core.report_spool import ReportSpool
+
+def synthetic_entry(i, group, rng):
+    """One report entry shaped like a real {**dev, **res} merge."""
+    online = rng.random() > 0.1
+    entry = {
+        'name': f"{group}-device-{i:05d}",
+        'ip': f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+        'driver': 'cisco_switch' if group == 'Network' else 'gude_pdu' if group == 'Power' else 'ping_driver',
+        'group': group.lower(),
+        'location': {'floor': f"L{i % 12}", 'room': f"Room {i % 40}"},
+        'status_bool': online,
+        'mac': f"00:11:22:{(i >> 16) & 255:02x}:{(i >> 8) & 255:02x}:{i & 255:02x}",
+        'serial': f"SN{i:08d}",
+        'firmware': "15.2(7)E4",
+        'extra_info': '---',
+    }
+    if group == 'Network':
+        entry['vlans'] = [str(v) for v in range(1, rng.randint(2, 30))]
+        entry['port_errors'] = [f"Gi1/0/{p} (CRC:{rng.randint(1, 99)}|In:0)" for p in range(rng.randint(0, 2))]
+        entry['extra_info'] = f"{rng.randint(0, 100)}% ({rng.randint(0, 370)}/370)"
+    elif group == 'Power':
+        amps = round(rng.uniform(0.5, 16.0), 1)
+        entry['power_metrics'] = f"230V / {amps}A ({int(230 * amps)}W)"
+        entry['port_status'] = [f"Port {p}: {'ON' if rng.random() > 0.2 else 'OFF'}" for p in range(1, 9)]
+        entry['extra_info'] = entry['power_metrics']
+    return entry
+
+def build_report_data(count, spooled, seed=7):
+    rng = random.Random(seed)
+    groups = [key for _, key in REPORT_SECTIONS]
+    spool = ReportSpool() if spooled else None
+    report_data = {
+        "env": {'location': 'Bench', 'temp': '21.0°C', 'humidity': '45.0%'},
+        "isp": {'isp_name': 'Bench', 'download_mbps': 100},
+        "groups": {}
+    }
+    buckets = {g: [] for g in groups}
+    for i in range(count):
+        group = groups[i % len(groups)]
+        entry = synthetic_entry(i, group, rng)
+        if spool: spool.add(group, i, entry)
+        else: buckets[group].append(entry)
+    for g in groups:
+        report_data["groups"][g] = spool.group(g) if spool else buckets[g]
+    return report_data, spool
+
+def render(count, spooled, out_dir):
+    started = time.perf_counter()
+    report_data, spool = build_report_data(count, spooled)
+    built = time.perf_counter()
+
+    cwd = os.getcwd()
+    os.chdir(out_dir)
+    try:
+        path = build_report({'ref_number': f'BENCH-{count}'}, report_data, f"bench_{count}_{'spool' if spooled else 'memory'}.pdf")
+    finally:
+        os.chdir(cwd)
+    finished = time.perf_counter()
+    if spool: spool.close()
+    return built - started, finished - built, os.path.join(out_dir, path)
+
+def run_once(count, spooled, out_dir, heap=True):
+    """Timed pass, then (optionally) a tracemalloc pass for peak heap (tracing skews timings)."""
+    collect_s, render_s, path = render(count, spooled, out_dir)
+    peak = None
+    if heap:
+        tracemalloc.start()
+        render(count, spooled, out_dir)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "devices": count,
+        "mode": "spool" if spooled else "memory",
+        "collect_s": round(collect_s, 3),
+        "render_s": round(render_s, 3),
+        "devices_per_s": round(count / max(render_s, 1e-9), 1),
+        "peak_mb": round(peak / 1_048_576, 1) if peak is not None else None,
+        "pdf_kb": round(os.path.getsize(path) / 1024, 1)
+    }
+
+def main():
+    """
+    Renders commissioning reports for synthetic estates (in-memory lists vs.
+    on-disk spool) and prints wall time and peak Python heap per size.
+    """
+    parser = argparse.ArgumentParser(description="Afara PDF report benchmark")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--modes", default="memory,spool")
+    parser.add_argument("--no-heap", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'DEVICES':>8} | {'MODE':<6} | {'COLLECT':>8} | {'RENDER':>8} | {'PEAK HEAP':>10} | PDF")
+    print("-" * 65)
+    with tempfile.TemporaryDirectory(prefix="afara_bench_") as out_dir:
+        for count in [int(s) for s in args.sizes.split(",")]:
+            for mode in args.modes.split(","):
+                r = run_once(count, mode == "spool", out_dir, heap=not args.no_heap)
+                results.append(r)
+                peak = f"{r['peak_mb']:>8.1f}MB" if r['peak_mb'] is not None else f"{'-':>10}"
+                print(f"{r['devices']:>8} | {r['mode']:<6} | {r['collect_s']:>7.2f}s | {r['render_s']:>7.2f}s | "
+                      f"{peak} | {r['pdf_kb']:.0f}KB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"\n[INFO] Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Base directory configuration (allow 'python benchmarks/bench_startup.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points and the heavy transports we never want imported at load time
+ENTRY_POINTS = ["main", "core.orchestrator", "core.monitor", "core.loader", "core.reporter"]
+HEAVY_MODULES = ["netmiko", "paramiko", "textfsm", "ntc_templates", "speedtest",
+                 "requests", "getmac", "fpdf", "pandas", "openpyxl"]
+
+PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def cold_import(module):
+    """Imports one module in a fresh interpreter (no warm sys.modules). Returns seconds + heavy deps."""
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": (out.stderr.strip().splitlines() or ["unknown"])[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def top_imports(module, limit):
+    """Slowest cumulative imports reported by 'python -X importtime'."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=BASE_DIR, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        if "." not in name and name not in (module, "site"): rows.append((int(cumulative), name.strip()))
+    return [{"module": n, "ms": round(us / 1000, 1)} for us, n in sorted(rows, reverse=True)[:limit]]
+
+def main():
+    """
+    Measures the cold import cost of each Afara entry point.
+    Each sample runs in a new interpreter; the median is reported with the heavy
+    transports that ended up loaded (should be empty for the entry points).
+    """
+    parser = argparse.ArgumentParser(description="Afara startup-time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports to list per entry point")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'ENTRY POINT':<20} | {'MEDIAN':>9} | {'MIN':>9} | HEAVY IMPORTS")
+    print("-" * 80)
+    for module in args.modules:
+        samples = [cold_import(module) for _ in range(args.runs)]
+        errors = [s["error"] for s in samples if "error" in s]
+        if errors:
+            print(f"{module:<20} | {'ERROR':>9} | {'':>9} | {errors[0]}")
+            results[module] = {"error": errors[0]}
+            continue
+
+        times = [s["seconds"] for s in samples]
+        heavy = samples[-1]["heavy"]
+        results[module] = {
+            "median_ms": round(statistics.median(times) * 1000, 1),
+            "min_ms": round(min(times) * 1000, 1),
+            "heavy": heavy,
+            "top": top_imports(module, args.top)
+        }
+        r = results[module]
+        print(f"{module:<20} | {r['median_ms']:>7.1f}ms | {r['min_ms']:>7.1f}ms | {', '.join(heavy) or '-'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "runs": args.runs, "results": results}, f, indent=2)
+        print(f"\n[INFO] Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+
+# Base directory configuration (allow 'python benchmarks/bench_throughput.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+PLATFORMS = ("cisco_ios", "cisco_smb", "cisco_router", "crestron", "draytek", "gude")
+DEFAULT_MIX = "cisco_ios=40,cisco_smb=10,cisco_router=5,crestron=20,draytek=5,gude=20"
+
+def parse_mix(raw):
+    """Parses 'cisco_ios=40,gude=20' into {'cisco_ios': 40.0, 'gude': 20.0}."""
+    mix = {}
+    for item in (raw or "").split(","):
+        if "=" not in item: continue
+        key, val = item.split("=", 1)
+        key = key.strip().lower()
+        if key not in PLATFORMS:
+            raise ValueError(f"Unknown platform '{key}' (choose from {', '.join(PLATFORMS)})")
+        mix[key] = max(0.0, float(val))
+    if not sum(mix.values()):
+        raise ValueError("Driver mix is empty")
+    return mix
+
+def split_counts(total, mix):
+    """Largest-remainder split of 'total' devices across the mix weights."""
+    weight = sum(mix.values())
+    exact = {k: total * v / weight for k, v in mix.items()}
+    counts = {k: int(v) for k, v in exact.items()}
+    for k in sorted(exact, key=lambda k: exact[k] - counts[k], reverse=True)[:total - sum(counts.values())]:
+        counts[k] += 1
+    return counts
+
+def percentile(values, pct):
+    if not values: return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+class ResourceSampler:
+    """Samples RSS and open file descriptors of this process (Linux /proc) on a thread."""
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_fds = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _sample(self):
+        try:
+            with open("/proc/self/statm") as f:
+                self.peak_rss = max(self.peak_rss, int(f.read().split()[1]) * self._page)
+            self.peak_fds = max(self.peak_fds, len(os.listdir("/proc/self/fd")))
+        except (OSError, ValueError, IndexError):
+            pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if not self.peak_rss:
+            # No /proc (macOS): lifetime peak from getrusage (bytes on macOS)
+            import resource
+            self.peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# ==================================================
+# FARM (Own process: simulators must not share Afara's GIL)
+# ==================================================
+def start_farm(counts, args, schedule_path):
+    cmd = [sys.executable, "-u", "-m", "simulator", "--base", args.base, "--seed", str(args.seed),
+           "--latency", str(args.latency), "--jitter", str(args.jitter),
+           "--offline-pct", str(args.offline_pct), "--timeout-pct", str(args.timeout_pct),
+           "--hang", str(args.hang), "--schedule", schedule_path]
+    for name, count in counts.items():
+        if count: cmd += [f"--{name.replace('_', '-')}", str(count)]
+
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout:
+        if "Schedule written" in line: break
+        if "[ERROR]" in line:
+            proc.kill()
+            raise RuntimeError(line.strip())
+    else:
+        raise RuntimeError("Simulator farm exited before it was ready")
+    # Keep draining so the farm never blocks on a full pipe
+    threading.Thread(target=lambda: [None for _ in proc.stdout], daemon=True).start()
+    return proc
+
+def stop_farm(proc):
+    proc.send_signal(signal.SIGINT)
+    try: proc.wait(15)
+    except subprocess.TimeoutExpired: proc.kill()
+
+def schedule_devices(path):
+    """Farm inventory -> device dicts shaped like core.loader output."""
+    with open(path) as f:
+        rows = json.load(f)
+    return [{
+        'name': r['Name'], 'ip': r['IP'], 'driver': r['Driver'], 'group': r['Group'].lower(),
+        'username': r['Username'], 'password': r['Password'], 'critical': False,
+        'location': {'floor': r['Floor'], 'room': r['Room']},
+    } for r in rows]
+
+# ==================================================
+# WORKER (One fresh interpreter per size)
+# ==================================================
+def _isolate(state_dir):
+    """Cold, private driver state (fingerprints, latency, backups) for every run."""
+    os.environ.update({
+        "AFARA_LATENCY_PATH": os.path.join(state_dir, "latency.json"),
+        "AFARA_FINGERPRINT_PATH": os.path.join(state_dir, "fingerprints.json"),
+        "AFARA_BACKUP_DIR": os.path.join(state_dir, "backups"),
+        "AFARA_SITE_PROBE_PATH": os.path.join(state_dir, "site_probes.json"),
+        "AFARA_METRICS_DB": "off",
+    })
+
+def phase_result(phase, devices, wall, latencies, sampler, passed, **extra):
+    return {
+        "phase": phase,
+        "devices": devices,
+        "wall_s": round(wall, 3),
+        "devices_per_s": round(len(latencies) / max(wall, 1e-9), 2),
+        "p50_s": round(percentile(latencies, 50) or 0, 4),
+        "p99_s": round(percentile(latencies, 99) or 0, 4),
+        "max_s": round(max(latencies, default=0), 4),
+        "pass": passed,
+        "fail": len(latencies) - passed,
+        "peak_rss_mb": round(sampler.peak_rss / 1_048_576, 1),
+        "peak_fds": sampler.peak_fds,
+        **extra,
+    }
+
+def run_commission(devices, config):
+    from core.orchestrator import CommissioningOrchestrator
+    from core.plan import compile_plans
+    from core.site_probes import SiteProbe
+
+    latencies = []
+    lock = threading.Lock()
+
+    class BenchOrchestrator(CommissioningOrchestrator):
+        def _start_site_probes(self):
+            # WAN speed test / geolocation are site-level, not part of device throughput
+            env = {'location': 'Benchmark', 'temp': 'N/A', 'humidity': 'N/A', 'noise': 'N/A'}
+            isp = {'status': 'FAIL', 'error': 'Skipped (benchmark)'}
+            self._site_probes = {
+                'env': SiteProbe("env", lambda: env, env, ttl=0, cacheable=lambda d: False).start(),
+                'isp': SiteProbe("isp", lambda: isp, isp, ttl=0, cacheable=lambda d: False).start(),
+            }
+
+        def _audit_device_logic(self, dev, depth=None):
+            started = time.perf_counter()
+            res = super()._audit_device_logic(dev, depth)
+            with lock: latencies.append(time.perf_counter() - started)
+            return res
+
+        def _generate_pdf_report(self):
+            if config["report"]: super()._generate_pdf_report()
+
+    with ResourceSampler() as sampler:
+        started = time.perf_counter()
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            orchestrator = BenchOrchestrator({'name': 'Throughput Bench', 'ref_number': 'BENCH'}, devices,
+                                             plans=compile_plans(devices), audit_depth=config["depth"])
+            orchestrator.run_full_sequence()
+            orchestrator.close()
+        wall = time.perf_counter() - started
+    return phase_result("commission", len(devices), wall, latencies, sampler, orchestrator.stats['pass'],
+                        depth=orchestrator.audit_depth)
+
+def run_monitor(devices, config):
+    from core.monitor import MonitorScheduler
+    from core.plan import compile_plans
+    from main import make_probe
+
+    latencies, cycles = [], []
+    passed = [0]
+
+    def on_result(device, res, duration):
+        latencies.append(duration)
+        if res.get('online'): passed[0] += 1
+
+    def on_cycle(stats):
+        if stats is not None:
+            cycles.append({"probes": stats.probes, "late": stats.late, "overruns": stats.overruns,
+                           "skipped": stats.skipped, "max_lateness_s": round(stats.max_lateness, 3)})
+
+    scheduler = MonitorScheduler(devices, make_probe(compile_plans(devices)), on_result, on_cycle=on_cycle,
+                                 interval=config["interval"], intervals={})
+    with ResourceSampler() as sampler:
+        started = time.perf_counter()
+        scheduler.run(max_cycles=config["cycles"])
+        wall = time.perf_counter() - started
+    return phase_result("monitor", len(devices), wall, latencies, sampler, passed[0],
+                        target_per_s=round(len(devices) / config["interval"], 2),
+                        late=sum(c["late"] for c in cycles), overruns=sum(c["overruns"] for c in cycles),
+                        skipped=sum(c["skipped"] for c in cycles),
+                        max_lateness_s=max((c["max_lateness_s"] for c in cycles), default=0))
+
+def worker(config_path):
+    with open(config_path) as f:
+        config = json.load(f)
+    _isolate(config["state_dir"])
+    os.chdir(config["state_dir"])   # PDF + ssh_debug.log land in the scratch dir
+
+    devices = schedule_devices(config["schedule"])
+    results = []
+    if "commission" in config["phases"]:
+        results.append(run_commission(devices, config))
+    if "monitor" in config["phases"] and config["cycles"] > 0:
+        results.append(run_monitor(devices, config))
+    print(json.dumps(results))
+
+def run_size(size, mix, args, scratch):
+    counts = split_counts(size, mix)
+    schedule = os.path.join(scratch, f"farm_{size}.json")
+    state_dir = tempfile.mkdtemp(prefix=f"state_{size}_", dir=scratch)
+    config_path = os.path.join(scratch, f"config_{size}.json")
+    with open(config_path, "w") as f:
+        json.dump({"schedule": schedule, "state_dir": state_dir, "phases": args.phases.split(","),
+                   "depth": args.depth, "interval": args.interval, "cycles": args.cycles,
+                   "report": not args.no_report}, f)
+
+    farm = start_farm(counts, args, schedule)
+    try:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", config_path],
+                             cwd=BASE_DIR, capture_output=True, text=True)
+    finally:
+        stop_farm(farm)
+    if out.returncode != 0:
+        raise RuntimeError((out.stderr.strip().splitlines() or ["worker failed"])[-1])
+    results = json.loads(out.stdout.strip().splitlines()[-1])
+    for r in results: r["mix"] = counts
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline_path):
+    """Prints throughput / p99 deltas against a previous --json file."""
+    with open(baseline_path) as f:
+        baseline = {(r["devices"], r["phase"]): r for r in json.load(f)["results"]}
+    print(f"\n{'DEVICES':>8} | {'PHASE':<10} | {'DEV/S':>16} | {'P99':>18}")
+    print("-" * 62)
+    for r in results:
+        old = baseline.get((r["devices"], r["phase"]))
+        if not old: continue
+        rate = (r["devices_per_s"] - old["devices_per_s"]) / max(old["devices_per_s"], 1e-9) * 100
+        p99 = (r["p99_s"] - old["p99_s"]) / max(old["p99_s"], 1e-9) * 100
+        print(f"{r['devices']:>8} | {r['phase']:<10} | {r['devices_per_s']:>8.1f} ({rate:+5.1f}%) | "
+              f"{r['p99_s']:>8.3f}s ({p99:+5.1f}%)")
+
+def main():
+    """
+    End-to-end throughput of the commissioning sequence and the live monitor
+    against a local simulator farm (python -m simulator), per estate size.
+
+    Each size gets a fresh farm and a fresh worker interpreter with cold
+    driver caches, so peak RSS / open fds belong to that size alone.
+    Binding the simulators to ports 22/80 needs root (or CAP_NET_BIND_SERVICE).
+    """
+    parser = argparse.ArgumentParser(description="Afara end-to-end throughput benchmark")
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Driver distribution (platform=weight,...)")
+    parser.add_argument("--offline-pct", type=float, default=10.0, help="Devices with nothing listening")
+    parser.add_argument("--timeout-pct", type=float, default=0.0, help="Devices that accept but never answer")
+    parser.add_argument("--hang", type=float, default=30.0, help="How long timeout devices hold the socket")
+    parser.add_argument("--latency", type=float, default=20.0, help="Simulated per-command latency (ms)")
+    parser.add_argument("--jitter", type=float, default=5.0, help="Latency jitter (ms)")
+    parser.add_argument("--phases", default="commission,monitor")
+    parser.add_argument("--depth", default=None, help="Commissioning depth (default: AFARA_AUDIT_DEPTH / deep)")
+    parser.add_argument("--interval", type=float, default=10.0, help="Monitor interval (s)")
+    parser.add_argument("--cycles", type=int, default=3, help="Monitor reporting windows to run")
+    parser.add_argument("--no-report", action="store_true", help="Skip the PDF at the end of commissioning")
+    parser.add_argument("--base", default="127.30.0.1", help="First simulator loopback address")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Previous --json results to diff against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker)
+        return
+
+    mix = parse_mix(args.mix)
+    results = []
+    print(f"{'DEVICES':>8} | {'PHASE':<10} | {'WALL':>8} | {'DEV/S':>7} | {'P50':>7} | {'P99':>7} | "
+          f"{'PASS/FAIL':>9} | {'PEAK RSS':>9} | FDS")
+    print("-" * 95)
+    with tempfile.TemporaryDirectory(prefix="afara_throughput_") as scratch:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            try:
+                rows = run_size(size, mix, args, scratch)
+            except RuntimeError as e:
+                print(f"[ERROR] {size} devices: {e}")
+                continue
+            for r in rows:
+                results.append(r)
+                print(f"{r['devices']:>8} | {r['phase']:<10} | {r['wall_s']:>7.2f}s | {r['devices_per_s']:>7.1f} | "
+                      f"{r['p50_s']:>6.3f}s | {r['p99_s']:>6.3f}s | {r['pass']:>4}/{r['fail']:<4} | "
+                      f"{r['peak_rss_mb']:>7.1f}MB | {r['peak_fds']}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "commit": _git_commit(),
+                       "config": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "worker")},
+                       "results": results}, f, indent=2)
+        print(f"\n[INFO] Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
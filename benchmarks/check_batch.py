@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import shutil
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+
+# Base directory configuration (allow 'python benchmarks/check_batch.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEM = "check_batch_spool"
+
+def start_farm(args, schedule_path):
+    cmd = [sys.executable, "-u", "-m", "simulator", "--base", args.base, "--seed", str(args.seed),
+           "--cisco-ios", str(args.switches), "--gude", str(args.pdus),
+           "--offline-pct", str(args.offline_pct), "--schedule", schedule_path]
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout:
+        if "Schedule written" in line: break
+        if "[ERROR]" in line:
+            proc.kill()
+            raise RuntimeError(line.strip())
+    else:
+        raise RuntimeError("Simulator farm exited before it was ready")
+    threading.Thread(target=lambda: [None for _ in proc.stdout], daemon=True).start()
+    return proc
+
+def stop_farm(proc):
+    proc.send_signal(signal.SIGINT)
+    try: proc.wait(15)
+    except subprocess.TimeoutExpired: proc.kill()
+
+def main():
+    """
+    End-to-end check of batch mode against a spooled project: one simulator
+    farm schedule is audited by batch.py with AFARA_REPORT_SPOOL=0, so every
+    report group lives on disk, and the estate summary must still carry the
+    device count, report path and failure tally. Needs root for ports 22/80.
+    """
+    parser = argparse.ArgumentParser(description="Afara batch / report spool check")
+    parser.add_argument("--switches", type=int, default=6)
+    parser.add_argument("--pdus", type=int, default=4)
+    parser.add_argument("--offline-pct", type=float, default=30.0, help="Devices with nothing listening")
+    parser.add_argument("--base", default="127.40.0.1", help="First simulator loopback address")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="Keep the batch output under reports/")
+    args = parser.parse_args()
+
+    out_dir = os.path.join(BASE_DIR, "reports", STEM)
+    problems = []
+    with tempfile.TemporaryDirectory(prefix="afara_check_batch_") as scratch:
+        schedules = os.path.join(scratch, "schedules")
+        os.makedirs(schedules)
+        farm = start_farm(args, os.path.join(schedules, f"{STEM}.xlsx"))
+        try:
+            env = dict(os.environ, AFARA_REPORT_SPOOL="0")
+            out = subprocess.run([sys.executable, "batch.py", schedules, "--out", STEM, "--depth", "heartbeat",
+                                  "--processes", "1"], cwd=BASE_DIR, env=env, capture_output=True, text=True)
+        finally:
+            stop_farm(farm)
+
+    try:
+        if out.returncode != 0:
+            problems.append(f"batch.py exited {out.returncode}: {(out.stderr.strip().splitlines() or ['?'])[-1]}")
+        else:
+            with open(os.path.join(out_dir, "estate_summary.json")) as f:
+                row = json.load(f)["projects"][0]
+            expected = args.switches + args.pdus
+            if row["error"]: problems.append(f"project crashed: {row['error']}")
+            if row["devices"] != expected: problems.append(f"{row['devices']} devices recorded, expected {expected}")
+            if not row["report"]: problems.append("no report path")
+            if row["pass"] + row["fail"] != row["devices"]: problems.append("pass/fail do not add up")
+            if len(row["failures"]) != min(row["fail"], 10): problems.append(
+                f"{len(row['failures'])} failures listed for {row['fail']} failed devices")
+            print(f"[INFO] {row['devices']} devices, {row['pass']} pass / {row['fail']} fail, "
+                  f"{len(row['failures'])} failures listed, report {row['report']}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(out_dir, ignore_errors=True)
+            shutil.rmtree(os.path.join(BASE_DIR, "cache", "projects", STEM), ignore_errors=True)
+            shutil.rmtree(os.path.join(BASE_DIR, "backups", STEM), ignore_errors=True)
+
+    for p in problems:
+        print(f"[ERROR] {p}")
+    if problems:
+        sys.exit(1)
+    print("[SUCCESS] Batch run of a spooled project completed with its summary intact.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+Distributed Commissioning (Coordinator / Probe Workers).
+
+One Afara host cannot reach every VLAN on a large site, and a single host
+caps audit throughput. In distributed mode the orchestrator becomes a
+coordinator: each audit group is split into shards (by subnet or floor)
+and handed to probe workers connected over a local socket. Workers run the
+normal driver audits (_audit_device_logic) and stream every result back,
+so the coordinator fills the same report_data and the PDF path is unchanged.
+
+Protocol: 4-byte big-endian length + UTF-8 JSON object per frame.
+    worker -> {"type": "hello", "name", "serves": [...], "token", "protocol"}
+    coord  -> {"type": "shard", "shard", "group", "depth", "devices": [[index, device], ...]}
+    worker -> {"type": "result", "shard", "index", "result"}   (one per device, as completed)
+    worker -> {"type": "done", "shard"}
+    coord  -> {"type": "bye"}
+
+Shards carry device credentials: bind to loopback/Unix sockets or a
+management VLAN, and set AFARA_CLUSTER_TOKEN on both ends. A coordinator
+on any other address refuses to start without a token.
+"""
+import argparse
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from core.orchestrator import CommissioningOrchestrator
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.Distributed")
+
+# Cluster Defaults (Override via AFARA_COORDINATOR / AFARA_SHARD_BY / AFARA_SHARD_PREFIX / AFARA_SHARD_MAX)
+DEFAULT_ADDRESS = "127.0.0.1:7700"
+DEFAULT_SHARD_BY = "subnet"
+DEFAULT_SHARD_PREFIX = 24
+DEFAULT_SHARD_MAX = 64        # Devices per shard (large subnets are split for balancing)
+DEFAULT_WORKER_WAIT = 30.0    # Seconds to wait for a worker before auditing a shard locally
+PROTOCOL = 1
+
+# ==================================================
+# 1. FRAMING (length-prefixed JSON)
+# ==================================================
+_HEADER = struct.Struct("!I")
+MAX_FRAME = 16 * 1024 * 1024
+
+def send_msg(sock, msg):
+    body = json.dumps(msg, default=str).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+def recv_msg(sock):
+    """Next message, or None once the peer has closed the connection."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    body = _recv_exact(sock, length)
+    return None if body is None else json.loads(body.decode("utf-8"))
+
+def parse_address(address):
+    """'host:port' -> (AF_INET, (host, port)); 'unix:/path' -> (AF_UNIX, path)."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+def is_local(address):
+    """True for Unix sockets and loopback addresses (hostnames other than 'localhost' are not trusted)."""
+    family, addr = parse_address(address)
+    if family == socket.AF_UNIX or addr[0] == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(addr[0]).is_loopback
+    except ValueError:
+        return False
+
+# ==================================================
+# 2. SHARDING
+# ==================================================
+def shard_key(device, by=DEFAULT_SHARD_BY, prefix=DEFAULT_SHARD_PREFIX):
+    """Subnet ('10.20.30.0/24') or floor name a device belongs to."""
+    if by == "floor":
+        return str((device.get('location') or {}).get('floor') or "Unassigned")
+    try:
+        return str(ipaddress.ip_network(f"{device['ip']}/{prefix}", strict=False))
+    except (KeyError, ValueError):
+        return "unrouted"
+
+def shard_devices(devices, by=DEFAULT_SHARD_BY, prefix=DEFAULT_SHARD_PREFIX, max_size=DEFAULT_SHARD_MAX):
+    """[(key, [index, ...]), ...] in schedule order; keys over max_size are split into chunks."""
+    groups = {}
+    for idx, dev in enumerate(devices):
+        groups.setdefault(shard_key(dev, by, prefix), []).append(idx)
+    shards = []
+    for key, indices in groups.items():
+        for start in range(0, len(indices), max(1, max_size)):
+            shards.append((key, indices[start:start + max_size]))
+    return shards
+
+def serves(patterns, key, by=DEFAULT_SHARD_BY):
+    """True if a worker's --serve list covers a shard key (an empty list serves everything)."""
+    if not patterns:
+        return True
+    if by == "floor":
+        return any(str(p).strip().lower() == key.lower() for p in patterns)
+    try:
+        net = ipaddress.ip_network(key)
+    except ValueError:
+        return False
+    for pattern in patterns:
+        try:
+            if net.subnet_of(ipaddress.ip_network(pattern, strict=False)): return True
+        except (ValueError, TypeError):
+            continue
+    return False
+
+# ==================================================
+# 3. COORDINATOR
+# ==================================================
+class _WorkerLink:
+    """One connected probe worker (reads on its own thread, events go to the coordinator queue)."""
+    def __init__(self, sock, peer):
+        self.sock = sock
+        self.peer = peer
+        self.name = str(peer)
+        self.serves = []
+        self.shard = None           # (key, {pending indices}) while busy
+        self._send_lock = threading.Lock()
+
+    def send(self, msg):
+        with self._send_lock:
+            send_msg(self.sock, msg)
+
+    def close(self):
+        try: self.sock.close()
+        except OSError: pass
+
+class Coordinator:
+    """Accepts probe workers and runs shards on them, pulling results from one event queue."""
+    def __init__(self, address=None, token=None, shard_by=None, worker_wait=None):
+        self.address = address or os.getenv("AFARA_COORDINATOR", DEFAULT_ADDRESS)
+        self.token = token if token is not None else os.getenv("AFARA_CLUSTER_TOKEN", "")
+        self.shard_by = shard_by or os.getenv("AFARA_SHARD_BY", DEFAULT_SHARD_BY)
+        self.worker_wait = float(worker_wait if worker_wait is not None
+                                 else os.getenv("AFARA_WORKER_WAIT", DEFAULT_WORKER_WAIT))
+        self.links = []
+        self._events = queue.Queue()
+        self._server = None
+        self._stop = threading.Event()
+        self._idle_since = time.monotonic()   # Grace period for workers runs from here
+
+    def start(self):
+        # Shards carry device credentials: never serve them unauthenticated off this host
+        if not self.token and not is_local(self.address):
+            raise ValueError(f"AFARA_CLUSTER_TOKEN must be set to listen on {self.address} (non-loopback)")
+        family, addr = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.unlink(addr)
+        self._server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(addr)
+        self._server.listen(64)
+        threading.Thread(target=self._accept_loop, name="afara-coordinator", daemon=True).start()
+        self._idle_since = time.monotonic()
+        return self
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, peer = self._server.accept()
+            except OSError:
+                return
+            link = _WorkerLink(sock, peer)
+            threading.Thread(target=self._read_loop, args=(link,), name="afara-coordinator-link",
+                             daemon=True).start()
+
+    def _read_loop(self, link):
+        try:
+            hello = recv_msg(link.sock)
+            if not hello or hello.get("type") != "hello":
+                link.close()
+                return
+            if self.token and not hmac.compare_digest(str(hello.get("token", "")), self.token):
+                logger.warning(f"Rejected worker {link.peer}: bad cluster token")
+                link.close()
+                return
+            link.name = str(hello.get("name") or link.peer)
+            link.serves = list(hello.get("serves") or [])
+            self._events.put(("ready", link, None))
+            while True:
+                msg = recv_msg(link.sock)
+                if msg is None:
+                    break
+                self._events.put((msg.get("type"), link, msg))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Worker {link.name} connection error: {e}")
+        self._events.put(("lost", link, None))
+
+    def _next_shard(self, link, pending):
+        """First pending shard this worker serves; catch-all workers skip shards a connected specialist serves."""
+        for i, (key, indices) in enumerate(pending):
+            if not serves(link.serves, key, self.shard_by):
+                continue
+            if not link.serves and any(l.serves and serves(l.serves, key, self.shard_by) for l in self.links):
+                continue
+            del pending[i]
+            return key, indices
+        return None
+
+    def run(self, devices, shards, depth, group, local):
+        """
+        Runs shards on the connected workers, yielding (index, result, worker name) as they
+        stream in. Shards no worker can take within worker_wait go to local(indices), which
+        yields (index, result); those come out with worker None.
+        """
+        pending = deque(shards)
+        remaining = sum(len(indices) for _, indices in shards)
+
+        while remaining:
+            # Hand work to every idle worker
+            for link in list(self.links):
+                if link.shard is not None: continue
+                shard = self._next_shard(link, pending)
+                if shard is None: continue
+                key, indices = shard
+                try:
+                    link.send({"type": "shard", "shard": key, "group": group, "depth": depth,
+                               "devices": [[idx, devices[idx]] for idx in indices]})
+                    link.shard = (key, set(indices))
+                    print(f"   [INFO] Shard {key} ({len(indices)} devices) -> {link.name}")
+                except OSError:
+                    pending.appendleft(shard)
+                    self._drop(link, pending)
+
+            busy = any(link.shard is not None for link in self.links)
+            if pending and not busy and time.monotonic() - self._idle_since > self.worker_wait:
+                # Nobody connected can take these: audit them from this host (one local pool)
+                keys = sorted({key for key, _ in pending})
+                indices = sorted(idx for _, shard in pending for idx in shard)
+                pending.clear()
+                print(f"   [WARN] No worker for {', '.join(keys)}; auditing {len(indices)} devices locally")
+                for idx, res in local(indices):
+                    remaining -= 1
+                    yield idx, res, None
+                continue
+
+            try:
+                kind, link, msg = self._events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if kind == "ready":
+                self.links.append(link)
+                print(f"   [INFO] Probe worker '{link.name}' joined"
+                      + (f" (serves {', '.join(link.serves)})" if link.serves else ""))
+            elif kind == "result":
+                idx = msg.get("index")
+                if link.shard and idx in link.shard[1]:
+                    link.shard[1].discard(idx)
+                    remaining -= 1
+                    yield idx, msg.get("result") or {}, link.name
+            elif kind == "done":
+                if link.shard and link.shard[1]:
+                    # Worker skipped devices (cancelled audits): run them again
+                    pending.append((link.shard[0], sorted(link.shard[1])))
+                link.shard = None
+                self._idle_since = time.monotonic()
+            elif kind == "lost":
+                self._drop(link, pending)
+                self._idle_since = time.monotonic()
+
+    def _drop(self, link, pending):
+        """Forgets a worker; its unfinished devices go back to the front of the queue."""
+        if link in self.links:
+            self.links.remove(link)
+            print(f"   [WARN] Probe worker '{link.name}' disconnected")
+        if link.shard and link.shard[1]:
+            pending.appendleft((link.shard[0], sorted(link.shard[1])))
+        link.shard = None
+        link.close()
+
+    def stop(self):
+        self._stop.set()
+        for link in list(self.links):
+            try: link.send({"type": "bye"})
+            except OSError: pass
+            link.close()
+        self.links = []
+        if self._server is not None:
+            try: self._server.close()
+            except OSError: pass
+            family, addr = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(addr):
+                os.unlink(addr)
+
+class DistributedOrchestrator(CommissioningOrchestrator):
+    """
+    Commissioning with the audits sharded across probe workers.
+    Everything else (site probes, report_data, PDF) runs on this host as usual.
+    """
+    def __init__(self, project_meta, devices, address=None, shard_by=None, worker_wait=None, **kwargs):
+        super().__init__(project_meta, devices, **kwargs)
+        self.coordinator = Coordinator(address, shard_by=shard_by, worker_wait=worker_wait)
+        self.shard_prefix = int(os.getenv("AFARA_SHARD_PREFIX", DEFAULT_SHARD_PREFIX))
+        self.shard_max = int(os.getenv("AFARA_SHARD_MAX", DEFAULT_SHARD_MAX))
+        self._group = None
+
+    def run_full_sequence(self):
+        self.coordinator.start()
+        print(f"[INFO] Coordinator listening on {self.coordinator.address} "
+              f"(shards by {self.coordinator.shard_by})")
+        try:
+            return super().run_full_sequence()
+        finally:
+            self.coordinator.stop()
+
+    def _audit_group(self, group_name, devices):
+        self._group = group_name
+        super()._audit_group(group_name, devices)
+
+    def _dispatch(self, devices):
+        shards = shard_devices(devices, self.coordinator.shard_by, self.shard_prefix, self.shard_max)
+
+        def local(indices):
+            subset = [devices[i] for i in indices]
+            for sub_idx, res in CommissioningOrchestrator._dispatch(self, subset):
+                yield indices[sub_idx], res
+
+        for idx, res, worker in self.coordinator.run(devices, shards, self.audit_depth, self._group, local):
+            if worker is not None:
+                # Local audits print their own rows; remote ones are printed as they arrive
+                plan = self.plans.get(id(devices[idx]))
+                self._print_result_row(devices[idx], res, plan.mode if plan else "(REMOTE)")
+            yield idx, res
+
+# ==================================================
+# 4. PROBE WORKER
+# ==================================================
+class ProbeWorker:
+    """Connects to a coordinator, audits the shards it is sent and streams each result back."""
+    def __init__(self, address, serves=None, name=None, token=None, max_workers=None, retry=60.0):
+        self.address = address
+        self.serves = serves or []
+        self.name = name or socket.gethostname()
+        self.token = token if token is not None else os.getenv("AFARA_CLUSTER_TOKEN", "")
+        self.max_workers = max_workers
+        self.retry = retry
+
+    def _connect(self):
+        family, addr = parse_address(self.address)
+        deadline = time.monotonic() + self.retry
+        while True:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            try:
+                sock.connect(addr)
+                return sock
+            except OSError:
+                sock.close()
+                if time.monotonic() > deadline: raise
+                time.sleep(1.0)
+
+    def run(self):
+        sock = self._connect()
+        send_msg(sock, {"type": "hello", "name": self.name, "serves": self.serves, "token": self.token,
+                        "protocol": PROTOCOL})
+        print(f"[INFO] Probe worker '{self.name}' connected to {self.address}")
+        try:
+            while True:
+                msg = recv_msg(sock)
+                if msg is None or msg.get("type") == "bye":
+                    break
+                if msg.get("type") == "shard":
+                    self._audit_shard(sock, msg)
+        finally:
+            sock.close()
+            self._save_state()
+        print("[INFO] Coordinator finished; probe worker exiting.")
+
+    def _audit_shard(self, sock, msg):
+        indices = [idx for idx, _ in msg["devices"]]
+        devices = [dev for _, dev in msg["devices"]]
+        print(f"\n[INFO] Shard {msg['shard']} ({len(devices)} devices, {msg.get('group')})")
+        orchestrator = CommissioningOrchestrator({}, devices, max_workers=self.max_workers, audit_depth=msg.get("depth"))
+        orchestrator._print_table_header()
+        results = orchestrator._dispatch(devices)
+        try:
+            for sub_idx, res in results:
+                if res is None: continue
+                send_msg(sock, {"type": "result", "shard": msg["shard"], "index": indices[sub_idx], "result": res})
+        except OSError:
+            # Coordinator gone: stop the queued audits
+            orchestrator._cancel.set()
+            results.close()
+            raise
+        finally:
+            # Large shards get a report spool (temp file) the worker never reads
+            orchestrator.close()
+        send_msg(sock, {"type": "done", "shard": msg["shard"]})
+        self._save_state()
+
+    def _save_state(self):
+        from drivers.fingerprint import get_fingerprints
+        from drivers.latency import get_latency
+        from drivers.port_counters import get_port_counters
+        get_fingerprints().save()
+        get_latency().save()
+        get_port_counters().save()
+
+def main():
+    """
+    Probe worker entry point:
+        python -m core.distributed --connect 10.0.0.5:7700 --serve 10.20.0.0/16
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Afara probe worker")
+    parser.add_argument("--connect", default=os.getenv("AFARA_COORDINATOR", DEFAULT_ADDRESS),
+                        help="Coordinator address (host:port or unix:/path)")
+    parser.add_argument("--serve", action="append", default=[],
+                        help="Subnet (CIDR) or floor this worker can reach; repeatable (default: any)")
+    parser.add_argument("--name", help="Worker name shown by the coordinator (default: hostname)")
+    parser.add_argument("--workers", type=int, help="Audit threads (default: AFARA_MAX_WORKERS or 16)")
+    parser.add_argument("--retry", type=float, default=60.0, help="Seconds to keep retrying the connection")
+    args = parser.parse_args()
+
+    serves = [s.strip() for item in args.serve for s in item.split(",") if s.strip()]
+    try:
+        ProbeWorker(args.connect, serves, args.name, max_workers=args.workers, retry=args.retry).run()
+    except KeyboardInterrupt:
+        print("\n[STOP] Probe worker stopped.")
+    except OSError as e:
+        print(f"[ERROR] Coordinator unreachable at {args.connect}: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
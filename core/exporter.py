@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.metrics_store import extract_metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_ADDRESS = "127.0.0.1"   # Device names/IPs are exposed: loopback unless widened
+
+# Sample name (core.metrics_store) -> (exposed name, type, help)
+DEVICE_METRICS = {
+    "up": ("afara_device_up", "gauge", "1 if the last live probe passed, else 0."),
+    "probe_seconds": ("afara_probe_duration_seconds", "gauge", "Duration of the last live probe."),
+    "poe_used_watts": ("afara_poe_used_watts", "gauge", "PoE power drawn (CiscoSwitch)."),
+    "poe_budget_watts": ("afara_poe_budget_watts", "gauge", "PoE power budget (CiscoSwitch)."),
+    "poe_utilization_pct": ("afara_poe_utilization_percent", "gauge", "PoE budget utilization (CiscoSwitch)."),
+    "pdu_volts": ("afara_pdu_volts", "gauge", "PDU input voltage (GudeAuditor)."),
+    "pdu_amps": ("afara_pdu_amps", "gauge", "PDU input current (GudeAuditor)."),
+    "uptime_seconds": ("afara_device_uptime_seconds", "gauge", "Device uptime reported by the probe."),
+    "crc_errors": ("afara_interface_crc_errors", "gauge", "Lifetime CRC error counter per interface."),
+    "input_errors": ("afara_interface_input_errors", "gauge", "Lifetime input error counter per interface."),
+}
+
+CYCLE_METRICS = (
+    ("afara_scan_cycle_duration_seconds", "Length of the last live-loop reporting window.", lambda s, now: now - s.started),
+    ("afara_scan_cycle_probes", "Probes completed in the last window.", lambda s, now: s.probes),
+    ("afara_scan_cycle_late", "Probes that started more than one interval late.", lambda s, now: s.late),
+    ("afara_scan_cycle_overruns", "Probes that outlived their own interval.", lambda s, now: s.overruns),
+    ("afara_scan_cycle_skipped", "Devices skipped ahead after falling a whole interval behind.", lambda s, now: s.skipped),
+    ("afara_scan_cycle_max_lateness_seconds", "Worst dispatch lateness in the last window.", lambda s, now: s.max_lateness),
+)
+
+# Rate limiter bucket field (drivers.rate_limit snapshot) -> (exposed name, type, help)
+RATE_LIMIT_METRICS = (
+    ("waiting", "afara_rate_limit_queue_depth", "gauge", "Probes currently waiting for a rate-limit token."),
+    ("peak", "afara_rate_limit_queue_peak", "gauge", "Deepest rate-limit queue in the last window."),
+    ("granted", "afara_rate_limit_probes_total", "counter", "Probes that passed the rate limiter."),
+    ("delayed", "afara_rate_limit_delayed_total", "counter", "Probes that had to wait for a token."),
+    ("wait_s", "afara_rate_limit_wait_seconds_total", "counter", "Time probes spent waiting for tokens."),
+)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(pairs):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class MetricsExporter:
+    """
+    Prometheus / OpenMetrics Text Exporter.
+
+    The live loop pushes each probe result into an in-memory snapshot
+    (update) and re-renders the exposition text once per cycle (render).
+    Scrapes only return the last rendered bytes: they never touch a device
+    and cost the same no matter how many scrapers there are. PoE and
+    interface-error series come from standard-depth switch probes (the live
+    loop's default for the cisco family).
+    """
+    def __init__(self, port, address=DEFAULT_ADDRESS):
+        self.port = port
+        self.address = address
+        self.logger = logging.getLogger("Afara.Exporter")
+        self._lock = threading.Lock()
+        self._snapshot = {}   # ip -> (labels, [(metric, value)], updated)
+        self._body = b""
+        self._server = None
+
+    def update(self, device, res, duration=None):
+        labels = (("device", device.get('name', device['ip'])), ("ip", device['ip']),
+                  ("group", device.get('group', '')), ("driver", device.get('driver', '')))
+        samples = extract_metrics(res, duration)
+        with self._lock:
+            self._snapshot[device['ip']] = (labels, samples, time.time())
+
+    def render(self, stats=None, limits=None):
+        """Builds the exposition text from the snapshot (called once per cycle)."""
+        with self._lock:
+            snapshot = list(self._snapshot.values())
+
+        families = {}
+        for labels, samples, _ in snapshot:
+            for metric, value in samples:
+                extra = ()
+                if "{" in metric:
+                    # Per-interface series: 'crc_errors{Gi1/0/1}'
+                    metric, iface = metric[:-1].split("{", 1)
+                    extra = (("interface", iface),)
+                if metric not in DEVICE_METRICS: continue
+                families.setdefault(metric, []).append(f"{DEVICE_METRICS[metric][0]}{_labels(labels + extra)} {value}")
+
+        lines = []
+        for metric, (name, kind, help_text) in DEVICE_METRICS.items():
+            if metric not in families: continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(families[metric])
+
+        if stats is not None:
+            now = time.monotonic()
+            for name, help_text, read in CYCLE_METRICS:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {round(read(stats, now), 4)}")
+
+        if limits:
+            for field, name, kind, help_text in RATE_LIMIT_METRICS:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for row in limits:
+                    lines.append(f"{name}{_labels((('subnet', row['subnet']), ('transport', row['transport'])))} "
+                                 f"{row[field]}")
+
+        lines.append("# HELP afara_exporter_render_timestamp_seconds When this text was rendered.")
+        lines.append("# TYPE afara_exporter_render_timestamp_seconds gauge")
+        lines.append(f"afara_exporter_render_timestamp_seconds {round(time.time(), 3)}")
+        self._body = ("\n".join(lines) + "\n").encode("utf-8")
+
+    def body(self):
+        return self._body
+
+    def start(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter.body()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="afara-exporter").start()
+        self.logger.info(f"Metrics exporter listening on {self.address}:{self.port}")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
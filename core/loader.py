@@ -1,69 +1,176 @@
 import os
-import yaml
-import pandas as pd
+import hashlib
+import pickle
 
-def load_project_topology(yaml_path):
-    # Default Defaults
-    project_meta = {
+# Compiled Topology Cache (Bump CACHE_FORMAT when the device dict shape changes)
+CACHE_FORMAT = 1
+
+def _default_meta():
+    return {
         'name': 'Project Afara', 'ref_number': 'REF-0000',
         'address': 'Unknown Address', 'engineer': 'Unassigned', 'mode': 'Onsite'
     }
-    
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) 
-    excel_path = os.path.join(base_dir, 'project_schedule.xlsx')
 
-    if not os.path.exists(excel_path):
-        return project_meta, []
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_cache(cache_path, excel_path):
+    """
+    Returns (project_meta, devices) if the cache matches the workbook, else None.
+    mtime + size is the fast path; if only the mtime moved (copied / touched
+    file) the content hash decides, so an unchanged schedule never re-parses,
+    and the entry is re-stamped so the next start is back on the fast path.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('format') != CACHE_FORMAT: return None
+
+        stat = os.stat(excel_path)
+        if cached['size'] != stat.st_size: return None
+        if cached['mtime_ns'] != stat.st_mtime_ns:
+            if cached['sha256'] != _file_sha256(excel_path): return None
+            _write_cache(cache_path, excel_path, cached['project_meta'], cached['devices'], cached['sha256'])
+        return cached['project_meta'], cached['devices']
+    except Exception:
+        return None
+
+def _write_cache(cache_path, excel_path, project_meta, devices, sha256=None):
+    try:
+        stat = os.stat(excel_path)
+        payload = {
+            'format': CACHE_FORMAT,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': sha256 or _file_sha256(excel_path),
+            'project_meta': project_meta,
+            'devices': devices
+        }
+        folder = os.path.dirname(cache_path)
+        if folder and not os.path.exists(folder): os.makedirs(folder)
+
+        # Same credentials as the schedule itself, so keep it owner-only
+        tmp = f"{cache_path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except Exception as e:
+        print(f"[WARN] Could not write topology cache: {e}")
+
+def _find_col(columns, names=(), contains=()):
+    return next((c for c in columns if c in names or any(n in c for n in contains)), None)
+
+def _parse_workbook(excel_path):
+    """
+    Returns (project_meta, devices, complete). 'complete' is False when a
+    sheet failed to read (locked / half-synced workbook) or no devices were
+    found; such a result is used for this run but never cached.
+    """
+    import pandas as pd
+
+    project_meta = _default_meta()
+    devices = []
+
+    # One workbook handle for both sheets (openpyxl only opens the file once)
+    try:
+        xls = pd.ExcelFile(excel_path)
+    except Exception as e:
+        print(f"[ERROR] Loader Error: {e}")
+        return project_meta, devices, False
+
+    complete = True
 
-    # 1. METADATA (Project Info Tab)
+    # 1. METADATA (Project Info Tab, optional)
     try:
-        meta_df = pd.read_excel(excel_path, sheet_name='Project Info', header=None)
-        for index, row in meta_df.iterrows():
-            key = str(row[0]).lower().strip()
-            val = str(row[1]).strip()
+        meta_df = xls.parse('Project Info', header=None)
+        for key, val in zip(meta_df[0].map(str), meta_df[1].map(str)):
+            key = key.lower().strip()
+            val = val.strip()
             if 'project name' in key: project_meta['name'] = val
             elif 'ref' in key: project_meta['ref_number'] = val
             elif 'address' in key: project_meta['address'] = val
             elif 'engineer' in key: project_meta['engineer'] = val
             elif 'mode' in key: project_meta['mode'] = val
-    except: pass
+    except Exception:
+        if 'Project Info' in xls.sheet_names: complete = False
 
     # 2. DEVICES (First Tab)
-    devices = []
     try:
-        df = pd.read_excel(excel_path, sheet_name=0)
+        df = xls.parse(0)
         df.columns = [str(c).strip().lower() for c in df.columns]
-        
-        for index, row in df.iterrows():
-            ip_col = next((c for c in df.columns if c in ['ip address', 'ip']), None)
-            if not ip_col or pd.isna(row[ip_col]): continue
-
-            name_col = next((c for c in df.columns if c in ['device name', 'name']), None)
-            driver_col = next((c for c in df.columns if c in ['driver', 'type']), None)
-            group_col = next((c for c in df.columns if c in ['group', 'category']), None)
-            
-            # --- LOCATION FIX ---
-            floor_col = next((c for c in df.columns if 'floor' in c), None)
-            room_col = next((c for c in df.columns if 'room' in c or 'area' in c), None)
-
-            raw_driver = str(row[driver_col]).strip() if driver_col else "ping_driver"
-            if raw_driver == 'nan': raw_driver = 'ping_driver'
-
-            dev = {
-                'name': str(row[name_col]) if name_col else "Unknown",
-                'ip': str(row[ip_col]).strip(),
-                'driver': raw_driver,
-                'group': str(row[group_col]).strip().lower() if group_col else "general",
-                'username': str(row.get('username', '')).strip(),
-                'password': str(row.get('password', '')).strip(),
+
+        # Columns are resolved once per sheet, not once per row
+        ip_col = _find_col(df.columns, names=('ip address', 'ip'))
+        if not ip_col: return project_meta, devices, False
+        name_col = _find_col(df.columns, names=('device name', 'name'))
+        driver_col = _find_col(df.columns, names=('driver', 'type'))
+        group_col = _find_col(df.columns, names=('group', 'category'))
+
+        # --- LOCATION FIX ---
+        floor_col = _find_col(df.columns, contains=('floor',))
+        room_col = _find_col(df.columns, contains=('room', 'area'))
+
+        df = df[df[ip_col].notna()]
+        rows = len(df)
+
+        def text(col, default):
+            return df[col].map(str) if col else pd.Series([default] * rows, index=df.index)
+
+        ips = text(ip_col, '').str.strip()
+        names = text(name_col, 'Unknown')
+        drivers = text(driver_col, 'ping_driver').str.strip().replace('nan', 'ping_driver')
+        groups = text(group_col, 'general').str.strip().str.lower()
+        users = text('username' if 'username' in df.columns else None, '').str.strip()
+        passwords = text('password' if 'password' in df.columns else None, '').str.strip()
+        floors = text(floor_col, 'Unknown')
+        rooms = text(room_col, 'Unknown')
+
+        for name, ip, driver, group, user, password, floor, room in zip(
+                names, ips, drivers, groups, users, passwords, floors, rooms):
+            devices.append({
+                'name': name,
+                'ip': ip,
+                'driver': driver,
+                'group': group,
+                'username': user,
+                'password': password,
                 'critical': False,
-                'location': {
-                    'floor': str(row[floor_col]) if floor_col else "Unknown",
-                    'room': str(row[room_col]) if room_col else "Unknown"
-                }
-            }
-            devices.append(dev)
+                'location': {'floor': floor, 'room': room}
+            })
     except Exception as e:
         print(f"[ERROR] Loader Error: {e}")
+        complete = False
+
+    return project_meta, devices, complete and bool(devices)
+
+def load_project_topology(yaml_path, excel_path=None):
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    excel_path = excel_path or os.path.join(base_dir, 'project_schedule.xlsx')
+
+    if not os.path.exists(excel_path):
+        return _default_meta(), []
+
+    cache_dir = os.getenv("AFARA_TOPOLOGY_CACHE", os.path.join(base_dir, 'cache'))
+    if cache_dir.lower() in ('0', 'off', 'none'):
+        return _parse_workbook(excel_path)[:2]
+
+    # One compiled file per workbook location
+    tag = hashlib.sha1(os.path.abspath(excel_path).encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(excel_path))[0]
+    cache_path = os.path.join(cache_dir, f"topology_{stem}_{tag}.pickle")
+
+    # 1. CACHE HIT (No pandas / openpyxl import at all)
+    cached = _read_cache(cache_path, excel_path)
+    if cached is not None:
+        return cached
 
-    return project_meta, devices
\ No newline at end of file
+    # 2. CACHE MISS (Parse once, then compile for the next start; partial reads are never cached)
+    project_meta, devices, complete = _parse_workbook(excel_path)
+    if complete:
+        _write_cache(cache_path, excel_path, project_meta, devices)
+    return project_meta, devices
@@ -0,0 +1,276 @@
+import atexit
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Store Defaults (Override via .env)
+DEFAULT_PATH = os.path.join("cache", "metrics.db")
+DEFAULT_BATCH = 500          # Samples buffered before a commit
+DEFAULT_FLUSH_SECONDS = 10   # ...or this long since the last commit
+
+# Retention per resolution (seconds)
+RETENTION = {
+    "raw": 2 * 86400,
+    "1m": 14 * 86400,
+    "1h": 400 * 86400,
+}
+ROLLUPS = {"1m": 60, "1h": 3600}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    UNIQUE (device, metric)
+);
+CREATE TABLE IF NOT EXISTS samples_raw (
+    series INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_raw_series_ts ON samples_raw (series, ts);
+CREATE TABLE IF NOT EXISTS samples_1m (
+    series INTEGER NOT NULL, bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL,
+    PRIMARY KEY (series, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS samples_1h (
+    series INTEGER NOT NULL, bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL, sum REAL NOT NULL, min REAL NOT NULL, max REAL NOT NULL,
+    PRIMARY KEY (series, bucket)
+) WITHOUT ROWID;
+"""
+
+# ==================================================
+# METRIC EXTRACTION (Driver result -> numeric samples)
+# ==================================================
+_NUMBER_RE = re.compile(r"([0-9]+(?:\.[0-9]+)?)")
+_VOLTS_AMPS_RE = re.compile(r"([0-9\.]+)\s*V\s*/\s*([0-9\.]+)\s*A")
+_PORT_ERROR_RE = re.compile(r"^(\S+) \(CRC:(\d+)\|In:(\d+)\)")
+_UPTIME_UNITS = (
+    (re.compile(r"(\d+)\s*(?:years?|y)\b"), 365 * 86400),
+    (re.compile(r"(\d+)\s*(?:weeks?|w)\b"), 7 * 86400),
+    (re.compile(r"(\d+)\s*(?:days?|d)\b"), 86400),
+    (re.compile(r"(\d+)\s*(?:hours?|h)\b"), 3600),
+    (re.compile(r"(\d+)\s*(?:minutes?|m)\b"), 60),
+)
+
+def _number(value):
+    """'12.5 W' / '43.1%' / 7 -> float, or None."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool): return float(value)
+    match = _NUMBER_RE.search(str(value or ""))
+    return float(match.group(1)) if match else None
+
+def parse_uptime(text):
+    """'3d 4h 5m' (Windows) or '1 year, 2 weeks, 3 days' (IOS) -> seconds, or None."""
+    text = str(text or "").lower()
+    total, found = 0, False
+    for pattern, seconds in _UPTIME_UNITS:
+        match = pattern.search(text)
+        if match:
+            total += int(match.group(1)) * seconds
+            found = True
+    return total if found else None
+
+def extract_metrics(res, duration=None):
+    """
+    Numeric samples from one normalized probe result: [(metric, value), ...].
+    Interface counters are keyed 'crc_errors{Gi1/0/1}' (one series per port).
+    """
+    samples = [("up", 1.0 if res.get('online') else 0.0)]
+    if duration is not None:
+        samples.append(("probe_seconds", round(duration, 4)))
+    if not res.get('online'):
+        return samples
+
+    # 1. PoE (CiscoSwitch)
+    poe = res.get('poe')
+    if isinstance(poe, dict) and poe.get('status') == 'Active':
+        for metric, key in (("poe_used_watts", "used"), ("poe_budget_watts", "budget"),
+                            ("poe_utilization_pct", "utilization")):
+            value = _number(poe.get(key))
+            if value is not None: samples.append((metric, value))
+
+    # 2. Input Power (GudeAuditor)
+    match = _VOLTS_AMPS_RE.search(str(res.get('power_metrics') or ""))
+    if match:
+        samples.append(("pdu_volts", float(match.group(1))))
+        samples.append(("pdu_amps", float(match.group(2))))
+
+    # 3. Interface Error Counters (CiscoSwitch: every port with errors, rising or not)
+    counters = res.get('port_counters')
+    if isinstance(counters, dict):
+        for iface, (crc, inputs) in counters.items():
+            samples.append((f"crc_errors{{{iface}}}", float(crc)))
+            samples.append((f"input_errors{{{iface}}}", float(inputs)))
+    else:
+        for entry in res.get('port_errors') or []:
+            match = _PORT_ERROR_RE.match(str(entry))
+            if match:
+                samples.append((f"crc_errors{{{match.group(1)}}}", float(match.group(2))))
+                samples.append((f"input_errors{{{match.group(1)}}}", float(match.group(3))))
+
+    # 4. Uptime (Windows / IOS)
+    uptime = parse_uptime(res.get('uptime'))
+    if uptime is not None:
+        samples.append(("uptime_seconds", float(uptime)))
+
+    return samples
+
+class MetricsStore:
+    """
+    Embedded Time-Series Store (SQLite, WAL mode).
+
+    Samples are buffered in memory and committed in batches (every
+    DEFAULT_BATCH samples or DEFAULT_FLUSH_SECONDS), with the 1-minute and
+    1-hour rollups (count/sum/min/max) upserted in the same transaction.
+    Retention is enforced per resolution, and range queries pick the
+    coarsest table that still gives enough points for the requested span.
+    """
+    def __init__(self, path=DEFAULT_PATH, batch_size=DEFAULT_BATCH, flush_seconds=DEFAULT_FLUSH_SECONDS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.logger = logging.getLogger("Afara.Metrics")
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder): os.makedirs(folder)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+        self._series = dict(((d, m), i) for i, d, m in self._db.execute("SELECT id, device, metric FROM series"))
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._last_prune = 0.0
+
+    def _series_id(self, device, metric):
+        key = (device, metric)
+        sid = self._series.get(key)
+        if sid is None:
+            self._db.execute("INSERT OR IGNORE INTO series (device, metric) VALUES (?, ?)", key)
+            sid = self._db.execute("SELECT id FROM series WHERE device = ? AND metric = ?", key).fetchone()[0]
+            self._series[key] = sid
+        return sid
+
+    # ==================================================
+    # WRITE PATH
+    # ==================================================
+    def record(self, device, metric, value, ts=None):
+        with self._lock:
+            self._buffer.append((device, metric, float(value), int(ts if ts is not None else time.time())))
+            due = len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_seconds
+        if due: self.flush()
+
+    def record_result(self, device, res, duration=None, ts=None):
+        """Records every numeric metric found in a live-loop result."""
+        ts = ts if ts is not None else time.time()
+        for metric, value in extract_metrics(res, duration):
+            self.record(device, metric, value, ts)
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not batch: return
+            try:
+                self._db.execute("BEGIN")
+                rows = [(self._series_id(d, m), ts, v) for d, m, v, ts in batch]
+                self._db.executemany("INSERT INTO samples_raw (series, ts, value) VALUES (?, ?, ?)", rows)
+                for table, width in ROLLUPS.items():
+                    self._db.executemany(
+                        f"INSERT INTO samples_{table} (series, bucket, count, sum, min, max) VALUES (?, ?, 1, ?, ?, ?) "
+                        f"ON CONFLICT (series, bucket) DO UPDATE SET count = count + 1, sum = sum + excluded.sum, "
+                        f"min = MIN(min, excluded.min), max = MAX(max, excluded.max)",
+                        [(sid, ts - ts % width, v, v, v) for sid, ts, v in rows])
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._db.execute("ROLLBACK")
+                self.logger.warning(f"Metrics batch of {len(batch)} dropped: {e}")
+
+            # Retention at most once an hour
+            if time.monotonic() - self._last_prune > 3600:
+                self._prune()
+
+    def _prune(self, now=None):
+        now = int(now if now is not None else time.time())
+        try:
+            self._db.execute("DELETE FROM samples_raw WHERE ts < ?", (now - RETENTION["raw"],))
+            for table in ROLLUPS:
+                self._db.execute(f"DELETE FROM samples_{table} WHERE bucket < ?", (now - RETENTION[table],))
+            self._last_prune = time.monotonic()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Metrics retention failed: {e}")
+
+    # ==================================================
+    # READ PATH
+    # ==================================================
+    def query(self, device, metric, start, end=None, resolution="auto", max_points=500):
+        """
+        Returns [(ts, avg, min, max), ...] for one series between start and end.
+        resolution: 'raw', '1m', '1h' or 'auto' (coarsest table with <= max_points rows).
+        """
+        end = end if end is not None else time.time()
+        if resolution == "auto":
+            span = end - start
+            if span / 60 > max_points: resolution = "1h"
+            elif span / DEFAULT_FLUSH_SECONDS > max_points: resolution = "1m"
+            else: resolution = "raw"
+
+        self.flush()
+        with self._lock:
+            sid = self._series.get((device, metric))
+            if sid is None: return []
+            if resolution == "raw":
+                rows = self._db.execute(
+                    "SELECT ts, value, value, value FROM samples_raw WHERE series = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                    (sid, int(start), int(end))).fetchall()
+            else:
+                rows = self._db.execute(
+                    f"SELECT bucket, sum / count, min, max FROM samples_{resolution} "
+                    f"WHERE series = ? AND bucket BETWEEN ? AND ? ORDER BY bucket",
+                    (sid, int(start) - int(start) % ROLLUPS[resolution], int(end))).fetchall()
+        return rows
+
+    def latest(self, device):
+        """{metric: (ts, value)} of the newest raw sample per metric for one device."""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT s.metric, r.ts, r.value FROM series s JOIN samples_raw r ON r.series = s.id "
+                "WHERE s.device = ? AND r.ts = (SELECT MAX(ts) FROM samples_raw WHERE series = s.id)",
+                (device,)).fetchall()
+        return {metric: (ts, value) for metric, ts, value in rows}
+
+    def metrics(self, device=None):
+        with self._lock:
+            if device is None:
+                return sorted(self._series)
+            return sorted(m for d, m in self._series if d == device)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            try: self._db.close()
+            except sqlite3.Error: pass
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_metrics_store():
+    """Returns the process-wide store, or None if AFARA_METRICS_DB is 'off'."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.getenv("AFARA_METRICS_DB", DEFAULT_PATH)
+            if path.lower() in ("", "0", "off", "none"):
+                return None
+            _store = MetricsStore(path)
+            atexit.register(_store.close)
+        return _store
@@ -0,0 +1,160 @@
+import heapq
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Scheduler Defaults (Override via .env)
+DEFAULT_INTERVAL = 15.0
+DEFAULT_JITTER = 0.1
+DEFAULT_PARALLEL = 16
+DEFAULT_INTERVALS = {"cisco_switch": 60.0}   # Standard-depth switch probes (PoE, port errors)
+
+def parse_intervals(raw):
+    """Parses 'network=30,gude=60' into {'network': 30.0, 'gude': 60.0}."""
+    intervals = {}
+    for item in (raw or "").split(","):
+        if "=" not in item: continue
+        key, val = item.split("=", 1)
+        try: intervals[key.strip().lower()] = max(1.0, float(val))
+        except ValueError: pass
+    return intervals
+
+class CycleStats:
+    """Counters for one reporting window of the live monitor."""
+    def __init__(self, started):
+        self.started = started
+        self.probes = 0
+        self.late = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self.busy_time = 0.0
+
+    @property
+    def behind(self):
+        return self.overruns > 0 or self.late > 0 or self.skipped > 0
+
+class MonitorScheduler:
+    """
+    Live Monitoring Scheduler.
+
+    Every device carries its own next-due time instead of being walked in a
+    serial loop. Due probes are dispatched to a bounded worker pool, the next
+    due time advances by the device interval (plus jitter to avoid bursts),
+    and any probe that cannot start on time is counted as late or overrun
+    rather than silently stretching the cycle.
+    """
+    def __init__(self, devices, probe, on_result, on_cycle=None,
+                 interval=None, intervals=None, jitter=None, max_parallel=None):
+        self.devices = devices
+        self.probe = probe
+        self.on_result = on_result
+        self.on_cycle = on_cycle
+        self.logger = logging.getLogger("Afara.Monitor")
+
+        self.interval = interval or float(os.getenv("AFARA_MONITOR_INTERVAL", DEFAULT_INTERVAL))
+        self.intervals = dict(DEFAULT_INTERVALS)
+        self.intervals.update(parse_intervals(os.getenv("AFARA_MONITOR_INTERVALS")))
+        self.intervals.update(intervals or {})
+        self.jitter = jitter if jitter is not None else float(os.getenv("AFARA_MONITOR_JITTER", DEFAULT_JITTER))
+        self.max_parallel = max_parallel or int(os.getenv("AFARA_MONITOR_PARALLEL", DEFAULT_PARALLEL))
+
+        self._queue = []
+        self._seq = 0
+        self._inflight = {}  # future -> (device index, due time, start time)
+
+    def interval_for(self, device):
+        """Resolves the probe interval: group override, then driver override, then default."""
+        group = str(device.get('group', '')).lower()
+        driver = str(device.get('driver', '')).lower()
+        for key, val in self.intervals.items():
+            if key in group: return val
+        for key, val in self.intervals.items():
+            if key in driver: return val
+        return self.interval
+
+    def _jittered(self, interval):
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _push(self, due, idx):
+        self._seq += 1
+        heapq.heappush(self._queue, (due, self._seq, idx))
+
+    def _reschedule(self, idx, due, now, stats):
+        interval = self.interval_for(self.devices[idx])
+        next_due = due + self._jittered(interval)
+        if next_due < now:
+            # Fell a whole interval behind: skip ahead instead of bursting to catch up
+            stats.skipped += 1
+            next_due = now + random.uniform(0, self.jitter * interval)
+        self._push(next_due, idx)
+
+    def run(self, max_cycles=None):
+        """Runs until interrupted (or for max_cycles reporting windows)."""
+        start = time.monotonic()
+        for idx, dev in enumerate(self.devices):
+            # Spread the first wave across the initial window
+            self._push(start + random.uniform(0, self.jitter * self.interval_for(dev)), idx)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="afara-monitor")
+        stats = CycleStats(start)
+        cycles = 0
+        if self.on_cycle: self.on_cycle(None)
+
+        try:
+            while True:
+                now = time.monotonic()
+
+                # 1. CLOSE REPORTING WINDOW
+                if now - stats.started >= self.interval:
+                    cycles += 1
+                    if self.on_cycle: self.on_cycle(stats)
+                    if max_cycles and cycles >= max_cycles: break
+                    stats = CycleStats(now)
+
+                # 2. DISPATCH DUE PROBES (Within Parallel Budget)
+                while self._queue and self._queue[0][0] <= now:
+                    if len(self._inflight) >= self.max_parallel:
+                        break
+                    due, _, idx = heapq.heappop(self._queue)
+                    lateness = now - due
+                    stats.max_lateness = max(stats.max_lateness, lateness)
+                    if lateness > self.interval_for(self.devices[idx]):
+                        stats.late += 1
+                    future = pool.submit(self.probe, self.devices[idx])
+                    self._inflight[future] = (idx, due, now)
+
+                # 3. COLLECT RESULTS UNTIL THE NEXT DEADLINE
+                window_end = stats.started + self.interval
+                if self._queue and len(self._inflight) < self.max_parallel:
+                    next_due = self._queue[0][0]
+                else:
+                    # Budget saturated: the next event is a completion, not a due time
+                    next_due = window_end
+                timeout = max(0.0, min(next_due, window_end) - time.monotonic())
+
+                if self._inflight:
+                    done, _ = wait(list(self._inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    done = ()
+                    time.sleep(timeout)
+
+                finished = time.monotonic()
+                for future in done:
+                    idx, due, started = self._inflight.pop(future)
+                    stats.probes += 1
+                    stats.busy_time += finished - started
+                    if finished - started > self.interval_for(self.devices[idx]):
+                        # Probe outlived its own interval
+                        stats.overruns += 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Probe crashed for {self.devices[idx].get('name')}: {e}")
+                        result = {"online": False, "error": "Probe Error"}
+                    self.on_result(self.devices[idx], result, finished - started)
+                    self._reschedule(idx, due, finished, stats)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
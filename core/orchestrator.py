@@ -1,31 +1,84 @@
 import logging
 import os
-from datetime import datetime
-
-# Import Drivers
-from drivers.isp_auditor import ISPAuditor
-from drivers.router_auditor import RouterAuditor
-from drivers.ping_driver import PingDriver
-from drivers.cisco import CiscoSwitch
-from drivers.env_driver import EnvDriver
-from drivers.gude_driver import GudeAuditor
-from drivers.crestron_driver import CrestronAuditor
-from drivers.windows import WindowsProbe
-from core.reporter import PDFReporter
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+
+# Import Drivers (Transport drivers resolve lazily through the registry)
+from drivers import icmp_sweep, registry, tcp_check, tiers
+from drivers.fingerprint import get_fingerprints
+from drivers.instrument import get_tracer
+from drivers.latency import get_latency
+from drivers.port_counters import get_port_counters
+from drivers.rate_limit import get_rate_limiter
+from core.plan import compile_plan, compile_plans
+from core.site_probes import SiteProbe
+from core.report_spool import ReportSpool, spool_threshold
+
+# Worker Pool Defaults (Override via AFARA_MAX_WORKERS / AFARA_DRIVER_LIMITS)
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_DRIVER_LIMITS = {
+    "gude": 8,
+    "crestron": 4,
+    "windows": 4,
+    "router": 2,
+    "cisco": 4,
+    "ping": 32
+}
+
+# Families that hold an SSH session while they audit (share AFARA_SSH_LIMIT)
+SSH_FAMILIES = ("cisco", "router", "crestron", "windows")
+
+def _parse_limits(raw):
+    """Parses 'cisco=4,gude=8' into {'cisco': 4, 'gude': 8}."""
+    limits = {}
+    for item in (raw or "").split(","):
+        if "=" not in item: continue
+        key, val = item.split("=", 1)
+        try: limits[key.strip().lower()] = max(1, int(val))
+        except ValueError: pass
+    return limits
+
+# Kept for callers that import it from here
+driver_family = registry.family
 
 class CommissioningOrchestrator:
-    def __init__(self, project_meta, devices):
+    def __init__(self, project_meta, devices, max_workers=None, driver_limits=None, audit_depth=None, plans=None,
+                 ssh_limit=None):
         self.meta = project_meta
         self.devices = devices
+        # Per-device execution plans (Driver dispatch happens once, here)
+        self.plans = plans if plans is not None else compile_plans(devices)
         self.logger = logging.getLogger("Afara.Orchestrator")
         
         self.stats = {'total': 0, 'pass': 0, 'fail': 0}
+
+        # Commissioning defaults to DEEP (backups + discovery)
+        self.audit_depth = tiers.normalize(audit_depth or os.getenv("AFARA_AUDIT_DEPTH"), tiers.DEEP)
+
+        # Concurrency (Bounded worker pool + per-driver caps)
+        self.max_workers = max_workers or int(os.getenv("AFARA_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+        limits = dict(DEFAULT_DRIVER_LIMITS)
+        limits.update(_parse_limits(os.getenv("AFARA_DRIVER_LIMITS")))
+        limits.update(driver_limits or {})
+        self._driver_slots = {k: threading.BoundedSemaphore(v) for k, v in limits.items()}
+        # Total SSH sessions across all families (0 = per-driver caps only)
+        ssh_limit = ssh_limit if ssh_limit is not None else int(os.getenv("AFARA_SSH_LIMIT", 0))
+        self._ssh_slots = threading.BoundedSemaphore(ssh_limit) if ssh_limit > 0 else None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
         
+        # PDF name under reports/ (None = reference number + time)
+        self.report_filename = None
+        self.report_path = None
         self.report_data = {
             "env": {},
             "isp": {},
             "groups": {} 
         }
+
+        # Large estates stream report entries to disk instead of holding them all
+        self._spool = ReportSpool() if len(devices) >= spool_threshold() else None
         
         self.inventory = {
             "network": [d for d in devices if 'network' in d['group']],
@@ -40,6 +93,7 @@ class CommissioningOrchestrator:
         self.separator = "   " + "-"*135
 
     def run_full_sequence(self):
+        self._start_site_probes()
         self._print_header()
         self._run_step_1_environmental()
         self._run_step_2_network()
@@ -48,62 +102,25 @@ class CommissioningOrchestrator:
         self._run_step_5_av()
         self._run_step_6_security()
         self._run_step_7_rms()
+        self._join_site_probes()
         self._print_footer()
+        get_fingerprints().save()
+        get_latency().save()
+        get_port_counters().save()
         self._generate_pdf_report()
         # Return updated devices list to Main for the Live Loop
         return self.devices
 
+    def close(self):
+        """Releases the report spool. Call once every reader of report_data is done with it."""
+        if self._spool is not None: self._spool.close()
+
     def _generate_pdf_report(self):
         print("   [INFO] Generating PDF Report...")
         try:
-            pdf = PDFReporter(self.meta)
-            pdf.generate_cover()
-            
-            # 1. Environmental
-            pdf.add_section_title("1. Environmental Audit")
-            env = self.report_data.get('env', {})
-            pdf.add_key_value("Location:", env.get('location', 'N/A'))
-            pdf.add_key_value("Temperature:", env.get('temp', 'N/A'))
-            pdf.add_key_value("Humidity:", env.get('humidity', 'N/A'))
-            pdf.ln(10)
-
-            # 2. ISP
-            pdf.add_section_title("2. ISP & WAN Performance")
-            isp = self.report_data.get('isp', {})
-            pdf.add_key_value("Provider:", isp.get('isp_name', 'N/A'))
-            pdf.add_key_value("Public IP:", isp.get('public_ip', 'N/A'))
-            pdf.add_key_value("Download Speed:", f"{isp.get('download_mbps', 0)} Mbps")
-            pdf.add_key_value("Upload Speed:", f"{isp.get('upload_mbps', 0)} Mbps")
-            pdf.add_key_value("Latency:", f"{isp.get('ping_ms', 0)} ms")
-            pdf.ln(10)
-
-            # 3. Devices
-            sections = [
-                ("3. Network Infrastructure", "Network"),
-                ("4. Power & PDU", "Power"),
-                ("5. Control Systems", "Control"),
-                ("6. AV & Media", "AV"),
-                ("7. Security", "Security"),
-                ("8. RMS & Compute", "RMS")
-            ]
-            
-            for title, key in sections:
-                pdf.add_section_title(title)
-                devices = self.report_data['groups'].get(key, [])
-                pdf.add_device_table(devices, category=key)
-
-                if key == "RMS" and devices:
-                    diagnostics = [d for d in devices if d.get('extra_info') and d['extra_info'] != '---']
-                    if diagnostics:
-                        pdf.set_font("Arial", "B", 10)
-                        pdf.cell(0, 8, "Diagnostics & Health Check:", ln=True)
-                        pdf.set_font("Arial", "", 9)
-                        for dev in diagnostics:
-                            pdf.cell(0, 6, f"[INFO] {dev['name']}: {dev['extra_info']}", ln=True)
-                        pdf.ln(5)
-
-            filename = f"Afara_Report_{self.meta.get('ref_number', 'Draft')}_{datetime.now().strftime('%H%M')}.pdf"
-            path = pdf.save_report(filename)
+            from core.reporter import build_report
+            path = build_report(self.meta, self.report_data, self.report_filename)
+            self.report_path = path
             print(f"   [SUCCESS] PDF Report saved to: {path}\n")
             
         except Exception as e:
@@ -135,7 +152,8 @@ class CommissioningOrchestrator:
         mac = str(mac)[:17]
         firmware = str(firmware)[:12] if firmware else "N/A"
 
-        print(f"   {status:<7} {name:<25} | {mode:<8} | {ip:<15} | {mac:<17} | {serial:<15} | {firmware:<12} | {location}")
+        with self._lock:
+            print(f"   {status:<7} {name:<25} | {mode:<8} | {ip:<15} | {mac:<17} | {serial:<15} | {firmware:<12} | {location}")
 
     def _audit_group(self, group_name, devices):
         if not devices:
@@ -144,13 +162,90 @@ class CommissioningOrchestrator:
 
         print(f"   Running Device Audit ({len(devices)} devices)...")
         self._print_table_header()
+
+        entries = [None] * len(devices) if self._spool is None else None
+        backups_collected = {}
+
+        results = self._dispatch(devices)
+        try:
+            # Rows print as each device completes; entries keep schedule order
+            for idx, res in results:
+                entry = self._record_result(devices[idx], res)
+                if entry.get('backup_file') and entry.get('backup_file') != 'N/A':
+                    backups_collected[idx] = f"{entry['name']}: {entry['backup_file']}" + (
+                        "" if entry.get('backup_changed', True) else " (unchanged)")
+                if self._spool is None: entries[idx] = entry
+                else: self._spool.add(group_name, idx, entry)
+        except BaseException:
+            # Ctrl+C: stop queued audits, discard in-flight results
+            results.close()
+            raise
+
+        # Deterministic report ordering (schedule order, not completion order)
+        self.report_data['groups'][group_name] = entries if self._spool is None else self._spool.group(group_name)
+        backups_collected = [backups_collected[i] for i in sorted(backups_collected)]
         
-        self.report_data['groups'][group_name] = []
-        backups_collected = []
-        
-        for dev in devices:
-            res = self._audit_device_logic(dev)
-            
+        if backups_collected:
+            print(f"\n   [INFO] {len(backups_collected)} Configuration Backups Checked:")
+            for b in backups_collected:
+                print(f"          - {b}")
+        print("")
+
+    def _dispatch(self, devices):
+        """Audits a device list on the local worker pool, yielding (index, result) as each completes."""
+        # Batched ICMP sweep for ping-only devices (read back by PingDriver)
+        ping_hosts = [d['ip'] for d in devices if self._family(d) == 'ping']
+        icmp_sweep.sweep_and_publish(ping_hosts)
+        # Concurrent TCP pre-check of every session port (dead hosts never reach netmiko/requests)
+        tcp_check.check_and_publish([(d['ip'], tcp_check.PORTS[self._family(d)]) for d in devices
+                                     if self._family(d) in tcp_check.PORTS])
+
+        # A previous dispatch may have been cancelled (reused orchestrators, worker shards)
+        self._cancel.clear()
+        workers = max(1, min(self.max_workers, len(devices)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="afara-audit")
+        futures = {pool.submit(self._audit_device_slot, dev): idx for idx, dev in enumerate(devices)}
+        try:
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    res = future.result()
+                except Exception as e:
+                    # One driver crash is that device's FAIL, not the end of the run
+                    dev = devices[idx]
+                    self.logger.error(f"Audit of {dev.get('name')} ({dev.get('ip')}) crashed: {e}")
+                    res = {'status_bool': False, 'error': str(e)}
+                    plan = self.plans.get(id(dev))
+                    self._print_result_row(dev, res, plan.mode if plan else "(ERR)")
+                yield idx, res
+        except (KeyboardInterrupt, GeneratorExit):
+            # Ctrl+C, or the consumer stopped early: drop the queued audits
+            self._cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+
+    def _family(self, dev):
+        plan = self.plans.get(id(dev))
+        return plan.family if plan else driver_family(dev['driver'])
+
+    def _audit_device_slot(self, dev):
+        """Runs one audit inside its driver's concurrency cap (and the shared SSH cap)."""
+        if self._cancel.is_set():
+            return None
+        family = self._family(dev)
+        slot = self._driver_slots.get(family) or nullcontext()
+        ssh_slot = self._ssh_slots if self._ssh_slots and family in SSH_FAMILIES else nullcontext()
+        with slot, ssh_slot:
+            if self._cancel.is_set():
+                return None
+            return self._audit_device_logic(dev)
+
+    def _record_result(self, dev, res):
+        """Merges a finished audit into the device cache, stats and report entry."""
+        res = res or {}
+
+        with self._lock:
             # CACHE DATA (For Live Loop Persistence)
             if res.get('serial') and res.get('serial') != '---': dev['serial'] = res['serial']
             if res.get('firmware') and res.get('firmware') != 'N/A': dev['firmware'] = res['firmware']
@@ -162,134 +257,62 @@ class CommissioningOrchestrator:
 
             report_entry = {**dev, **res}
             report_entry['extra_info'] = final_info 
-            
-            self.report_data['groups'][group_name].append(report_entry)
 
             self.stats['total'] += 1
             if res.get('status_bool'): self.stats['pass'] += 1
             else: self.stats['fail'] += 1
-            
-            if res.get('backup_file') and res.get('backup_file') != 'N/A':
-                backups_collected.append(f"{dev['name']}: {res['backup_file']}")
-        
-        if backups_collected:
-            print(f"\n   [INFO] {len(backups_collected)} Configuration Backups Saved:")
-            for b in backups_collected:
-                print(f"          - {b}")
-        print("")
 
-    def _audit_device_logic(self, dev):
-        driver = dev['driver'].lower()
-        res = {}
-        mode = "(PING)"
-        
-        # 1. GUDE PDU
-        if "gude" in driver:
-            mode = "(HTTP)"
-            target = GudeAuditor(dev['ip'], dev.get('username'), dev.get('password'))
-            res = target.audit_firmware_and_config()
-            status = "[PASS]" if res.get('status') == 'PASS' else "[FAIL]"
-            res['status_bool'] = (res.get('status') == 'PASS')
-            
-            # Format Power Metrics
-            if res.get('power_metrics') and res.get('power_metrics') != "N/A":
-                res['extra_info'] = f"{res['power_metrics']}"
-            else:
-                res['extra_info'] = "N/A"
-
-        # 2. CRESTRON
-        elif "crestron" in driver:
-            mode = "(SSH)"
-            target = CrestronAuditor(dev['ip'], dev.get('username'), dev.get('password'))
-            res = target.audit_firmware_and_config()
-            status = "[PASS]" if res.get('status') == 'PASS' else "[FAIL]"
-            res['status_bool'] = (res.get('status') == 'PASS')
-            
-            count = len(res.get('connected_devices', []))
-            if count > 0:
-                res['extra_info'] = f"{count} Peripherals Found"
-            else:
-                res['extra_info'] = "Processor Only"
-
-        # 3. WINDOWS PROBE
-        elif "windows" in driver:
-            mode = "(SSH)"
-            target = WindowsProbe(dev['ip'], dev.get('username'), dev.get('password'))
-            res = target.run()
-            status = "[PASS]" if res.get('status') == 'PASS' else "[FAIL]"
-            res['status_bool'] = (res.get('status') == 'PASS')
-            
-            res['firmware'] = res.get('version', 'N/A')
-            
-            # --- UPDATED SECTION FOR PDF SUMMARY ---
-            os_ver = res.get('version', 'Unknown')
-            uptime = res.get('uptime', 'Unknown')
-            res['extra_info'] = f"{os_ver} | Up: {uptime}"
-
-        # 4. ROUTER
-        elif "router" in driver:
-            mode = "(ROUTER)"
-            raut = RouterAuditor(dev['ip'], dev.get('username'), dev.get('password'), driver)
-            res = raut.audit_firmware_and_config()
-            status = "[PASS]" if res.get('status') == 'PASS' else "[FAIL]"
-            res['status_bool'] = (res.get('status') == 'PASS')
-            res['extra_info'] = res.get('nat_status', '')
-
-        # 5. CISCO SWITCH
-        elif "cisco" in driver:
-             mode = "(SSH)"
-             target = CiscoSwitch(dev['ip'], dev.get('username'), dev.get('password'))
-             check = target.check_status()
-             status = "[PASS]" if check['online'] else "[FAIL]"
-             
-             poe_str = ""
-             if check.get('poe') and isinstance(check['poe'], dict) and check['poe']['status'] == 'Active':
-                 poe_str = f"{check['poe']['utilization']} ({check['poe']['used']}/{check['poe']['budget']})"
-             
-             res = check
-             res['status_bool'] = check['online']
-             res['extra_info'] = poe_str 
-
-        # 6. DEFAULT (PING)
-        else:
-            mode = "(PING)"
-            pinger = PingDriver(dev['ip'])
-            res = pinger.check_status()
-            status = "[PASS]" if res['online'] else "[FAIL]"
-            res['status_bool'] = res['online']
-        
+        return report_entry
+
+    def _audit_device_logic(self, dev, depth=None):
+        depth = depth or self.audit_depth
+        plan = self.plans.get(id(dev)) or compile_plan(dev)
+        res = plan.execute(depth)
+        self._print_result_row(dev, res, plan.mode)
+        return res
+
+    def _print_result_row(self, dev, res, mode):
+        status = "[PASS]" if res.get('status_bool') else "[FAIL]"
+
         # Display Row
         mac = "OFFLINE" if not res.get('status_bool') else res.get('mac', '---')
         self._print_table_row(status, dev, mode, mac, res.get('serial', '---'), res.get('firmware', 'N/A'))
-        
-        return res
 
-    def _run_step_1_environmental(self):
-        print("1. General & Environmental (The Physical Layer)")
-        print("-" * 40)
-        env = EnvDriver()
-        data = env.get_status()
+    def _start_site_probes(self):
+        """WAN speed test and geolocation run in the background, overlapped with the device audits."""
+        env = SiteProbe("env", lambda: registry.resolve("env")().get_status(),
+                        fallback={'location': 'Unknown', 'temp': 'N/A', 'humidity': 'N/A', 'noise': 'N/A'},
+                        cacheable=lambda d: not str(d.get('location', '')).startswith(('Unknown', 'Offline')))
+        isp = SiteProbe("isp", lambda: registry.resolve("isp")(quiet=True).run_audit(),
+                        fallback={'status': 'FAIL', 'error': 'WAN audit did not run'},
+                        cacheable=lambda d: d.get('status') != 'FAIL')
+        self._site_probes = {'env': env.start(), 'isp': isp.start()}
+
+    def _join_site_probes(self):
+        """Collects the background probes (blocking only here, right before the report)."""
+        timeout = float(os.getenv("AFARA_SITE_PROBE_TIMEOUT", 120))
+        pending = [p.name for p in self._site_probes.values() if not p.done()]
+        if pending:
+            print(f"   [INFO] Waiting for background site probes ({', '.join(pending)})...")
+
+        env = self._site_probes['env']
+        data = env.result(timeout)
         self.report_data['env'] = data
-        print(f"   [PASS] Location:           {data['location']}")
+        cached = " (Cached)" if env.from_cache else ""
+        print("Site Probes (Background)")
+        print("-" * 40)
+        print(f"   [PASS] Location:           {data['location']}{cached}")
         print(f"   [PASS] Room Temperature:   {data['temp']} (Simulated/Fallback)")
         print(f"   [PASS] Humidity/Dew Point: {data['humidity']} (Simulated/Fallback)")
         print(f"   [PASS] Noise Floor (dB):   {data['noise']} (Quiet)")
-        print("")
 
-    def _run_step_2_network(self):
-        print("2. Network (The Backbone)")
-        print("-" * 40)
-        
-        # WAN AUDIT PRINT BLOCK
-        print("Verifying WAN Performance...")
-        auditor = ISPAuditor()
-        
-        stats = auditor.run_audit()
+        isp = self._site_probes['isp']
+        stats = isp.result(timeout)
         self.report_data['isp'] = stats
-        
+
         if stats.get('status') != 'FAIL':
             print("\n   ----------------------------------------")
-            print("   WAN AUDIT REPORT")
+            print("   WAN AUDIT REPORT" + (f" (Cached {int(isp.age // 60)} min ago)" if isp.from_cache else ""))
             print("   ----------------------------------------")
             print(f"   Provider:   {stats.get('isp_name', 'Unknown')}")
             print(f"   Public IP:  {stats.get('public_ip', 'Unknown')}")
@@ -299,7 +322,17 @@ class CommissioningOrchestrator:
             print("   ----------------------------------------\n")
         else:
             print(f"   [FAIL] ISP Check Failed: {stats.get('error')}\n")
-            
+
+    def _run_step_1_environmental(self):
+        print("1. General & Environmental (The Physical Layer)")
+        print("-" * 40)
+        print("   [INFO] Location & telemetry probing in background (reported before the PDF).")
+        print("")
+
+    def _run_step_2_network(self):
+        print("2. Network (The Backbone)")
+        print("-" * 40)
+        print("   [INFO] WAN performance test running in background (reported before the PDF).")
         self._audit_group('Network', self.inventory['network'])
 
     def _run_step_3_power(self):
@@ -337,4 +370,35 @@ class CommissioningOrchestrator:
         print(f"   Total Devices Checked: {total}")
         print(f"   PASSED:                {passed}")
         print(f"   FAILED:                {failed}")
-        print("="*50 + "\n")
\ No newline at end of file
+        print("="*50 + "\n")
+
+        throttled = [r for r in get_rate_limiter().snapshot() if r['delayed']]
+        if throttled:
+            self._print_rate_limit_summary(throttled)
+
+        tracer = get_tracer()
+        if tracer.enabled:
+            self._print_trace_summary(tracer)
+
+    def _print_rate_limit_summary(self, rows, limit=5):
+        """Subnets whose probes queued behind the rate limiter (AFARA_RATE_LIMITS)."""
+        print("   RATE LIMITED SUBNETS")
+        for r in rows[:limit]:
+            print(f"   - {r['subnet']:<18} {r['transport']:<5} {r['delayed']:>4}/{r['granted']:<4} probes queued, "
+                  f"peak depth {r['peak']}, {r['wait_s']:.1f}s total wait (max {r['max_wait_s']:.1f}s)")
+        print("")
+
+    def _print_trace_summary(self, tracer, limit=5):
+        """Where the driver time went (AFARA_TRACE=1), plus the raw span export."""
+        names = {d['ip']: d.get('name', d['ip']) for d in self.devices}
+        print("   SLOWEST DEVICES (Driver Time)")
+        for ip, total, count, worst in tracer.slowest_devices(limit):
+            print(f"   - {names.get(ip, ip)[:25]:<25} {total:>7.2f}s over {count:>3} ops (slowest: {worst})")
+        print("\n   SLOWEST COMMANDS")
+        for op, command, calls, avg, worst, failures in tracer.slowest_commands(limit):
+            label = f"{op} {command or ''}".strip()[:40]
+            print(f"   - {label:<40} {worst:>7.2f}s max / {avg:.2f}s avg ({calls} calls, {failures} failed)")
+        path = tracer.export()
+        if path:
+            print(f"\n   [INFO] {len(tracer.spans())} driver spans exported to {path}")
+        print("")
\ No newline at end of file
@@ -0,0 +1,147 @@
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from drivers import registry
+from drivers.rate_limit import TRANSPORTS, get_rate_limiter
+
+# ==================================================
+# RESULT ADAPTERS (Raw driver output -> common result)
+# ==================================================
+def _passed(res):
+    return res.get('status') == 'PASS'
+
+def _adapt_gude(res):
+    res['status_bool'] = _passed(res)
+    # Format Power Metrics
+    metrics = res.get('power_metrics')
+    res['extra_info'] = f"{metrics}" if metrics and metrics != "N/A" else "N/A"
+    return res
+
+def _adapt_crestron(res):
+    res['status_bool'] = _passed(res)
+    count = len(res.get('connected_devices', []))
+    res['extra_info'] = f"{count} Peripherals Found" if count > 0 else "Processor Only"
+    return res
+
+def _adapt_windows(res):
+    res['status_bool'] = _passed(res)
+    res['firmware'] = res.get('version', 'N/A')
+    res['extra_info'] = f"{res.get('version', 'Unknown')} | Up: {res.get('uptime', 'Unknown')}"
+    return res
+
+def _adapt_router(res):
+    res['status_bool'] = _passed(res)
+    res['extra_info'] = res.get('nat_status', '')
+    return res
+
+def _adapt_cisco(res):
+    res['status_bool'] = bool(res.get('online'))
+    poe = res.get('poe')
+    if isinstance(poe, dict) and poe.get('status') == 'Active':
+        res['extra_info'] = f"{poe['utilization']} ({poe['used']}/{poe['budget']})"
+    else:
+        res['extra_info'] = ""
+    return res
+
+def _adapt_ping(res):
+    res['status_bool'] = bool(res.get('online'))
+    return res
+
+# Family -> (mode tag, driver method, method takes depth, adapter, env credential fallback)
+DISPATCH = {
+    "gude": ("(HTTP)", "audit_firmware_and_config", True, _adapt_gude, None),
+    "crestron": ("(SSH)", "audit_firmware_and_config", True, _adapt_crestron, None),
+    "windows": ("(SSH)", "run", True, _adapt_windows, None),
+    "router": ("(ROUTER)", "audit_firmware_and_config", True, _adapt_router, None),
+    "cisco": ("(SSH)", "check_status", True, _adapt_cisco, ("CISCO_USER", "CISCO_PASS")),
+    "ping": ("(PING)", "check_status", False, _adapt_ping, None),
+}
+
+def _credential(value, env_key=None):
+    """Schedule cell -> credential. Empty cells (and pandas' 'nan') fall back to .env."""
+    value = str(value).strip() if value is not None else ""
+    if value.lower() in ("", "nan", "none"):
+        return os.getenv(env_key) if env_key else None
+    return value
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    Compiled Per-Device Execution Plan.
+
+    Built once per device after the schedule is loaded: the driver family is
+    matched, the class resolved, credentials looked up and the result adapter
+    picked. The orchestrator and the live loop then only call execute().
+    Per-host timeouts are not frozen here; they keep adapting in the
+    latency tracker.
+    """
+    ip: str
+    driver: str
+    family: str
+    transport: str
+    mode: str
+    method: str
+    takes_depth: bool
+    driver_cls: type = field(repr=False)
+    adapter: Callable = field(repr=False)
+    username: Optional[str] = field(default=None, repr=False)
+    password: Optional[str] = field(default=None, repr=False)
+
+    def build(self):
+        """Instantiates the driver for one probe."""
+        if self.family == "ping":
+            return self.driver_cls(self.ip)
+        if self.family == "router":
+            return self.driver_cls(self.ip, self.username, self.password, self.driver)
+        return self.driver_cls(self.ip, self.username, self.password)
+
+    def execute(self, depth):
+        """Runs the probe and returns the adapted result (status_bool, online, extra_info, mode)."""
+        # Session transports wait for their subnet's rate limit (ping reads the sweep; its fallback limits itself)
+        if self.transport != "icmp":
+            get_rate_limiter().acquire(self.ip, self.transport)
+        target = self.build()
+        call = getattr(target, self.method)
+        res = call(depth) if self.takes_depth else call()
+        res = self.adapter(res or {})
+        res['online'] = res['status_bool']
+        res['mode'] = self.mode
+        return res
+
+def compile_plan(device):
+    """Schedule row -> ExecutionPlan."""
+    driver = str(device.get('driver') or "ping_driver").lower()
+    family = registry.family(driver)
+    mode, method, takes_depth, adapter, env_keys = DISPATCH[family]
+    user_key, pass_key = env_keys or (None, None)
+
+    return ExecutionPlan(
+        ip=device['ip'],
+        driver=driver,
+        family=family,
+        transport=TRANSPORTS[family],
+        mode=mode,
+        method=method,
+        takes_depth=takes_depth,
+        driver_cls=registry.resolve(family),
+        adapter=adapter,
+        username=_credential(device.get('username'), user_key),
+        password=_credential(device.get('password'), pass_key),
+    )
+
+def compile_plans(devices):
+    """
+    Compiles every device, keyed by id(device) so plans follow the same dict
+    objects through inventory groups and back to the live loop. Plans are
+    never written to disk (they hold credentials and class references).
+    Devices whose driver dependencies are missing fall back to a ping plan.
+    """
+    plans = {}
+    for dev in devices:
+        try:
+            plans[id(dev)] = compile_plan(dev)
+        except ImportError as e:
+            print(f"[WARN] {dev.get('name', dev['ip'])}: driver unavailable ({e}), using ping")
+            plans[id(dev)] = compile_plan({**dev, 'driver': 'ping_driver'})
+    return plans
@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import threading
+
+# Spool Threshold (Override via AFARA_REPORT_SPOOL: device count, 0 = always spool)
+DEFAULT_SPOOL_THRESHOLD = 1000
+
+# Never written to disk
+PRIVATE_FIELDS = ('username', 'password', 'secret')
+
+def spool_threshold():
+    try:
+        return int(os.getenv("AFARA_REPORT_SPOOL", DEFAULT_SPOOL_THRESHOLD))
+    except ValueError:
+        return DEFAULT_SPOOL_THRESHOLD
+
+class SpooledGroup:
+    """
+    Re-iterable, read-only view of one report group on disk.
+
+    Behaves like the in-memory entry list for the report code (len(), bool(),
+    repeated iteration in schedule order) but only ever holds one entry in
+    memory at a time.
+    """
+    def __init__(self, spool, name):
+        self._spool = spool
+        self.name = name
+
+    def __len__(self):
+        return self._spool.count(self.name)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        return self._spool.iter_group(self.name)
+
+class ReportSpool:
+    """
+    On-Disk Report Spool.
+
+    Audit results are appended as JSON lines to one anonymous temp file as
+    they complete; only (offset, length) per schedule index stays in memory.
+    Reading a group seeks through those offsets in schedule order, so peak
+    memory no longer grows with the number of devices. The file is deleted
+    by the OS when the spool is closed or the process exits.
+    """
+    def __init__(self, directory=None):
+        self._file = tempfile.TemporaryFile(mode="w+b", dir=directory, prefix="afara_report_")
+        self._index = {}   # group -> {schedule index: (offset, length)}
+        self._lock = threading.Lock()
+
+    def add(self, group, idx, entry):
+        record = {k: v for k, v in entry.items() if k not in PRIVATE_FIELDS}
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(line)
+            self._index.setdefault(group, {})[idx] = (offset, len(line))
+
+    def group(self, name):
+        return SpooledGroup(self, name)
+
+    def count(self, group):
+        with self._lock:
+            return len(self._index.get(group, {}))
+
+    def iter_group(self, group):
+        with self._lock:
+            positions = [pos for _, pos in sorted(self._index.get(group, {}).items())]
+        for offset, length in positions:
+            with self._lock:
+                self._file.seek(offset)
+                raw = self._file.read(length)
+            yield json.loads(raw)
+
+    def close(self):
+        try: self._file.close()
+        except Exception: pass
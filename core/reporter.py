@@ -1,7 +1,53 @@
 import os
+import re
 from datetime import datetime
 from fpdf import FPDF
 
+# Compiled once per process (was re-imported/re-compiled per PDU row)
+AMPS_RE = re.compile(r'/\s*([0-9\.]+)\s*A')
+HIGH_LOAD_AMPS = 14.0
+
+# Table Layouts (Headers + column widths per category)
+BASE_HEADERS = ["Status", "Name", "IP Addr", "MAC Addr", "Serial", "FW", "Location"]
+BASE_WIDTHS = [15, 50, 30, 35, 35, 25, 50]
+EXTRA_LAYOUTS = {
+    "Network": ("PoE Status", [15, 40, 28, 32, 35, 25, 35, 50]),
+    "Power": ("Load (V/A)", [15, 40, 28, 32, 35, 25, 35, 50]),
+}
+
+REPORT_SECTIONS = [
+    ("3. Network Infrastructure", "Network"),
+    ("4. Power & PDU", "Power"),
+    ("5. Control Systems", "Control"),
+    ("6. AV & Media", "AV"),
+    ("7. Security", "Security"),
+    ("8. RMS & Compute", "RMS")
+]
+
+def format_row(d, with_extra):
+    """Report entry -> table cell strings."""
+    status = "PASS" if d.get('status_bool') else "FAIL"
+
+    mac = d.get('mac', '---')
+    if isinstance(mac, list): mac = str(mac[0])
+
+    serial = d.get('serial', '---')
+    if isinstance(serial, list): serial = str(serial[0])
+
+    loc_raw = d.get('location', {})
+    row = [
+        status,
+        str(d.get('name', 'N/A'))[:35],
+        str(d.get('ip', 'N/A')),
+        str(mac),
+        str(serial),
+        str(d.get('firmware', 'N/A'))[:20],
+        f"{loc_raw.get('floor', '')} > {loc_raw.get('room', '')}"[:30]
+    ]
+    if with_extra:
+        row.append(str(d.get('extra_info', '---')))
+    return row
+
 class PDFReporter(FPDF):
     def __init__(self, meta):
         # 'L' = Landscape, 'mm' = millimeters, 'A4' = page size
@@ -53,16 +99,10 @@ class PDFReporter(FPDF):
             return
 
         # TABLE CONFIGURATION
-        headers = ["Status", "Name", "IP Addr", "MAC Addr", "Serial", "FW", "Location"]
-        widths =  [15,       50,     30,        35,         35,       25,   50]
-
-        # Add Specific Columns
-        if category == "Network":
-            headers.append("PoE Status")
-            widths = [15, 40, 28, 32, 35, 25, 35, 50] 
-        elif category == "Power":
-            headers.append("Load (V/A)")
-            widths = [15, 40, 28, 32, 35, 25, 35, 50] 
+        headers, widths = BASE_HEADERS, BASE_WIDTHS
+        extra = EXTRA_LAYOUTS.get(category)
+        if extra:
+            headers, widths = BASE_HEADERS + [extra[0]], extra[1]
 
         # HEADER
         self.set_font('Arial', 'B', 8)
@@ -71,34 +111,12 @@ class PDFReporter(FPDF):
             self.cell(widths[i], 8, h, 1, 0, 'C', fill=True)
         self.ln()
 
-        # ROWS
+        # ROWS (One pass over the entries; works on lists and spooled groups)
         self.set_font('Arial', '', 7)
         for d in devices:
-            status = "PASS" if d.get('status_bool') else "FAIL"
-            
-            name = str(d.get('name', 'N/A'))[:35]
-            ip = str(d.get('ip', 'N/A'))
-            
-            mac = d.get('mac', '---')
-            if isinstance(mac, list): mac = str(mac[0])
-            
-            serial = d.get('serial', '---')
-            if isinstance(serial, list): serial = str(serial[0])
-            
-            fw = str(d.get('firmware', 'N/A'))[:20]
-            
-            loc_raw = d.get('location', {})
-            location = f"{loc_raw.get('floor', '')} > {loc_raw.get('room', '')}"[:30]
-
-            row_data = [status, name, ip, mac, serial, fw, location]
-
-            if category == "Network" or category == "Power":
-                extra = str(d.get('extra_info', '---'))
-                row_data.append(extra)
-
-            # Draw Cells
-            for i, data in enumerate(row_data):
-                self.cell(widths[i], 8, str(data), 1, 0, 'L')
+            # Keyword form (positional 'ln' goes through fpdf2's slow deprecation shim)
+            for width, data in zip(widths, format_row(d, extra is not None)):
+                self.cell(width, 8, data, border=1, align='L')
             self.ln()
         
         self.ln(5)
@@ -136,18 +154,22 @@ class PDFReporter(FPDF):
                 if len(vlans) > 10: v_str += "..."
                 self.cell(0, 6, f" [INFO] {d['name']} VLAN Database (Configured): {v_str}", 0, 1)
 
-            # 3. Port Errors (Switches)
+            # 3. Port Errors (Switches: only ports whose error rate is rising or sustained)
             errors = d.get('port_errors')
             if errors and isinstance(errors, list):
                 has_warnings = True
                 self.set_text_color(200, 0, 0) # Red
                 err_str = ", ".join(errors)
                 self.cell(0, 6, f" [WARNING] {d['name']} Port Errors: {err_str}", 0, 1)
+            quiet = d.get('port_errors_quiet')
+            if quiet:
+                self.set_text_color(100, 100, 100) # Grey
+                self.cell(0, 6, f" [INFO] {d['name']}: {quiet} port(s) with historic errors, not increasing.", 0, 1)
 
         # 4. Global Clean Bill of Health (if no specific errors found)
         if not has_warnings:
             self.set_text_color(0, 0, 0)
-            self.cell(0, 6, " No physical cabling errors (CRC/Input drops) detected on any active ports.", 0, 1)
+            self.cell(0, 6, " No increasing cabling errors (CRC/Input drops) detected on any active ports.", 0, 1)
         
         self.set_text_color(0, 0, 0) 
         self.ln(10)
@@ -167,9 +189,8 @@ class PDFReporter(FPDF):
                 is_high_load = False
                 try:
                     # Simple heuristic: find 'A' and check number before it
-                    import re
-                    amp_match = re.search(r'/\s*([0-9\.]+)\s*A', metrics)
-                    if amp_match and float(amp_match.group(1)) > 14.0:
+                    amp_match = AMPS_RE.search(metrics)
+                    if amp_match and float(amp_match.group(1)) > HIGH_LOAD_AMPS:
                         is_high_load = True
                 except: pass
 
@@ -196,4 +217,52 @@ class PDFReporter(FPDF):
             os.makedirs("reports")
         path = f"reports/{filename}"
         self.output(path)
-        return path
\ No newline at end of file
+        return path
+
+def build_report(meta, report_data, filename=None):
+    """
+    Renders the full commissioning report and returns the saved path.
+    Group entries may be lists or spooled groups (anything re-iterable).
+    """
+    pdf = PDFReporter(meta)
+    pdf.generate_cover()
+    
+    # 1. Environmental
+    pdf.add_section_title("1. Environmental Audit")
+    env = report_data.get('env', {})
+    pdf.add_key_value("Location:", env.get('location', 'N/A'))
+    pdf.add_key_value("Temperature:", env.get('temp', 'N/A'))
+    pdf.add_key_value("Humidity:", env.get('humidity', 'N/A'))
+    pdf.ln(10)
+
+    # 2. ISP
+    pdf.add_section_title("2. ISP & WAN Performance")
+    isp = report_data.get('isp', {})
+    pdf.add_key_value("Provider:", isp.get('isp_name', 'N/A'))
+    pdf.add_key_value("Public IP:", isp.get('public_ip', 'N/A'))
+    pdf.add_key_value("Download Speed:", f"{isp.get('download_mbps', 0)} Mbps")
+    pdf.add_key_value("Upload Speed:", f"{isp.get('upload_mbps', 0)} Mbps")
+    pdf.add_key_value("Latency:", f"{isp.get('ping_ms', 0)} ms")
+    pdf.ln(10)
+
+    # 3. Devices
+    for title, key in REPORT_SECTIONS:
+        pdf.add_section_title(title)
+        devices = report_data['groups'].get(key, [])
+        pdf.add_device_table(devices, category=key)
+
+        if key == "RMS" and devices:
+            header_done = False
+            for dev in devices:
+                if not dev.get('extra_info') or dev['extra_info'] == '---': continue
+                if not header_done:
+                    pdf.set_font("Arial", "B", 10)
+                    pdf.cell(0, 8, "Diagnostics & Health Check:", ln=True)
+                    pdf.set_font("Arial", "", 9)
+                    header_done = True
+                pdf.cell(0, 6, f"[INFO] {dev['name']}: {dev['extra_info']}", ln=True)
+            if header_done:
+                pdf.ln(5)
+
+    filename = filename or f"Afara_Report_{meta.get('ref_number', 'Draft')}_{datetime.now().strftime('%H%M')}.pdf"
+    return pdf.save_report(filename)
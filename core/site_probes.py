@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import threading
+import time
+
+# Site Probe Cache (Override via AFARA_SITE_PROBE_TTL / AFARA_SITE_PROBE_PATH)
+DEFAULT_PATH = os.path.join("cache", "site_probes.json")
+DEFAULT_TTL = 600
+
+_file_lock = threading.Lock()
+
+def _read_all(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_entry(path, name, data):
+    """Read-modify-write of one probe entry (atomic tmp + rename)."""
+    with _file_lock:
+        entries = _read_all(path)
+        entries[name] = {"taken": time.time(), "data": data}
+        try:
+            folder = os.path.dirname(path)
+            if folder and not os.path.exists(folder): os.makedirs(folder)
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.getLogger("Afara.SiteProbes").warning(f"Could not cache {name} probe: {e}")
+
+class SiteProbe:
+    """
+    Background Site-Level Probe (WAN speed test, geolocation).
+
+    Starts the measurement on a daemon thread so it overlaps the device
+    audits, and only blocks when result() is called at report time. A result
+    younger than the TTL is served from cache/site_probes.json instead of
+    measuring again; only results accepted by cacheable() are stored.
+    """
+    def __init__(self, name, fn, fallback, ttl=None, path=None, cacheable=None):
+        self.name = name
+        self.fn = fn
+        self.fallback = fallback
+        self.ttl = ttl if ttl is not None else float(os.getenv("AFARA_SITE_PROBE_TTL", DEFAULT_TTL))
+        self.path = path or os.getenv("AFARA_SITE_PROBE_PATH", DEFAULT_PATH)
+        self.cacheable = cacheable or (lambda data: True)
+        self.logger = logging.getLogger("Afara.SiteProbes")
+
+        self.from_cache = False
+        self.age = None
+        self._data = None
+        self._thread = None
+
+    def _cached(self):
+        if self.ttl <= 0: return None
+        entry = _read_all(self.path).get(self.name)
+        if not entry: return None
+        age = time.time() - entry.get("taken", 0)
+        if age > self.ttl: return None
+        self.age = age
+        return entry.get("data")
+
+    def _run(self):
+        try:
+            self._data = self.fn()
+        except Exception as e:
+            self.logger.warning(f"{self.name} probe failed: {e}")
+            self._data = dict(self.fallback, error=str(e))
+            return
+        if self.ttl > 0 and self.cacheable(self._data):
+            _write_entry(self.path, self.name, self._data)
+
+    def start(self):
+        cached = self._cached()
+        if cached is not None:
+            self._data = cached
+            self.from_cache = True
+            return self
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"afara-{self.name}")
+        self._thread.start()
+        return self
+
+    def done(self):
+        return self._thread is None or not self._thread.is_alive()
+
+    def result(self, timeout=None):
+        """Joins the probe. Returns the fallback if it is still running after timeout."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return dict(self.fallback, error=f"{self.name} probe still running after {timeout}s")
+        return self._data if self._data is not None else dict(self.fallback)
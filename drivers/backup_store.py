@@ -0,0 +1,129 @@
+import difflib
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# Lines that change on every pull without the configuration changing
+VOLATILE_PATTERNS = [
+    r"^!\s*Last configuration change at",
+    r"^!\s*NVRAM config last updated at",
+    r"^!\s*No configuration change since last restart",
+    r"^!\s*Time:",
+    r"^Building configuration",
+    r"^Current configuration\s*:\s*\d+\s*bytes",
+    r"^ntp clock-period",
+    r"^Date:",
+    r"^\S+ uptime is",
+    r"^\s*(?:\S+\s+)?(?:has been\s+)?[Rr]unning for\s+\d",
+    r"^\s*(?:System\s+)?[Uu]ptime\s*[:=]",
+]
+_VOLATILE_RE = re.compile("|".join(f"(?:{p})" for p in VOLATILE_PATTERNS))
+
+def normalize(content):
+    """Strips volatile lines and trailing whitespace so noise never creates a version."""
+    lines = []
+    for line in content.replace("\r\n", "\n").split("\n"):
+        line = line.rstrip()
+        if not line or _VOLATILE_RE.search(line): continue
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+class BackupStore:
+    """
+    Content-Addressed Configuration Backups.
+
+    Layout (under backups/):
+        objects/<2-char prefix>/<sha256>.gz   Compressed config blobs
+        index/<device_id>.json                Version history per device (blob paths relative to the root)
+
+    A retrieved config is hashed after volatile-line filtering. If the hash
+    matches the device's latest version nothing is written; otherwise the
+    blob is stored once (identical configs across devices share a blob) and
+    a new version is appended to the device index.
+    """
+    def __init__(self, root="backups"):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _index_path(self, device_id):
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", device_id)
+        return os.path.join(self.root, "index", f"{safe}.json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.gz")
+
+    def versions(self, device_id):
+        try:
+            with open(self._index_path(device_id), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def put(self, device_id, content):
+        """Stores content if it changed. Returns the (new or current) version entry plus 'changed'."""
+        if isinstance(content, bytes):
+            content = content.decode("utf-8", errors="ignore")
+        digest = hashlib.sha256(normalize(content).encode("utf-8")).hexdigest()
+
+        blob = self._blob_path(digest)
+        with self._lock:
+            history = self.versions(device_id)
+            if history and history[-1]["hash"] == digest:
+                return {**history[-1], "path": blob, "changed": False}
+
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                tmp = f"{blob}.tmp"
+                with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                    f.write(content)
+                os.replace(tmp, blob)
+
+            entry = {
+                "version": len(history) + 1,
+                "hash": digest,
+                "path": os.path.relpath(blob, self.root),
+                "size": len(content),
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            history.append(entry)
+
+            index = self._index_path(device_id)
+            os.makedirs(os.path.dirname(index), exist_ok=True)
+            tmp = f"{index}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(history, f, indent=2)
+            os.replace(tmp, index)
+
+        return {**entry, "path": blob, "changed": True}
+
+    def read(self, device_id, version=-1):
+        """Returns the raw config for a version (1-based, or negative from the latest)."""
+        history = self.versions(device_id)
+        if not history: return None
+        entry = history[version - 1] if version > 0 else history[version]
+        with gzip.open(self._blob_path(entry["hash"]), "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def diff(self, device_id, old=-2, new=-1):
+        """Unified diff of the filtered configs between two versions ('' if identical)."""
+        history = self.versions(device_id)
+        if len(history) < 2 and old == -2: return ""
+        label = lambda v: f"{device_id}@v{(history[v - 1] if v > 0 else history[v])['version']}"
+        before = normalize(self.read(device_id, old) or "").splitlines(keepends=True)
+        after = normalize(self.read(device_id, new) or "").splitlines(keepends=True)
+        return "".join(difflib.unified_diff(before, after, label(old), label(new)))
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_backup_store():
+    """Returns the process-wide backup store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BackupStore(os.getenv("AFARA_BACKUP_DIR", "backups"))
+        return _store
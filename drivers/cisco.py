@@ -1,11 +1,23 @@
 import os
 import re
+import time
 import logging
 from dotenv import load_dotenv
 from netmiko import ConnectHandler
+from drivers import tiers, tcp_check
+from drivers.session_pool import get_pool
+from drivers.fingerprint import get_fingerprints
+from drivers.latency import get_latency
+from drivers.instrument import get_tracer
+from drivers.port_counters import get_port_counters, parse_interface_counters
+from drivers.parsers import parse, first
+from drivers.backup_store import get_backup_store
 
 load_dotenv()
 
+# CLI error markers (command not supported on this platform)
+INVALID_MARKERS = ("Invalid input", "% Unrecognized", "% Invalid", "Unrecognized command")
+
 class CiscoSwitch:
     """
     Unified Cisco Driver (Advanced).
@@ -14,12 +26,19 @@ class CiscoSwitch:
     1. Driver Fallback (SMB/S300 -> IOS) for mixed environments.
     2. Deep Diagnostics (Uptime, CRC Errors, PoE).
     3. Robust Connection (Paging disabled, Slower timing for old hardware).
+    4. Batched Collection (All audit commands in one pipelined exchange).
     """
-    def __init__(self, ip, username=None, password=None):
+    def __init__(self, ip, username=None, password=None, batch_mode=None):
         self.host = ip
         self.username = username if (username and len(username) > 0) else os.getenv("CISCO_USER")
         self.password = password if (password and len(password) > 0) else os.getenv("CISCO_PASS")
         self.secret = os.getenv("CISCO_SECRET")
+        self.fingerprint = get_fingerprints()
+        self.latency = get_latency()
+        self.tracer = get_tracer()
+        if batch_mode is None:
+            batch_mode = os.getenv("AFARA_CISCO_BATCH", "1").lower() not in ("0", "false", "no", "off")
+        self.batch_mode = batch_mode
 
     def _normalize_mac(self, mac_raw):
         if not mac_raw: return "Unknown"
@@ -28,13 +47,110 @@ class CiscoSwitch:
             return ":".join(clean[i:i+2] for i in range(0, 12, 2))
         return mac_raw
 
+    def _send_known(self, connection, command):
+        """
+        send_command that honours the host fingerprint: commands this host is
+        known not to support are skipped, and CLI errors are recorded.
+        """
+        if self.fingerprint.unsupported(self.host, command):
+            return ""
+        out = connection.send_command(command)
+        if any(marker in out for marker in INVALID_MARKERS):
+            self.fingerprint.record_command(self.host, command, False)
+            return ""
+        return out
+
     def _log_debug(self, message):
         try:
-            with open("ssh_debug.log", "a") as f:
+            with open(os.getenv("AFARA_SSH_DEBUG_LOG", "ssh_debug.log"), "a") as f:
                 f.write(f"[{self.host}] {message}\n")
         except: pass
 
-    def check_status(self):
+    def _collect_batch(self, connection, commands, read_timeout=60):
+        """
+        Pipelined collection: writes every command in one burst, then reads
+        until the prompt has come back once per command and splits the stream
+        on the prompt. Timing is prompt-driven (no fixed delay factor).
+        Returns {command: output}, or None if the exchange could not be framed.
+        """
+        prompt = connection.find_prompt().strip()
+        if not prompt: return None
+        connection.clear_buffer()
+        connection.write_channel("".join(f"{cmd}{connection.RETURN}" for cmd in commands))
+
+        prompt_re = re.compile(rf"^{re.escape(prompt)}[ \t]*", re.MULTILINE)
+        buffer = ""
+        deadline = time.monotonic() + read_timeout
+        while time.monotonic() < deadline:
+            chunk = connection.read_channel()
+            if chunk:
+                buffer += chunk
+                # Every command's output ends with a fresh prompt
+                if len(prompt_re.findall(buffer)) >= len(commands) and buffer.rstrip().endswith(prompt):
+                    break
+            else:
+                time.sleep(0.02)
+        else:
+            return None
+
+        segments = prompt_re.split(buffer.replace("\r\n", "\n").replace("\r", ""))
+        outputs = {}
+        for cmd, segment in zip(commands, segments):
+            # First line is the command echo
+            echo, _, body = segment.partition("\n")
+            if cmd not in echo: return None
+            outputs[cmd] = body.rstrip()
+        return outputs if len(outputs) == len(commands) else None
+
+    def _collect(self, connection, commands):
+        """Runs a command set (batched when enabled), honouring the fingerprint."""
+        commands = [c for c in commands if not self.fingerprint.unsupported(self.host, c)]
+        outputs = None
+        started = time.monotonic()
+        if self.batch_mode and len(commands) > 1:
+            try:
+                with self.tracer.span(self.host, "batch", f"{len(commands)} commands") as span:
+                    outputs = self._collect_batch(connection, commands)
+                    if outputs is None: span.outcome = "unframed"
+            except Exception as e:
+                self._log_debug(f"Batch collection failed: {e}")
+            if outputs is None:
+                # Resync the channel before falling back to one-by-one
+                try: connection.clear_buffer()
+                except: pass
+
+        if outputs is None:
+            outputs = {}
+            for cmd in commands:
+                try: outputs[cmd] = connection.send_command(cmd)
+                except: outputs[cmd] = ""
+
+        if commands:
+            # Per-command latency (batch time spread across its commands)
+            self.latency.record(self.host, "command", (time.monotonic() - started) / len(commands))
+
+        for cmd, out in outputs.items():
+            if any(marker in out for marker in INVALID_MARKERS):
+                self.fingerprint.record_command(self.host, cmd, False)
+                outputs[cmd] = ""
+        return outputs
+
+    def _command_set(self, depth):
+        """Commands collected in one exchange for a given audit depth."""
+        commands = ["terminal length 0", "terminal datadump", "show version"]
+        if tiers.includes(depth, tiers.STANDARD):
+            if self.fingerprint.pattern(self.host, "mac") in (None, "system"):
+                commands.append("show system")
+            commands += ["show vlan brief", "show interfaces", "show power inline"]
+        if tiers.includes(depth, tiers.DEEP):
+            commands.append("show running-config")
+        return commands
+
+    def check_status(self, depth=tiers.DEEP):
+        """
+        HEARTBEAT: show version (serial/firmware/uptime) | STANDARD: + MAC, VLANs,
+        port errors, PoE | DEEP: + running-config backup
+        """
         # Default Data Structure
         data = {
             "online": False,
@@ -43,15 +159,28 @@ class CiscoSwitch:
             "firmware": "N/A",
             "uptime": "N/A",
             "port_errors": [],
+            "port_counters": {},
+            "port_errors_quiet": 0,
             "backup_file": "N/A",
             "vlans": [],
             "poe": {"status": "No PoE", "utilization": "N/A", "used": "N/A", "budget": "N/A"},
             "error": None
         }
 
-        # Strategy: Try 'cisco_s300' (SMB) first, then 'cisco_ios' (Enterprise)
+        # Strategy: Try 'cisco_s300' (SMB) first, then 'cisco_ios' (Enterprise),
+        # unless the fingerprint already knows which driver this host answers to
         drivers_to_try = ['cisco_s300', 'cisco_ios']
+        known_driver = self.fingerprint.driver(self.host)
+        if known_driver in drivers_to_try:
+            drivers_to_try.remove(known_driver)
+            drivers_to_try.insert(0, known_driver)
+        last_error = ""
         
+        # Learned per-host timeouts (legacy constants on cold start); only the
+        # TCP connect is cut short for a host that keeps timing out
+        connect_timeout = self.latency.connect_timeout(self.host, "handshake", 15)
+        handshake_timeout = self.latency.timeout(self.host, "handshake", 15)
+
         for driver in drivers_to_try:
             device_config = {
                 'device_type': driver,
@@ -60,157 +189,66 @@ class CiscoSwitch:
                 'password': self.password,
                 'secret': self.secret or self.password,
                 'port': 22,
-                'conn_timeout': 15,       # Increased for slow switches
-                'auth_timeout': 15,
-                'banner_timeout': 30,     # Increased for legal banners
-                'global_delay_factor': 4, # 4x Slower (Critical for reliability)
-                'fast_cli': False         # Disable fast mode
+                'conn_timeout': connect_timeout,  # 15s cold start for slow switches
+                'auth_timeout': handshake_timeout,
+                'banner_timeout': self.latency.timeout(self.host, "handshake", 30),  # Legal banners
             }
+            if self.batch_mode:
+                # Batched collection waits on prompts, not on fixed delays
+                device_config.update({'global_delay_factor': 1, 'fast_cli': True})
+            else:
+                device_config.update({
+                    'global_delay_factor': self.latency.delay_factor(self.host, 4), # Up to 4x slower
+                    'fast_cli': False         # Disable fast mode
+                })
 
+            # TCP pre-check first: a dead host fails in milliseconds instead of conn_timeout
+            open_session = tcp_check.guard(self.host, 22, lambda: self.latency.timed(self.host, "handshake",
+                                           lambda: self.tracer.timed(self.host, "connect",
+                                               lambda: ConnectHandler(**device_config), driver)))
             try:
-                with ConnectHandler(**device_config) as connection:
-                    # --- CRITICAL: DISABLE PAGING ---
-                    try: 
-                        connection.enable()
-                        # Send both types of paging disable commands to cover all bases
-                        connection.send_command("terminal length 0") # IOS
-                        connection.send_command("terminal datadump") # SMB
+                # Pooled session: reused across audits/cycles instead of a new handshake
+                with get_pool().session(self.host, driver, self.username, self.password, open_session,
+                                        mode="batch" if self.batch_mode else "classic") as connection:
+                    connection = self.tracer.wrap(connection, self.host)
+                    try: connection.enable()
                     except: pass
                     
                     data["online"] = True
 
+                    # --- COLLECT (Paging disable + audit commands in one exchange) ---
+                    out = self._collect(connection, self._command_set(depth))
+                    ver_out = out.get("show version", "")
+
                     # 1. HARDWARE INFO (Serial/FW/Uptime)
-                    try:
-                        # Try IOS version command first
-                        ver_out = connection.send_command("show version")
-                        
-                        # Serial (Try IOS pattern first, then SMB pattern)
-                        ios_sn = re.search(r"Processor board ID\s+(\w+)", ver_out, re.IGNORECASE)
-                        smb_sn = re.search(r"System Serial Number\s*:\s*(\w+)", ver_out, re.IGNORECASE)
-                        
-                        # Inventory check for SMBs that hide SN in 'show inventory'
-                        if not ios_sn and not smb_sn:
-                            inv_out = connection.send_command("show inventory")
-                            smb_sn = re.search(r"SN:\s*(\w+)", inv_out, re.IGNORECASE)
-
-                        if ios_sn: data["serial"] = ios_sn.group(1)
-                        elif smb_sn: data["serial"] = smb_sn.group(1)
-
-                        # --- FIRMWARE FIX ---
-                        # Pattern 1: "Version 15.2(4)E" (IOS Standard)
-                        # Pattern 2: "Version: 1.4.2.02" (SMB Standard - Note the colon)
-                        # Pattern 3: "SW version    : 2.5.0.83" (Some Catalyst types)
-                        
-                        fw_patterns = [
-                            r"Version\s+([0-9a-zA-Z\.\(\)\-]+)",      # IOS
-                            r"Version:\s*([0-9a-zA-Z\.\(\)\-]+)",     # SMB
-                            r"SW [Vv]ersion\s*:\s*([0-9a-zA-Z\.\(\)\-]+)" # Fallback
-                        ]
-                        
-                        for pat in fw_patterns:
-                            fw_match = re.search(pat, ver_out, re.IGNORECASE)
-                            if fw_match:
-                                data["firmware"] = fw_match.group(1)
-                                break
-
-                        # Uptime
-                        up_match = re.search(r"uptime is (.*)", ver_out, re.IGNORECASE)
-                        if up_match:
-                            raw_up = up_match.group(1).split(', ')
-                            data["uptime"] = ", ".join(raw_up[:2])
-                    except: pass
+                    self._parse_version(connection, data, ver_out, driver)
 
-                    # 2. MAC ADDRESS
                     data["mac"] = "Unknown"
-                    try:
-                        # Try 'show system' (SMB) then 'show version' (IOS)
-                        sys_out = connection.send_command("show system")
-                        sys_mac = re.search(r"System MAC Address:\s*([0-9a-fA-F:.]+)", sys_out, re.IGNORECASE)
-                        
-                        if sys_mac:
-                            data["mac"] = self._normalize_mac(sys_mac.group(1))
-                        else:
-                            base_mac = re.search(r"Base [Ee]thernet MAC [Aa]ddress\s*:\s*([0-9a-fA-F:.]+)", ver_out, re.IGNORECASE)
-                            if base_mac:
-                                data["mac"] = self._normalize_mac(base_mac.group(1))
-                            else:
-                                # Final Fallback: Vlan1
-                                int_out = connection.send_command("show interface Vlan1")
-                                int_mac = re.search(r"address is ([0-9a-fA-F:.]+)", int_out)
-                                if int_mac: data["mac"] = self._normalize_mac(int_mac.group(1))
-                    except: data["mac"] = "ONLINE"
-
-                    # 3. VLAN AUDIT
-                    try:
-                        vlan_out = connection.send_command("show vlan brief")
-                        vlan_ids = re.findall(r"^(\d+)\s+", vlan_out, re.MULTILINE)
-                        data["vlans"] = vlan_ids if vlan_ids else ["1"]
-                    except: pass
-
-                    # 4. PHYSICAL HEALTH (Port Errors)
-                    try:
-                        int_stats = connection.send_command("show interfaces")
-                        current_iface = "Unknown"
-                        for line in int_stats.splitlines():
-                            if "line protocol is" in line:
-                                current_iface = line.split()[0]
-                            if "input errors" in line or "CRC" in line:
-                                errs = re.search(r"(\d+) input errors.*?(\d+) CRC", line)
-                                if errs:
-                                    inputs = int(errs.group(1))
-                                    crcs = int(errs.group(2))
-                                    if inputs > 0 or crcs > 0:
-                                        data["port_errors"].append(f"{current_iface} (CRC:{crcs}|In:{inputs})")
-                    except: pass
+                    if tiers.includes(depth, tiers.STANDARD):
+                        # 2. MAC ADDRESS
+                        self._parse_mac(connection, data, ver_out, out.get("show system", ""))
+                        # 3. VLAN AUDIT
+                        self._parse_vlans(data, out.get("show vlan brief", ""), driver)
+                        # 4. PHYSICAL HEALTH (Port Errors)
+                        self._parse_port_errors(data, out.get("show interfaces", ""))
+                        # 5. POE AUDIT
+                        self._parse_poe(data, out.get("show power inline", ""))
 
-                    # 5. POE AUDIT
-                    try:
-                        poe_out = connection.send_command("show power inline")
-                        used_match = re.search(r"Used\s*:\s*([\d\.]+)", poe_out, re.IGNORECASE)
-                        avail_match = re.search(r"Available\s*:\s*([\d\.]+)", poe_out, re.IGNORECASE)
-
-                        if not used_match:
-                            # Try Table Format
-                            table_match = re.search(r"\d+\s+([\d\.]+)\s+([\d\.]+)\s+[\d\.]+", poe_out)
-                            if table_match:
-                                avail_val = float(table_match.group(1))
-                                used_val = float(table_match.group(2))
-                            else:
-                                avail_val, used_val = 0.0, 0.0
-                        else:
-                            used_val = float(used_match.group(1))
-                            avail_val = float(avail_match.group(1))
-
-                        if avail_val > 0:
-                            util_pct = (used_val / avail_val) * 100
-                            data["poe"] = {
-                                "budget": f"{avail_val} W",
-                                "used": f"{used_val} W",
-                                "utilization": f"{util_pct:.1f}%",
-                                "status": "Active"
-                            }
-                        else:
-                            data["poe"]["status"] = "No PoE Power"
-                    except: 
-                        data["poe"]["status"] = "Not Supported"
-
-                    # 6. BACKUP
-                    try:
-                        config = connection.send_command("show running-config")
-                        if not os.path.exists("backups"): os.makedirs("backups")
-                        safe_ip = self.host.replace('.', '_')
-                        backup_filename = f"backups/switch_{safe_ip}.cfg"
-                        with open(backup_filename, "w") as f: f.write(config)
-                        data["backup_file"] = backup_filename
-                    except: pass
+                    # 6. BACKUP (Deep audits only)
+                    if tiers.includes(depth, tiers.DEEP):
+                        self._save_backup(data, out.get("show running-config", ""))
 
-                    connection.disconnect()
+                    self.fingerprint.record_driver(self.host, driver)
                     return data # SUCCESS - RETURN DATA
 
             except Exception as e:
                 # Log specific error for this driver attempt
                 self._log_debug(f"Driver '{driver}' failed: {e}")
                 last_error = str(e)
+                if driver == known_driver:
+                    # Remembered path no longer works: rediscover from scratch
+                    self.fingerprint.invalidate(self.host)
+                    known_driver = None
                 continue # Try next driver
 
         # If loop finishes without returning, all drivers failed
@@ -222,6 +260,162 @@ class CiscoSwitch:
         data["error"] = err_msg
         return data
 
+    def _parse_version(self, connection, data, ver_out, driver="cisco_ios"):
+        try:
+            # Structured template first (ntc_templates); the regex chains below fill whatever it missed
+            ver = parse(driver, "show version", ver_out)
+            serial = first(ver, "serial")
+            firmware = first(ver, "version") or first(ver, "sw_version")   # IOS | SMB
+            uptime = first(ver, "uptime")
+
+            if serial:
+                data["serial"] = serial
+            else:
+                # Serial (Try IOS pattern first, then SMB pattern)
+                ios_sn = re.search(r"Processor board ID\s+(\w+)", ver_out, re.IGNORECASE)
+                smb_sn = re.search(r"System Serial Number\s*:\s*(\w+)", ver_out, re.IGNORECASE)
+
+                # Inventory check for SMBs that hide SN in 'show inventory'
+                if not ios_sn and not smb_sn:
+                    inv_out = self._send_known(connection, "show inventory")
+                    smb_sn = re.search(r"SN:\s*(\w+)", inv_out, re.IGNORECASE)
+                    if inv_out: self.fingerprint.record_command(self.host, "show inventory", bool(smb_sn))
+
+                if ios_sn: data["serial"] = ios_sn.group(1)
+                elif smb_sn: data["serial"] = smb_sn.group(1)
+
+            if firmware:
+                data["firmware"] = firmware
+            else:
+                # --- FIRMWARE FIX ---
+                # Pattern 1: "Version 15.2(4)E" (IOS Standard)
+                # Pattern 2: "Version: 1.4.2.02" (SMB Standard - Note the colon)
+                # Pattern 3: "SW version    : 2.5.0.83" (Some Catalyst types)
+
+                fw_patterns = [
+                    r"Version\s+([0-9a-zA-Z\.\(\)\-]+)",      # IOS
+                    r"Version:\s*([0-9a-zA-Z\.\(\)\-]+)",     # SMB
+                    r"SW [Vv]ersion\s*:\s*([0-9a-zA-Z\.\(\)\-]+)" # Fallback
+                ]
+
+                # Known-good variant first; a miss invalidates the fingerprint
+                fw_order = list(range(len(fw_patterns)))
+                fw_known = self.fingerprint.pattern(self.host, "firmware")
+                if fw_known in fw_order:
+                    fw_order.remove(fw_known)
+                    fw_order.insert(0, fw_known)
+
+                for idx in fw_order:
+                    fw_match = re.search(fw_patterns[idx], ver_out, re.IGNORECASE)
+                    if fw_match:
+                        data["firmware"] = fw_match.group(1)
+                        if idx != fw_known:
+                            if fw_known is not None: self.fingerprint.invalidate(self.host)
+                            self.fingerprint.record_pattern(self.host, "firmware", idx)
+                        break
+                else:
+                    if fw_known is not None: self.fingerprint.invalidate(self.host)
+
+            # Uptime
+            if not uptime:
+                up_match = re.search(r"uptime is (.*)", ver_out, re.IGNORECASE)
+                if up_match: uptime = up_match.group(1)
+            if uptime:
+                raw_up = uptime.split(', ')
+                data["uptime"] = ", ".join(raw_up[:2])
+        except: pass
+
+    def _parse_mac(self, connection, data, ver_out, sys_out):
+        try:
+            # Try 'show system' (SMB) then 'show version' (IOS),
+            # skipping straight to the variant that matched last time
+            mac_known = self.fingerprint.pattern(self.host, "mac")
+            mac_variant = None
+            sys_mac = re.search(r"System MAC Address:\s*([0-9a-fA-F:.]+)", sys_out, re.IGNORECASE)
+            if sys_out: self.fingerprint.record_command(self.host, "show system", bool(sys_mac))
+            
+            if sys_mac:
+                data["mac"] = self._normalize_mac(sys_mac.group(1))
+                mac_variant = "system"
+            else:
+                base_mac = re.search(r"Base [Ee]thernet MAC [Aa]ddress\s*:\s*([0-9a-fA-F:.]+)", ver_out, re.IGNORECASE)
+                if base_mac:
+                    data["mac"] = self._normalize_mac(base_mac.group(1))
+                    mac_variant = "version"
+                else:
+                    # Final Fallback: Vlan1
+                    int_out = self._send_known(connection, "show interface Vlan1")
+                    int_mac = re.search(r"address is ([0-9a-fA-F:.]+)", int_out)
+                    if int_mac:
+                        data["mac"] = self._normalize_mac(int_mac.group(1))
+                        mac_variant = "vlan1"
+
+            if mac_variant != mac_known:
+                if mac_known is not None: self.fingerprint.invalidate(self.host)
+                if mac_variant: self.fingerprint.record_pattern(self.host, "mac", mac_variant)
+        except: data["mac"] = "ONLINE"
+
+    def _parse_vlans(self, data, vlan_out, driver="cisco_ios"):
+        try:
+            vlan_ids = [v["vlan_id"] for v in parse(driver, "show vlan brief", vlan_out) if v.get("vlan_id")]
+            if not vlan_ids: vlan_ids = re.findall(r"^(\d+)\s+", vlan_out, re.MULTILINE)
+            data["vlans"] = vlan_ids if vlan_ids else ["1"]
+        except: pass
+
+    def _parse_port_errors(self, data, int_stats):
+        """
+        Lifetime counters go to 'port_counters'; only ports whose error rate is
+        rising, or still erroring above the floor, are flagged in 'port_errors'.
+        """
+        try:
+            counters = parse_interface_counters(int_stats)
+            if not counters: return
+            for port in get_port_counters().update(self.host, counters):
+                data["port_counters"][port.iface] = [port.crc, port.inputs]
+                if port.flagged: data["port_errors"].append(port.label())
+                else: data["port_errors_quiet"] += 1
+        except: pass
+
+    def _parse_poe(self, data, poe_out):
+        try:
+            used_match = re.search(r"Used\s*:\s*([\d\.]+)", poe_out, re.IGNORECASE)
+            avail_match = re.search(r"Available\s*:\s*([\d\.]+)", poe_out, re.IGNORECASE)
+
+            if not used_match:
+                # Try Table Format
+                table_match = re.search(r"\d+\s+([\d\.]+)\s+([\d\.]+)\s+[\d\.]+", poe_out)
+                if table_match:
+                    avail_val = float(table_match.group(1))
+                    used_val = float(table_match.group(2))
+                else:
+                    avail_val, used_val = 0.0, 0.0
+            else:
+                used_val = float(used_match.group(1))
+                avail_val = float(avail_match.group(1))
+
+            if avail_val > 0:
+                util_pct = (used_val / avail_val) * 100
+                data["poe"] = {
+                    "budget": f"{avail_val} W",
+                    "used": f"{used_val} W",
+                    "utilization": f"{util_pct:.1f}%",
+                    "status": "Active"
+                }
+            else:
+                data["poe"]["status"] = "No PoE Power"
+        except: 
+            data["poe"]["status"] = "Not Supported"
+
+    def _save_backup(self, data, config):
+        try:
+            if not config: return
+            # Versioned store: only writes when the (filtered) config changed
+            safe_ip = self.host.replace('.', '_')
+            saved = get_backup_store().put(f"switch_{safe_ip}", config)
+            data["backup_file"] = saved["path"]
+            data["backup_changed"] = saved["changed"]
+        except: pass
+
     def get_environment(self):
         """Preserved Temperature Check."""
         # Simple single-driver attempt for temp (speed optimization)
@@ -234,7 +428,10 @@ class CiscoSwitch:
             'timeout': 10
         }
         try:
-            with ConnectHandler(**device_config) as conn:
+            with get_pool().session(self.host, 'cisco_ios', self.username, self.password,
+                                    tcp_check.guard(self.host, 22, lambda: self.tracer.timed(self.host, "connect",
+                                                    lambda: ConnectHandler(**device_config), 'cisco_ios'))) as conn:
+                conn = self.tracer.wrap(conn, self.host)
                 try: conn.enable()
                 except: pass
                 out = conn.send_command("show environment temperature")
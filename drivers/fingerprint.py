@@ -0,0 +1,109 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.Fingerprint")
+
+DEFAULT_PATH = os.path.join("cache", "fingerprints.json")
+
+class FingerprintCache:
+    """
+    Per-Host Capability Fingerprints.
+
+    Remembers, per device, which netmiko driver type logged in, which
+    commands returned useful output and which regex variant matched, so the
+    next audit goes straight down the path that worked. Entries are dropped
+    as soon as that path stops working (connection or parse failure) and are
+    rediscovered on the following audit.
+
+    Format (cache/fingerprints.json):
+        {"10.0.0.1": {"driver": "cisco_ios",
+                      "commands": {"show system": false},
+                      "patterns": {"firmware": 0, "mac": "version"},
+                      "updated": 1760000000}}
+    """
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _entry(self, host):
+        entry = self._data.setdefault(host, {"driver": None, "commands": {}, "patterns": {}})
+        entry["updated"] = int(time.time())
+        self._dirty = True
+        return entry
+
+    def get(self, host):
+        with self._lock:
+            return json.loads(json.dumps(self._data.get(host, {})))
+
+    def driver(self, host):
+        with self._lock:
+            return self._data.get(host, {}).get("driver")
+
+    def pattern(self, host, field):
+        with self._lock:
+            return self._data.get(host, {}).get("patterns", {}).get(field)
+
+    def unsupported(self, host, command):
+        """True only if the command was tried on this host and gave nothing useful."""
+        with self._lock:
+            return self._data.get(host, {}).get("commands", {}).get(command) is False
+
+    def record_driver(self, host, driver_type):
+        with self._lock:
+            self._entry(host)["driver"] = driver_type
+
+    def record_command(self, host, command, useful):
+        with self._lock:
+            self._entry(host)["commands"][command] = bool(useful)
+
+    def record_pattern(self, host, field, variant):
+        with self._lock:
+            self._entry(host)["patterns"][field] = variant
+
+    def invalidate(self, host):
+        with self._lock:
+            if self._data.pop(host, None) is not None:
+                self._dirty = True
+                logger.info(f"Fingerprint invalidated for {host}")
+
+    def save(self):
+        """Atomic write (tmp + rename) so a crash never leaves a half-written cache."""
+        with self._lock:
+            if not self._dirty: return
+            snapshot = json.dumps(self._data, indent=2, sort_keys=True)
+            self._dirty = False
+        try:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder): os.makedirs(folder)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist fingerprints: {e}")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_fingerprints():
+    """Returns the process-wide fingerprint cache (saved at exit)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FingerprintCache(os.getenv("AFARA_FINGERPRINT_PATH", DEFAULT_PATH))
+            atexit.register(_cache.save)
+        return _cache
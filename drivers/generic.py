@@ -1,26 +1,36 @@
 import platform
 import subprocess
 from getmac import get_mac_address
+from drivers import icmp_sweep
 
 class GenericDevice:
-    def __init__(self, ip):
+    def __init__(self, ip, max_sweep_age=30.0):
         self.ip = ip
+        self.max_sweep_age = max_sweep_age
+
+    def _ping(self):
+        # Shared sweep result first, single 'ping' process as fallback
+        swept = icmp_sweep.lookup(self.ip, self.max_sweep_age)
+        if swept is not None:
+            return swept['online']
+
+        param = '-n' if platform.system().lower() == 'windows' else '-c'
+        command = ['ping', param, '1', '-w', '1000', self.ip]
+        
+        if platform.system().lower() == 'windows':
+             pass 
+        
+        response = subprocess.call(
+            command, 
+            stdout=subprocess.DEVNULL, 
+            stderr=subprocess.DEVNULL
+        )
+        return (response == 0)
 
     def check_status(self):
         try:
             # 1. Ping
-            param = '-n' if platform.system().lower() == 'windows' else '-c'
-            command = ['ping', param, '1', '-w', '1000', self.ip]
-            
-            if platform.system().lower() == 'windows':
-                 pass 
-            
-            response = subprocess.call(
-                command, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL
-            )
-            is_online = (response == 0)
+            is_online = self._ping()
 
             # 2. MAC Lookup
             mac_str = "Unknown"
@@ -1,9 +1,12 @@
 import requests
 import logging
 import re
-import os
 import subprocess
 import platform
+from drivers import tiers, tcp_check
+from drivers.latency import get_latency
+from drivers.instrument import get_tracer
+from drivers.backup_store import get_backup_store
 
 # Setup Module Logger
 logger = logging.getLogger("Afara.GudeDriver")
@@ -19,6 +22,8 @@ class GudeAuditor:
         self.url_backup = f"http://{self.ip}/config.txt"
         
         self.auth = (self.username, self.password) if self.username and self.password else None
+        self.latency = get_latency()
+        self.tracer = get_tracer()
 
     def _normalize_mac(self, mac_raw):
         """Standardizes MAC to XX:XX:XX:XX:XX:XX format."""
@@ -42,8 +47,11 @@ class GudeAuditor:
         except: pass
         return "N/A"
 
-    def audit_firmware_and_config(self):
-        """Main entry point for Gude Audit."""
+    def audit_firmware_and_config(self, depth=tiers.DEEP):
+        """
+        Main entry point for Gude Audit.
+        HEARTBEAT: status.json (firmware, outlets, V/A) | STANDARD: + ARP MAC fallback | DEEP: + config backup
+        """
         audit_data = {
             "status": "FAIL",
             "firmware": "N/A",
@@ -57,8 +65,16 @@ class GudeAuditor:
         }
 
         try:
+            # 0. TCP PRE-CHECK (Dead PDUs fail here instead of waiting out the HTTP timeout)
+            tcp_check.require(self.ip, 80)
+
             # 1. FETCH STATUS
-            response = requests.get(self.url_status, auth=self.auth, timeout=5)
+            # Learned per-host (connect, read) timeouts (5s cold start)
+            timeout = (self.latency.connect_timeout(self.ip, "http", 5), self.latency.timeout(self.ip, "http", 5))
+            with self.tracer.span(self.ip, "http", "status.json") as span:
+                response = self.latency.timed(self.ip, "http", lambda: requests.get(
+                    self.url_status, auth=self.auth, timeout=timeout))
+                span.outcome = f"HTTP {response.status_code}"
             
             if response.status_code == 200:
                 audit_data["status"] = "PASS"
@@ -74,10 +90,12 @@ class GudeAuditor:
                 ipv4 = json_data.get("ipv4", {})
                 if "mac" in eth: audit_data['mac'] = self._normalize_mac(eth['mac'])
                 elif "mac" in ipv4: audit_data['mac'] = self._normalize_mac(ipv4['mac'])
-                else: audit_data['mac'] = self._get_mac_from_arp()
+                elif tiers.includes(depth, tiers.STANDARD):
+                    audit_data['mac'] = self.tracer.timed(self.ip, "arp", self._get_mac_from_arp)
 
                 # Serial (Use MAC)
                 audit_data['serial'] = audit_data['mac']
+                audit_data['uptime'] = "Online (HTTP)"
 
                 # Power Metrics
                 sensors = json_data.get("sensor_values", [])
@@ -100,18 +118,21 @@ class GudeAuditor:
                     name = out.get("name", f"Port {out.get('index')}")
                     status_list.append(f"{name}: {state}")
                 audit_data['port_status'] = status_list
-                
-                audit_data['uptime'] = "Online (HTTP)"
 
                 # 2. PERFORM BACKUP (Download config.txt)
+                if not tiers.includes(depth, tiers.DEEP):
+                    return audit_data
                 try:
-                    bkp_resp = requests.get(self.url_backup, auth=self.auth, timeout=10)
+                    # Learned separately from status.json: the config is a much larger transfer
+                    with self.tracer.span(self.ip, "http", "config.txt") as span:
+                        bkp_resp = self.latency.timed(self.ip, "http_config", lambda: requests.get(
+                            self.url_backup, auth=self.auth,
+                            timeout=(timeout[0], self.latency.timeout(self.ip, "http_config", 10))))
+                        span.outcome = f"HTTP {bkp_resp.status_code}"
                     if bkp_resp.status_code == 200:
-                        if not os.path.exists("backups"): os.makedirs("backups")
-                        filename = f"backups/gude_{self.ip}.txt"
-                        with open(filename, "wb") as f:
-                            f.write(bkp_resp.content)
-                        audit_data['backup_file'] = filename
+                        saved = get_backup_store().put(f"gude_{self.ip}", bkp_resp.content)
+                        audit_data['backup_file'] = saved['path']
+                        audit_data['backup_changed'] = saved['changed']
                 except Exception:
                     # Silently ignore backup failure
                     pass
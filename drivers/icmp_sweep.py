@@ -0,0 +1,203 @@
+import os
+import select
+import socket
+import struct
+import threading
+import time
+import logging
+
+from drivers.rate_limit import get_rate_limiter
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.ICMPSweep")
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+def _checksum(data):
+    """RFC 1071 Internet checksum."""
+    if len(data) % 2: data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+class SweepResult:
+    """Per-host reachability from one sweep: {ip: {'online': bool, 'rtt_ms': float|None}}."""
+    def __init__(self, hosts, taken_at=None):
+        self.hosts = hosts
+        self.taken_at = taken_at or time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.taken_at
+
+    def get(self, ip):
+        return self.hosts.get(ip)
+
+class ICMPSweeper:
+    """
+    Batched ICMP Echo Engine.
+
+    Sends one echo request per host from a single socket and matches the
+    replies by identifier/sequence, so a whole inventory is swept in roughly
+    one timeout instead of one 'ping' process per device. Sends are paced
+    per subnet by the probe rate limiter's 'icmp' bucket (replies are read
+    while later sends wait their turn).
+
+    Socket Strategy:
+    1. Unprivileged ICMP datagram socket (Linux ping_group_range / macOS).
+    2. Raw ICMP socket (root / CAP_NET_RAW).
+    If neither is available, sweep() returns None and callers fall back to
+    the ping binary.
+    """
+    def __init__(self, timeout=1.0, retries=1):
+        self.timeout = timeout
+        self.retries = retries
+        self._ident = (os.getpid() ^ id(self)) & 0xFFFF
+
+    def _open_socket(self):
+        for sock_type in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+                sock.setblocking(False)
+                try: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+                except OSError: pass
+                return sock, sock_type == socket.SOCK_RAW
+            except (PermissionError, OSError):
+                continue
+        return None, False
+
+    def _packet(self, seq):
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self._ident, seq)
+        payload = struct.pack("!d", time.monotonic())
+        csum = _checksum(header + payload)
+        return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, self._ident, seq) + payload
+
+    def _resolve(self, hosts):
+        resolved = {}
+        for host in hosts:
+            try: resolved[host] = socket.gethostbyname(host)
+            except (socket.gaierror, UnicodeError): resolved[host] = None
+        return resolved
+
+    def sweep(self, hosts):
+        """Sweeps all hosts in one pass. Returns SweepResult, or None if ICMP sockets are unavailable."""
+        sock, is_raw = self._open_socket()
+        if sock is None:
+            return None
+
+        hosts = list(dict.fromkeys(hosts))
+        resolved = self._resolve(hosts)
+        results = {h: {"online": False, "rtt_ms": None} for h in hosts}
+
+        # Sequence numbers identify the host; the address confirms it
+        # (datagram sockets rewrite the identifier to the local port).
+        by_seq = {}
+        for seq, host in enumerate(hosts, start=1):
+            if resolved[host]: by_seq[seq & 0xFFFF] = host
+        pending = set(by_seq)
+        sent_at = {}
+
+        limiter = get_rate_limiter()
+        try:
+            for attempt in range(self.retries + 1):
+                if not pending: break
+                # Send schedule: each request waits for its subnet's token
+                now = time.monotonic()
+                queue = sorted((now + limiter.reserve(resolved[by_seq[seq]], "icmp"), seq) for seq in pending)
+                deadline = now + self.timeout
+                while pending:
+                    now = time.monotonic()
+                    while queue and queue[0][0] <= now:
+                        _, seq = queue.pop(0)
+                        if seq not in pending: continue
+                        try:
+                            sock.sendto(self._packet(seq), (resolved[by_seq[seq]], 0))
+                            sent_at[seq] = time.monotonic()
+                            deadline = sent_at[seq] + self.timeout
+                        except OSError:
+                            # Unroutable / buffer full: leave it pending for the retry pass
+                            continue
+
+                    # Wake for the next scheduled send, or wait out the last one's timeout
+                    until = queue[0][0] if queue else deadline
+                    remaining = until - time.monotonic()
+                    if remaining <= 0 and not queue: break
+                    ready, _, _ = select.select([sock], [], [], max(0.0, remaining))
+                    if not ready: continue
+                    while True:
+                        try:
+                            packet, addr = sock.recvfrom(2048)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        except OSError:
+                            break
+                        received = time.monotonic()
+                        if packet and packet[0] >> 4 == 4:
+                            # IPv4 header present: raw sockets, and macOS datagram sockets too
+                            packet = packet[(packet[0] & 0x0F) * 4:]
+                        if len(packet) < 8: continue
+                        icmp_type, _, _, ident, seq = struct.unpack("!BBHHH", packet[:8])
+                        if icmp_type != ICMP_ECHO_REPLY or seq not in pending: continue
+                        if is_raw and ident != self._ident: continue
+                        host = by_seq[seq]
+                        if addr[0] != resolved[host]: continue
+                        pending.discard(seq)
+                        results[host] = {
+                            "online": True,
+                            "rtt_ms": round((received - sent_at[seq]) * 1000, 2)
+                        }
+        finally:
+            sock.close()
+
+        return SweepResult(results)
+
+# ==================================================
+# SHARED SWEEP RESULT (Read by PingDriver / GenericDevice)
+# ==================================================
+_latest = {}  # ip -> (entry, taken_at)
+_latest_lock = threading.Lock()
+
+def publish(result):
+    """Stores a sweep so drivers can read it without probing again."""
+    if result is None: return
+    with _latest_lock:
+        for ip, entry in result.hosts.items():
+            _latest[ip] = (entry, result.taken_at)
+
+def lookup(ip, max_age):
+    """Returns the shared sweep entry for ip if it is fresh enough, else None."""
+    with _latest_lock:
+        cached = _latest.get(ip)
+    if cached is None or time.monotonic() - cached[1] > max_age:
+        return None
+    return cached[0]
+
+def sweep_and_publish(hosts, timeout=1.0):
+    """Convenience wrapper used by the orchestrator and live monitor."""
+    if not hosts: return None
+    try:
+        result = ICMPSweeper(timeout=timeout).sweep(hosts)
+    except Exception as e:
+        logger.warning(f"ICMP sweep failed: {e}")
+        return None
+    publish(result)
+    return result
+
+class SweepRefresher(threading.Thread):
+    """Background thread that re-sweeps a host list every interval seconds."""
+    def __init__(self, hosts, interval=15.0, timeout=1.0):
+        super().__init__(daemon=True, name="afara-icmp-sweep")
+        self.hosts = list(hosts)
+        self.interval = interval
+        self.timeout = timeout
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            sweep_and_publish(self.hosts, self.timeout)
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop_event.set()
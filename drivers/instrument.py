@@ -0,0 +1,211 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.Instrument")
+
+DEFAULT_EXPORT = os.path.join("cache", "spans.jsonl")
+MAX_SPANS = 100000        # Oldest spans are dropped beyond this (long live loops)
+
+# Connection methods timed by Tracer.wrap() (netmiko)
+TIMED_METHODS = {
+    "send_command": "command",
+    "send_command_timing": "command",
+    "send_config_set": "config",
+    "enable": "enable",
+}
+
+class Span:
+    """One timed driver operation. 'outcome' may be overridden inside the with-block."""
+    __slots__ = ("tracer", "device", "op", "command", "started", "seconds", "outcome", "error", "_t0")
+
+    def __init__(self, tracer, device, op, command=None):
+        self.tracer = tracer
+        self.device = device
+        self.op = op
+        self.command = command
+        self.outcome = None
+        self.error = None
+
+    def __enter__(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._t0
+        if exc_type is not None:
+            self.outcome = "error"
+            self.error = f"{exc_type.__name__}: {exc}"[:200]
+        elif self.outcome is None:
+            self.outcome = "ok"
+        self.tracer._add(self)
+        return False
+
+    def as_dict(self):
+        return {"ts": round(self.started, 3), "device": self.device, "op": self.op, "command": self.command,
+                "seconds": round(self.seconds, 4), "outcome": self.outcome, "error": self.error}
+
+class _NoSpan:
+    """Shared do-nothing span handed out while tracing is off."""
+    outcome = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+NO_SPAN = _NoSpan()
+
+class _TracedConnection:
+    """Delegates to a netmiko connection, timing the command methods only."""
+    __slots__ = ("_conn", "_device", "_tracer")
+
+    def __init__(self, conn, device, tracer):
+        self._conn = conn
+        self._device = device
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        attr = getattr(self._conn, name)
+        op = TIMED_METHODS.get(name)
+        if op is None:
+            return attr
+
+        def timed(*args, **kwargs):
+            command = args[0] if args else kwargs.get("command_string")
+            if isinstance(command, (list, tuple)): command = "; ".join(command)
+            with self._tracer.span(self._device, op, command):
+                return attr(*args, **kwargs)
+        return timed
+
+class Tracer:
+    """
+    Driver Instrumentation (Spans).
+
+    Drivers wrap connection setup, every CLI command and every HTTP call in
+    a span recording device, operation, command, duration and outcome. The
+    commissioning footer summarizes the slowest devices and commands, and
+    the raw spans can be exported as JSON lines for offline analysis.
+    """
+    enabled = True
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def _add(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def span(self, device, op, command=None):
+        return Span(self, device, op, command)
+
+    def timed(self, device, op, fn, command=None):
+        with self.span(device, op, command):
+            return fn()
+
+    def wrap(self, conn, device):
+        return _TracedConnection(conn, device, self)
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+
+    # ==================================================
+    # SUMMARIES
+    # ==================================================
+    def slowest_devices(self, limit=5):
+        """[(device, total seconds, spans, slowest op), ...] by total time spent."""
+        totals = {}
+        for s in self.spans():
+            total, count, worst = totals.get(s.device, (0.0, 0, None))
+            if worst is None or s.seconds > worst.seconds: worst = s
+            totals[s.device] = (total + s.seconds, count + 1, worst)
+        ranked = sorted(totals.items(), key=lambda kv: kv[1][0], reverse=True)[:limit]
+        return [(device, total, count, f"{worst.op} {worst.command or ''}".strip())
+                for device, (total, count, worst) in ranked]
+
+    def slowest_commands(self, limit=5):
+        """[(op, command, calls, avg seconds, max seconds, failures), ...] by worst single call."""
+        stats = {}
+        for s in self.spans():
+            key = (s.op, s.command)
+            calls, total, worst, failures = stats.get(key, (0, 0.0, 0.0, 0))
+            stats[key] = (calls + 1, total + s.seconds, max(worst, s.seconds),
+                          failures + (s.outcome not in ("ok", None)))
+        ranked = sorted(stats.items(), key=lambda kv: kv[1][2], reverse=True)[:limit]
+        return [(op, command, calls, total / calls, worst, failures)
+                for (op, command), (calls, total, worst, failures) in ranked]
+
+    def export(self, path=None):
+        """Writes every span as one JSON object per line. Returns the path, or None."""
+        path = path or os.getenv("AFARA_TRACE_EXPORT", DEFAULT_EXPORT)
+        spans = self.spans()
+        try:
+            folder = os.path.dirname(path)
+            if folder and not os.path.exists(folder): os.makedirs(folder)
+            with open(path, "w") as f:
+                for s in spans:
+                    f.write(json.dumps(s.as_dict()) + "\n")
+            return path
+        except OSError as e:
+            logger.warning(f"Could not export spans: {e}")
+            return None
+
+class NullTracer:
+    """Tracing disabled: no spans, no wrapping, one extra call per operation."""
+    enabled = False
+
+    def span(self, device, op, command=None):
+        return NO_SPAN
+
+    def timed(self, device, op, fn, command=None):
+        return fn()
+
+    def wrap(self, conn, device):
+        return conn
+
+    def spans(self):
+        return []
+
+    def reset(self):
+        pass
+
+    def slowest_devices(self, limit=5):
+        return []
+
+    def slowest_commands(self, limit=5):
+        return []
+
+    def export(self, path=None):
+        return None
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer():
+    """Returns the process-wide tracer (a NullTracer unless AFARA_TRACE is on)."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            if os.getenv("AFARA_TRACE", "0").lower() in ("1", "true", "yes", "on"):
+                _tracer = Tracer()
+                # Live-loop spans are included in the final export
+                atexit.register(_tracer.export)
+            else:
+                _tracer = NullTracer()
+        return _tracer
@@ -5,17 +5,23 @@ import time
 import urllib.request
 
 class ISPAuditor:
-    def __init__(self):
+    def __init__(self, quiet=False):
         self.logger = logging.getLogger("Afara.ISP")
+        # Quiet: progress goes to the log instead of stdout (background runs)
+        self.quiet = quiet
+
+    def _progress(self, message):
+        if self.quiet: self.logger.info(message.strip(" >"))
+        else: print(message)
 
     def check_connectivity(self, host="8.8.8.8", port=53, timeout=3):
         """
         Simple check to see if we can reach the outside world.
         """
         try:
-            socket.setdefaulttimeout(timeout)
-            socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
-            return True
+            # Per-socket timeout: never touch the process-wide default while audits run
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
         except Exception:
             return False
 
@@ -60,7 +66,7 @@ class ISPAuditor:
             'error': None
         }
 
-        print("   > Contacting Speedtest Servers...")
+        self._progress("   > Contacting Speedtest Servers...")
 
         # --- ATTEMPT 1: OOKLA SPEEDTEST ---
         try:
@@ -73,9 +79,9 @@ class ISPAuditor:
             stats['public_ip'] = config['client']['ip']
             
             # Speed
-            print("   > Measuring Download Speed (Ookla)...")
+            self._progress("   > Measuring Download Speed (Ookla)...")
             dl = st.download()
-            print("   > Measuring Upload Speed (Ookla)...")
+            self._progress("   > Measuring Upload Speed (Ookla)...")
             ul = st.upload()
             
             stats['download_mbps'] = round(dl / 1_000_000, 2)
@@ -88,7 +94,7 @@ class ISPAuditor:
             self.logger.warning(f"Ookla Failed ({e}). Switching to Fallback...")
 
         # --- ATTEMPT 2: HTTP DOWNLOAD FALLBACK ---
-        print("   > Attempting HTTP Download Fallback...")
+        self._progress("   > Attempting HTTP Download Fallback...")
         http_speed = self._measure_http_speed()
         
         if http_speed:
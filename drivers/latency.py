@@ -0,0 +1,161 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.Latency")
+
+DEFAULT_PATH = os.path.join("cache", "latency.json")
+
+# Learning Parameters
+MAX_SAMPLES = 50          # Rolling window per host/kind
+MIN_SAMPLES = 3           # Below this, the driver constants apply (cold start)
+MARGIN = 2.0              # timeout = p99 * MARGIN + FLOOR
+FLOOR = 1.0
+DEAD_AFTER = 2            # Consecutive timeouts before a host is treated as dead
+DEAD_TIMEOUT = 3.0        # Connect budget for a host that keeps timing out
+DEAD_RETRY = 600.0        # Seconds between full cold-start connect attempts to a dead host
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+class LatencyTracker:
+    """
+    Per-Host Latency History.
+
+    Records how long each host takes to complete a handshake ('handshake',
+    'http') and to answer a command ('command'), persists it to
+    cache/latency.json, and turns it into per-host timeouts and netmiko delay
+    factors. The hard-coded driver constants are only used until a host has
+    enough history. A host that keeps timing out is given a short TCP
+    connect budget instead of the full constant every cycle (auth and banner
+    waits keep their learned values), with a full cold-start attempt every
+    DEAD_RETRY seconds so it can come back.
+    """
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _slot(self, host, kind):
+        return self._data.setdefault(host, {}).setdefault(kind, {"samples": [], "failures": 0})
+
+    def record(self, host, kind, seconds):
+        with self._lock:
+            slot = self._slot(host, kind)
+            slot["samples"] = (slot["samples"] + [round(seconds, 4)])[-MAX_SAMPLES:]
+            slot["failures"] = 0
+            self._dirty = True
+
+    def record_failure(self, host, kind):
+        with self._lock:
+            slot = self._slot(host, kind)
+            slot["failures"] += 1
+            # Declared dead now: the next full attempt is DEAD_RETRY away
+            if slot["failures"] == DEAD_AFTER: slot["retried"] = time.time()
+            self._dirty = True
+
+    def timeout(self, host, kind, default):
+        """p99 * margin (+ floor) once learned; the driver constant on cold start."""
+        with self._lock:
+            slot = self._data.get(host, {}).get(kind)
+            if not slot: return default
+            samples = list(slot["samples"])
+        if len(samples) < MIN_SAMPLES:
+            return default
+        learned = _percentile(samples, 99) * MARGIN + FLOOR
+        # Never more than twice the legacy constant, never below the floor
+        return round(max(FLOOR, min(learned, default * 2)), 2)
+
+    def connect_timeout(self, host, kind, default):
+        """
+        TCP connect budget: timeout() for a live host, DEAD_TIMEOUT once it
+        keeps timing out. Every DEAD_RETRY seconds a dead host gets the
+        driver constant again so a slow-but-alive host can recover.
+        """
+        with self._lock:
+            slot = self._data.get(host, {}).get(kind)
+            if slot and slot["failures"] >= DEAD_AFTER:
+                now = time.time()
+                if now - slot.get("retried", 0) < DEAD_RETRY:
+                    return min(default, DEAD_TIMEOUT)
+                slot["retried"] = now
+                self._dirty = True
+                return default
+        return self.timeout(host, kind, default)
+
+    def percentile(self, host, kind, pct=99):
+        """Learned latency percentile in seconds, or None until the host has enough history."""
+        with self._lock:
+            slot = self._data.get(host, {}).get(kind)
+            samples = list(slot["samples"]) if slot else []
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return _percentile(samples, pct)
+
+    def delay_factor(self, host, default):
+        """Maps observed command latency onto a netmiko global_delay_factor."""
+        with self._lock:
+            slot = self._data.get(host, {}).get("command")
+            samples = list(slot["samples"]) if slot else []
+        if len(samples) < MIN_SAMPLES:
+            return default
+        p99 = _percentile(samples, 99)
+        if p99 < 0.5: return 1
+        if p99 < 2.0: return min(default, 2)
+        return default
+
+    def timed(self, host, kind, fn):
+        """Runs fn(), recording its duration (or a timeout failure)."""
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            # Pre-check verdicts never reached the handshake: not a handshake timeout
+            if getattr(e, "precheck", False): raise
+            if "timed out" in str(e).lower() or "timeout" in type(e).__name__.lower():
+                self.record_failure(host, kind)
+            raise
+        self.record(host, kind, time.monotonic() - started)
+        return result
+
+    def save(self):
+        """Atomic write (tmp + rename)."""
+        with self._lock:
+            if not self._dirty: return
+            snapshot = json.dumps(self._data, sort_keys=True)
+            self._dirty = False
+        try:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder): os.makedirs(folder)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist latency history: {e}")
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+def get_latency():
+    """Returns the process-wide latency tracker (saved at exit)."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = LatencyTracker(os.getenv("AFARA_LATENCY_PATH", DEFAULT_PATH))
+            atexit.register(_tracker.save)
+        return _tracker
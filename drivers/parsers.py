@@ -0,0 +1,182 @@
+import logging
+import os
+import re
+import threading
+import time
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.Parsers")
+
+# ==================================================
+# REGEX FALLBACKS (platforms/commands without a template)
+# ==================================================
+_IPV4_RE = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
+_CRESNET_RE = re.compile(r"^(\d{2}|[0-9A-F]{2})\s+:\s+(.+)", re.MULTILINE)
+
+def _ip_addresses(text):
+    """Every IPv4 address in the output."""
+    return [{"ip_address": ip} for ip in _IPV4_RE.findall(text)]
+
+def _crestron_cresnet(text):
+    return [{"id": dev_id, "type": dev_type.strip()} for dev_id, dev_type in _CRESNET_RE.findall(text)]
+
+def _crestron_autodiscovery(text):
+    """'10.20.30.100 :  C : NAX-01 : DM-NAX-8ZSA [v3...] @E-c4...' -> one record per device."""
+    records = []
+    for line in text.splitlines():
+        if ":" not in line or "IP Address" in line: continue
+        parts = line.split(":")
+        if len(parts) < 4: continue
+        model_raw = parts[3].strip()
+        records.append({
+            "ip_address": parts[0].strip(),
+            "ip_id": parts[1].strip(),
+            "hostname": parts[2].strip(),
+            # Clean up model (remove [version] garbage)
+            "model": model_raw.split('[')[0].strip(),
+        })
+    return records
+
+# (platform, command prefix) -> fn(text) -> [records]
+FALLBACKS = {
+    ("cisco_ios", "show ip interface brief"): _ip_addresses,
+    ("draytek", "ip route status"): _ip_addresses,
+    ("crestron", "reportcresnet"): _crestron_cresnet,
+    ("crestron", "autodiscover query table"): _crestron_autodiscovery,
+}
+
+class TemplateIndex:
+    """
+    Structured CLI Parsing (TextFSM / ntc_templates).
+
+    The ntc_templates index is read once per process and every
+    (platform, command) lookup is resolved once; the matching TextFSM
+    template is compiled on first use and reused afterwards. Records are
+    dicts keyed by the template's lower-cased value names (the same shape
+    ntc_templates' parse_output returns). Commands without a template, or
+    whose output the template rejects, go to the regex fallbacks above;
+    with no fallback either, parse() returns [] and the driver keeps its
+    own regexes.
+    """
+    def __init__(self, template_dir=None, enabled=True):
+        self.template_dir = template_dir
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._table = None          # clitable.CliTable; False once loading failed
+        self._lookups = {}          # (platform, command) -> template file or None
+        self._compiled = {}         # template file -> (TextFSM, [field names], Lock)
+        self.stats = {"template": 0, "fallback": 0, "miss": 0, "errors": 0}
+        self.load_seconds = 0.0
+
+    def _load_table(self):
+        """Reads the template index (textfsm/ntc_templates imported here, not at module load)."""
+        if self._table is not None: return self._table
+        t_start = time.perf_counter()
+        try:
+            from textfsm import clitable
+            folder = self.template_dir
+            if folder is None:
+                import ntc_templates
+                folder = os.getenv("NTC_TEMPLATES_DIR") or os.path.join(os.path.dirname(ntc_templates.__file__),
+                                                                         "templates")
+            self.template_dir = folder
+            self._table = clitable.CliTable("index", folder)
+        except Exception as e:
+            logger.warning(f"TextFSM templates unavailable, using regex parsers only: {e}")
+            self._table = False
+        self.load_seconds = time.perf_counter() - t_start
+        return self._table
+
+    def template_for(self, platform, command):
+        """Template file name for a platform/command, or None. Cached per process."""
+        key = (platform, command)
+        try:
+            return self._lookups[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._lookups:
+                template = None
+                table = self._load_table() if self.enabled else False
+                if table:
+                    row = table.index.GetRowMatch({"Platform": platform, "Command": command})
+                    if row:
+                        # Multi-template rows ('a.textfsm:b.textfsm') are rare; the first one wins
+                        template = table.index.index[row]["Template"].split(":")[0].strip()
+                self._lookups[key] = template
+            return self._lookups[key]
+
+    def _compile(self, template):
+        entry = self._compiled.get(template)
+        if entry is not None: return entry
+        with self._lock:
+            if template not in self._compiled:
+                import textfsm
+                with open(os.path.join(self.template_dir, template)) as f:
+                    fsm = textfsm.TextFSM(f)
+                # A TextFSM instance carries parse state, so each one gets its own lock
+                self._compiled[template] = (fsm, [name.lower() for name in fsm.header], threading.Lock())
+            return self._compiled[template]
+
+    def parse_template(self, platform, command, text):
+        """Template records, or None if there is no template or it rejected the output."""
+        template = self.template_for(platform, command)
+        if template is None: return None
+        try:
+            fsm, fields, lock = self._compile(template)
+            with lock:
+                fsm.Reset()
+                rows = fsm.ParseText(text)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.debug(f"{template} rejected output: {e}")
+            return None
+        return [dict(zip(fields, row)) for row in rows]
+
+    def parse_fallback(self, platform, command, text):
+        """Regex fallback records, or None if no fallback is registered."""
+        for (fb_platform, prefix), fn in FALLBACKS.items():
+            if fb_platform == platform and command.startswith(prefix):
+                return fn(text)
+        return None
+
+    def parse(self, platform, command, text):
+        """
+        Output of 'command' on 'platform' -> [records].
+        Template first, then the regex fallback; [] if neither applies.
+        """
+        if not text: return []
+        records = self.parse_template(platform, command, text)
+        if records:
+            self.stats["template"] += 1
+            return records
+        records = self.parse_fallback(platform, command, text)
+        if records is not None:
+            self.stats["fallback"] += 1
+            return records
+        self.stats["miss"] += 1
+        return []
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_parsers():
+    """Returns the process-wide template index (AFARA_TEXTFSM=0 keeps to the regex parsers)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            enabled = os.getenv("AFARA_TEXTFSM", "1").lower() not in ("0", "false", "no", "off")
+            _index = TemplateIndex(enabled=enabled)
+        return _index
+
+def parse(platform, command, text):
+    """Shortcut: get_parsers().parse(...)."""
+    return get_parsers().parse(platform, command, text)
+
+def first(records, field, default=None):
+    """First non-empty value of a field; list values (SERIAL, HARDWARE) yield their first item."""
+    for record in records:
+        value = record.get(field)
+        if isinstance(value, list): value = value[0] if value else None
+        if value: return value
+    return default
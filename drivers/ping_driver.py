@@ -1,11 +1,29 @@
 import platform
 import subprocess
+from drivers import icmp_sweep
+from drivers.rate_limit import get_rate_limiter
 
 class PingDriver:
-    def __init__(self, ip):
+    def __init__(self, ip, max_sweep_age=30.0):
         self.ip = ip
+        self.max_sweep_age = max_sweep_age
 
     def check_status(self):
+        # Shared sweep result (one ICMP pass for the whole inventory)
+        swept = icmp_sweep.lookup(self.ip, self.max_sweep_age)
+        if swept is not None:
+            is_online = swept['online']
+            return {
+                "online": is_online,
+                "serial": "---",
+                "mac": "ONLINE" if is_online else "OFFLINE",
+                "rtt_ms": swept['rtt_ms'],
+                "error": None
+            }
+
+        # Per-host fallback ping (paced per subnet like the session transports)
+        get_rate_limiter().acquire(self.ip, "icmp")
+
         # Detect OS
         system = platform.system().lower()
         
@@ -0,0 +1,163 @@
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.PortCounters")
+
+DEFAULT_PATH = os.path.join("cache", "port_counters.json")
+
+# Rate Parameters
+SMOOTHING = 0.3           # EWMA weight of the newest window
+RISING_FACTOR = 1.2       # Flag when the window rate beats the smoothed rate by 20%
+DEFAULT_ERROR_FLOOR = 6.0 # Errors/hour; a sustained rate at or above this is flagged even when flat
+MIN_WINDOW = 1.0          # Seconds; shorter windows are ignored (double polls)
+
+# One pass over the whole 'show interfaces' text: headers and counter lines in order.
+# Every alternative starts at a line break, so the scanner only tries line starts.
+_COUNTERS_RE = re.compile(
+    r"\n(?:(\S+) [^\n]*?line protocol is"
+    r"|[ \t]*(\d+) input errors[^\n]*?(\d+) CRC)")
+
+def parse_interface_counters(text):
+    """'show interfaces' -> {iface: (crc, input_errors)} in a single regex scan."""
+    counters = {}
+    iface = "Unknown"
+    for match in _COUNTERS_RE.finditer("\n" + (text or "")):
+        name = match.group(1)
+        if name is not None:
+            iface = name
+        else:
+            counters[iface] = (int(match.group(3)), int(match.group(2)))
+    return counters
+
+class PortAssessment:
+    """Delta/rate of one interface between two snapshots."""
+    __slots__ = ("iface", "crc", "inputs", "delta_crc", "delta_inputs", "rate", "state")
+
+    def __init__(self, iface, crc, inputs, delta_crc=0, delta_inputs=0, rate=0.0, state="baseline"):
+        self.iface = iface
+        self.crc = crc
+        self.inputs = inputs
+        self.delta_crc = delta_crc
+        self.delta_inputs = delta_inputs
+        self.rate = rate        # errors/hour (CRC + input) over the last window
+        self.state = state      # baseline | reset | quiet | steady | erroring | rising
+
+    @property
+    def rising(self):
+        return self.state == "rising"
+
+    @property
+    def flagged(self):
+        """Reported: accelerating, or still erroring at a sustained rate above the floor."""
+        return self.state in ("rising", "erroring")
+
+    def label(self):
+        """Report/dashboard text (starts with the lifetime counters the metrics parser reads)."""
+        return (f"{self.iface} (CRC:{self.crc}|In:{self.inputs}) "
+                f"+{self.delta_crc} CRC/+{self.delta_inputs} In, {self.rate:.1f}/h {self.state}")
+
+class PortCounterStore:
+    """
+    Per-Interface Error Counter Snapshots.
+
+    Keeps the last CRC / input-error counters seen on every switch port
+    (cache/port_counters.json) and turns consecutive snapshots into deltas
+    and an errors-per-hour rate with a smoothed history (seeded with the
+    first measured rate). Ports whose current rate climbs above their own
+    history are 'rising'; ports still erroring at or above the floor are
+    'erroring' even when the rate is flat, so a persistently bad port stays
+    on the report. Old lifetime counters that are no longer moving stay
+    quiet. A counter that goes backwards (reload, 'clear counters') starts a
+    new baseline.
+
+    Format: {"10.0.0.1": {"Gi1/0/1": {"ts": 1760000000.0, "crc": 3, "input": 3, "ewma": null}}}
+    """
+    def __init__(self, path=DEFAULT_PATH, error_floor=DEFAULT_ERROR_FLOOR):
+        self.path = path
+        self.error_floor = error_floor
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def update(self, host, counters, now=None):
+        """Stores a snapshot and returns [PortAssessment] for ports with any errors."""
+        now = now if now is not None else time.time()
+        out = []
+        with self._lock:
+            ports = self._data.setdefault(host, {})
+            for iface, (crc, inputs) in counters.items():
+                prev = ports.get(iface)
+                if prev is None or crc < prev["crc"] or inputs < prev["input"]:
+                    state = "baseline" if prev is None else "reset"
+                    ports[iface] = {"ts": now, "crc": crc, "input": inputs, "ewma": None}
+                    if crc or inputs: out.append(PortAssessment(iface, crc, inputs, state=state))
+                    continue
+
+                elapsed = now - prev["ts"]
+                if elapsed < MIN_WINDOW:
+                    continue
+                d_crc, d_in = crc - prev["crc"], inputs - prev["input"]
+                rate = (d_crc + d_in) * 3600 / elapsed
+                history = prev.get("ewma")
+                if history is None:
+                    # First measured window seeds the history (no acceleration to compare yet)
+                    history = rate
+
+                if not (d_crc or d_in): state = "quiet"
+                elif rate > history * RISING_FACTOR: state = "rising"
+                elif rate >= self.error_floor: state = "erroring"
+                else: state = "steady"
+
+                ports[iface] = {"ts": now, "crc": crc, "input": inputs,
+                                "ewma": round(rate * SMOOTHING + history * (1 - SMOOTHING), 4)}
+                if crc or inputs:
+                    out.append(PortAssessment(iface, crc, inputs, d_crc, d_in, rate, state))
+            self._dirty = True
+        return out
+
+    def forget(self, host):
+        with self._lock:
+            if self._data.pop(host, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Atomic write (tmp + rename)."""
+        with self._lock:
+            if not self._dirty: return
+            snapshot = json.dumps(self._data, sort_keys=True)
+            self._dirty = False
+        try:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder): os.makedirs(folder)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist port counters: {e}")
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_port_counters():
+    """Returns the process-wide port counter store (saved at exit)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PortCounterStore(os.getenv("AFARA_PORT_COUNTERS_PATH", DEFAULT_PATH),
+                                      float(os.getenv("AFARA_PORT_ERROR_FLOOR", DEFAULT_ERROR_FLOOR)))
+            atexit.register(_store.save)
+        return _store
@@ -0,0 +1,181 @@
+import ipaddress
+import logging
+import os
+import threading
+import time
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.RateLimit")
+
+# Limiter Defaults (Override via AFARA_RATE_LIMITS / AFARA_RATE_BURST / AFARA_RATE_GLOBAL / AFARA_RATE_PREFIX)
+DEFAULT_RATES = {      # New probes per second, per subnet (0 = unlimited)
+    "ssh": 4.0,
+    "http": 10.0,
+    "icmp": 50.0,
+}
+DEFAULT_PREFIX = 24
+
+# Driver family -> transport its probe opens
+TRANSPORTS = {
+    "cisco": "ssh",
+    "router": "ssh",
+    "crestron": "ssh",
+    "windows": "ssh",
+    "gude": "http",
+    "ping": "icmp",
+}
+
+def parse_rates(raw):
+    """Parses 'ssh=2,http=10' into {'ssh': 2.0, 'http': 10.0} (0 = unlimited)."""
+    rates = {}
+    for item in (raw or "").split(","):
+        if "=" not in item: continue
+        key, val = item.split("=", 1)
+        try: rates[key.strip().lower()] = max(0.0, float(val))
+        except ValueError: pass
+    return rates
+
+def subnet_of(ip, prefix=DEFAULT_PREFIX):
+    """'10.20.1.7' -> '10.20.1.0/24' (hostnames are their own bucket)."""
+    try:
+        return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+    except ValueError:
+        return str(ip)
+
+class TokenBucket:
+    """
+    Reservation-style token bucket. Each caller takes a token immediately and
+    is told how long to wait for it, so waiters are served in arrival order
+    and never spin on a lock.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst else rate)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+
+    def reserve(self, now):
+        """Takes one token (caller holds the limiter lock); returns seconds until it is valid."""
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+class _KeyStats:
+    """Queue depth and delay counters for one (subnet, transport) bucket."""
+    def __init__(self):
+        self.waiting = 0
+        self.peak = 0
+        self.granted = 0
+        self.delayed = 0
+        self.wait_s = 0.0
+        self.max_wait_s = 0.0
+
+class RateLimiter:
+    """
+    Per-Subnet / Per-Transport Probe Rate Limiter.
+
+    Parallel audits can open a hundred SSH handshakes (or config pulls) at
+    once against one management VLAN, and old SMB switches and routers drop
+    sessions under that burst. Every probe takes a token from its
+    (subnet, transport) bucket and from the optional global bucket first;
+    when a bucket is empty the probe waits its turn (backpressure) instead of
+    failing. Queue depth and waiting time are kept per bucket so rates can be
+    tuned against device stability.
+    """
+    def __init__(self, rates=None, burst=None, global_rate=0.0, prefix=DEFAULT_PREFIX):
+        self.rates = dict(DEFAULT_RATES)
+        self.rates.update(rates or {})
+        self.burst = burst or {}
+        self.global_rate = global_rate
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._buckets = {}     # (subnet, transport) -> TokenBucket
+        self._stats = {}       # (subnet, transport) -> _KeyStats
+        self._global = TokenBucket(global_rate) if global_rate > 0 else None
+
+    @property
+    def enabled(self):
+        return self._global is not None or any(rate > 0 for rate in self.rates.values())
+
+    def caps(self, transport):
+        """(per-subnet, global) burst sizes for 'transport'; None where unlimited. Bounds connect bursts."""
+        rate = self.rates.get(transport, 0)
+        subnet_cap = int(max(1.0, self.burst.get(transport) or rate)) if rate > 0 else None
+        global_cap = int(self._global.burst) if self._global is not None else None
+        return subnet_cap, global_cap
+
+    def acquire(self, ip, transport):
+        """Blocks until a probe of 'transport' to 'ip' may start. Returns the seconds waited."""
+        wait, stats = self._take(ip, transport, queued=True)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    stats.waiting -= 1
+        return wait
+
+    def reserve(self, ip, transport):
+        """
+        Non-blocking acquire for callers that pace their own sends (the ICMP
+        sweep): takes the token now and returns the seconds until it is valid.
+        """
+        return self._take(ip, transport, queued=False)[0]
+
+    def _take(self, ip, transport, queued):
+        rate = self.rates.get(transport, 0)
+        if rate <= 0 and self._global is None:
+            return 0.0, None
+        key = (subnet_of(ip, self.prefix), transport)
+
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if rate > 0:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(rate, self.burst.get(transport))
+                wait = bucket.reserve(now)
+            if self._global is not None:
+                wait = max(wait, self._global.reserve(now))
+            stats = self._stats.setdefault(key, _KeyStats())
+            stats.granted += 1
+            if wait > 0:
+                stats.delayed += 1
+                stats.wait_s += wait
+                stats.max_wait_s = max(stats.max_wait_s, wait)
+                if queued:
+                    stats.waiting += 1
+                    stats.peak = max(stats.peak, stats.waiting)
+        return wait, stats
+
+    def snapshot(self, reset_peaks=False):
+        """
+        [{'subnet', 'transport', 'waiting', 'peak', 'granted', 'delayed', 'wait_s', 'max_wait_s'}]
+        sorted by total wait. Counters are cumulative; reset_peaks starts a
+        new window for the peak queue depth (live-loop cycles).
+        """
+        with self._lock:
+            rows = []
+            for (subnet, transport), s in self._stats.items():
+                rows.append({"subnet": subnet, "transport": transport, "waiting": s.waiting, "peak": s.peak,
+                             "granted": s.granted, "delayed": s.delayed, "wait_s": round(s.wait_s, 3),
+                             "max_wait_s": round(s.max_wait_s, 3)})
+                if reset_peaks: s.peak = s.waiting
+        rows.sort(key=lambda r: r["wait_s"], reverse=True)
+        return rows
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Returns the process-wide probe rate limiter."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(parse_rates(os.getenv("AFARA_RATE_LIMITS")),
+                                   parse_rates(os.getenv("AFARA_RATE_BURST")),
+                                   float(os.getenv("AFARA_RATE_GLOBAL", 0)),
+                                   int(os.getenv("AFARA_RATE_PREFIX", DEFAULT_PREFIX)))
+        return _limiter
@@ -0,0 +1,46 @@
+"""
+Lazy Driver Registry.
+
+Maps the schedule's free-text 'driver' strings onto driver classes without
+importing them up front. A transport (netmiko, paramiko, requests, speedtest)
+is only imported the first time a device that needs it is compiled into a
+plan (core.plan.compile_plans, on the calling thread, before any audit
+worker starts), so a ping-only site or a report-only run never pays for the
+SSH stack.
+"""
+import importlib
+import threading
+
+# Family -> (module, class). Order of FAMILY_MATCH decides which substring wins.
+DRIVERS = {
+    "gude": ("drivers.gude_driver", "GudeAuditor"),
+    "crestron": ("drivers.crestron_driver", "CrestronAuditor"),
+    "windows": ("drivers.windows", "WindowsProbe"),
+    "router": ("drivers.router_auditor", "RouterAuditor"),
+    "cisco": ("drivers.cisco", "CiscoSwitch"),
+    "ping": ("drivers.ping_driver", "PingDriver"),
+    # Site-level probes (not schedule drivers)
+    "isp": ("drivers.isp_auditor", "ISPAuditor"),
+    "env": ("drivers.env_driver", "EnvDriver"),
+}
+
+FAMILY_MATCH = ("gude", "crestron", "windows", "router", "cisco")
+
+_resolved = {}
+_resolve_lock = threading.Lock()
+
+def family(driver):
+    """Maps a schedule driver string onto the dispatch branch that handles it."""
+    driver = str(driver or "").lower()
+    return next((name for name in FAMILY_MATCH if name in driver), "ping")
+
+def resolve(name):
+    """Returns the driver class for a family, importing its module on first use."""
+    cls = _resolved.get(name)
+    if cls is not None:
+        return cls
+    module_name, class_name = DRIVERS[name]
+    with _resolve_lock:
+        if name not in _resolved:
+            _resolved[name] = getattr(importlib.import_module(module_name), class_name)
+        return _resolved[name]
@@ -1,9 +1,14 @@
 from netmiko import ConnectHandler
 import logging
-import os
 import re
 import paramiko
 import time
+from drivers import tiers, tcp_check
+from drivers.session_pool import get_pool
+from drivers.latency import get_latency
+from drivers.instrument import get_tracer
+from drivers.backup_store import get_backup_store
+from drivers.parsers import parse, first
 
 # Setup Module Logger
 logger = logging.getLogger("Afara.Router")
@@ -15,6 +20,9 @@ class RouterAuditor:
         self.password = password
         self.driver_type = driver_type.lower()
         self.is_draytek = "draytek" in self.driver_type
+        self.connection = None
+        self._lease = None
+        self.tracer = get_tracer()
 
     def _normalize_mac(self, mac_raw):
         """Standardizes MAC to XX:XX:XX:XX:XX:XX format."""
@@ -24,6 +32,11 @@ class RouterAuditor:
             return ":".join(clean[i:i+2] for i in range(0, 12, 2))
         return mac_raw
 
+    def _wan_ips(self, records):
+        """Routable addresses from parsed records ('unassigned', loopback and 0.0.0.0 dropped)."""
+        ips = [r.get('ip_address', '') for r in records]
+        return [ip for ip in ips if ip[:1].isdigit() and not ip.startswith('127.') and ip != '0.0.0.0']
+
     def connect(self):
         """Establishes SSH connection with Legacy KEX Support."""
         
@@ -39,7 +52,9 @@ class RouterAuditor:
                     'diffie-hellman-group14-sha1'
                 ) + paramiko.Transport._preferred_kex
 
-        # 3. Connection Parameters (Robust Timeouts)
+        # 3. Connection Parameters (Learned per host; 20s / factor 2 on cold start)
+        latency = get_latency()
+        handshake_timeout = latency.timeout(self.ip, "handshake", 20)
         connect_params = {
             'device_type': device_type,
             'host': self.ip,
@@ -47,10 +62,10 @@ class RouterAuditor:
             'password': self.password,
             'secret': self.password,
             'port': 22,
-            'conn_timeout': 20,   # 20s timeout to prevent "Error reading banner"
-            'auth_timeout': 20,
-            'banner_timeout': 20,
-            'global_delay_factor': 2,
+            'conn_timeout': latency.connect_timeout(self.ip, "handshake", 20),   # 20s cold start prevents "Error reading banner"
+            'auth_timeout': handshake_timeout,
+            'banner_timeout': handshake_timeout,
+            'global_delay_factor': latency.delay_factor(self.ip, 2),
         }
         
         # Disable strict checking for compatibility
@@ -58,20 +73,36 @@ class RouterAuditor:
             connect_params['ssh_strict'] = False
         except: pass
 
-        try:
-            self.connection = ConnectHandler(**connect_params)
-            
+        def open_session():
+            conn = latency.timed(self.ip, "handshake", lambda: self.tracer.timed(
+                self.ip, "connect", lambda: ConnectHandler(**connect_params), device_type))
             # Cisco requires enable mode; Draytek does not
             if not self.is_draytek:
-                self.connection.enable()
-            
+                self.tracer.timed(self.ip, "enable", conn.enable)
+            return conn
+
+        try:
+            # Pooled session: an authenticated router session survives between cycles
+            self._lease = get_pool().acquire(self.ip, device_type, self.username, self.password,
+                                             tcp_check.guard(self.ip, 22, open_session))
+            self.connection = self.tracer.wrap(self._lease.conn, self.ip)
             return True
         except Exception as e:
             # print(f"[DEBUG] Connection Failed: {e}") # Uncomment for debugging
             return False
 
-    def audit_firmware_and_config(self):
-        """Main entry point that branches to the correct audit logic."""
+    def disconnect(self, discard=False):
+        """Hands the session back to the pool (discarded if the audit broke it)."""
+        if self._lease:
+            get_pool().release(self._lease, discard=discard)
+        self._lease = None
+        self.connection = None
+
+    def audit_firmware_and_config(self, depth=tiers.DEEP):
+        """
+        Main entry point that branches to the correct audit logic.
+        HEARTBEAT: version/serial | STANDARD: + WAN IPs, MAC | DEEP: + config backup
+        """
         audit_data = {
             "status": "FAIL",
             "firmware": "N/A",
@@ -85,26 +116,27 @@ class RouterAuditor:
         if not self.connect():
             return audit_data
 
+        broken = False
         try:
             audit_data["status"] = "PASS"
 
             # Branch Logic based on Driver Type
             if self.is_draytek:
-                self._audit_draytek(audit_data)
+                self._audit_draytek(audit_data, depth)
             else:
-                self._audit_cisco(audit_data)
+                self._audit_cisco(audit_data, depth)
 
         except Exception as e:
             logger.error(f"Audit Error: {e}")
             audit_data['status'] = "FAIL"
+            broken = True
         
         finally:
-            if self.connection:
-                self.connection.disconnect()
+            self.disconnect(discard=broken)
 
         return audit_data
 
-    def _audit_draytek(self, data):
+    def _audit_draytek(self, data, depth=tiers.DEEP):
         """Commands specifically for Draytek Vigor Routers."""
         
         # 1. FIRMWARE & SERIAL (sys version)
@@ -119,6 +151,10 @@ class RouterAuditor:
         # Regex for Serial "Router serial no: 179003400482"
         sn_match = re.search(r"Router serial no\s*[:\s]+\s*([A-Z0-9]+)", output_ver, re.IGNORECASE)
         if sn_match: data['serial'] = sn_match.group(1)
+        data['uptime'] = "Online (Draytek)"
+
+        if not tiers.includes(depth, tiers.STANDARD):
+            return
 
         # 2. MAC ADDRESS
         self.connection.clear_buffer()
@@ -133,58 +169,67 @@ class RouterAuditor:
         try:
             self.connection.clear_buffer()
             route_out = self.connection.send_command_timing("ip route status")
-            found_ips = re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", route_out)
-            data['wan_ips'] = [ip for ip in found_ips if not ip.startswith('127.') and ip != '0.0.0.0']
+            data['wan_ips'] = self._wan_ips(parse("draytek", "ip route status", route_out))
         except: pass
 
+        if not tiers.includes(depth, tiers.DEEP):
+            return
+
         # 4. BACKUP
         try:
             self.connection.clear_buffer()
             config = self.connection.send_command_timing("sys conf show", delay_factor=4)
-            if not os.path.exists("backups"): os.makedirs("backups")
-            filename = f"backups/draytek_{self.ip}.txt"
-            with open(filename, "w") as f: f.write(config)
-            data['backup_file'] = filename
+            saved = get_backup_store().put(f"draytek_{self.ip}", config)
+            data['backup_file'] = saved['path']
+            data['backup_changed'] = saved['changed']
         except: pass
-        
-        data['uptime'] = "Online (Draytek)"
 
-    def _audit_cisco(self, data):
+    def _audit_cisco(self, data, depth=tiers.DEEP):
         """Standard Commands for Cisco IOS Routers."""
         
         # 1. VERSION & SERIAL
         ver_out = self.connection.send_command("show version")
         
+        # Structured template first (ntc_templates), regexes when it doesn't match
+        ver = parse("cisco_ios", "show version", ver_out)
         ver_match = re.search(r"Version\s+([^,\s]+)", ver_out)
-        if ver_match: data['firmware'] = ver_match.group(1)
+        firmware = first(ver, "version") or (ver_match.group(1) if ver_match else None)
+        if firmware: data['firmware'] = firmware
         
         sn_match = re.search(r"Processor board ID\s+(\w+)", ver_out)
-        if sn_match: data['serial'] = sn_match.group(1)
+        serial = first(ver, "serial") or (sn_match.group(1) if sn_match else None)
+        if serial: data['serial'] = serial
 
         up_match = re.search(r"uptime is (.*)", ver_out, re.IGNORECASE)
-        if up_match:
-            raw_parts = up_match.group(1).split(',')
-            data['uptime'] = ", ".join(raw_parts[:2])
+        uptime = first(ver, "uptime") or (up_match.group(1) if up_match else None)
+        if uptime:
+            raw_parts = uptime.split(',')
+            data['uptime'] = ", ".join(p.strip() for p in raw_parts[:2])
+
+        if not tiers.includes(depth, tiers.STANDARD):
+            return
 
         # 2. WAN IP
         ip_out = self.connection.send_command("show ip interface brief")
-        found_ips = re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", ip_out)
-        data['wan_ips'] = [ip for ip in found_ips if not ip.startswith('127.') and ip != '0.0.0.0']
+        data['wan_ips'] = self._wan_ips(parse("cisco_ios", "show ip interface brief", ip_out))
 
         # 3. MAC ADDRESS (Try ARP first, then Interface)
         cmd_arp = f"show ip arp {self.ip}"
         arp_out = self.connection.send_command(cmd_arp)
         mac_match = re.search(r"([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4})", arp_out)
-        if mac_match:
-            data['mac'] = self._normalize_mac(mac_match.group(1))
+        arp_mac = first(parse("cisco_ios", cmd_arp, arp_out), "mac_address") or (mac_match.group(1) if mac_match else None)
+        if arp_mac:
+            data['mac'] = self._normalize_mac(arp_mac)
         else:
             int_out = self.connection.send_command("show interfaces GigabitEthernet0/0 | include bia")
             fallback = re.search(r"([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4})", int_out)
             if fallback: data['mac'] = self._normalize_mac(fallback.group(1))
 
+        if not tiers.includes(depth, tiers.DEEP):
+            return
+
         # 4. BACKUP
         config = self.connection.send_command("show running-config")
-        if not os.path.exists("backups"): os.makedirs("backups")
-        filename = f"backups/cisco_{self.ip}.cfg"
-        with open(filename, "w") as f: f.write(config)
-        data['backup_file'] = filename
\ No newline at end of file
+        saved = get_backup_store().put(f"cisco_{self.ip}", config)
+        data['backup_file'] = saved['path']
+        data['backup_changed'] = saved['changed']
\ No newline at end of file
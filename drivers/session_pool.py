@@ -0,0 +1,226 @@
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.SessionPool")
+
+# Pool Defaults (Override via .env)
+DEFAULT_MAX_SESSIONS = 32
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_ACQUIRE_WAIT = 60
+
+def _is_healthy(conn):
+    """Health check for both netmiko connections and paramiko SSHClients."""
+    try:
+        if hasattr(conn, "is_alive"):
+            return conn.is_alive()
+        transport = conn.get_transport()
+        return transport is not None and transport.is_active()
+    except Exception:
+        return False
+
+def _close(conn):
+    try:
+        if hasattr(conn, "disconnect"): conn.disconnect()
+        else: conn.close()
+    except Exception:
+        pass
+
+class Lease:
+    """A checked-out session. Hand it back with SessionPool.release()."""
+    def __init__(self, key, conn, reused):
+        self.key = key
+        self.conn = conn
+        self.reused = reused
+
+class SessionPool:
+    """
+    Process-wide SSH Session Pool.
+
+    Keeps authenticated netmiko/paramiko sessions alive between audits and
+    live-loop cycles, keyed by host, driver type, credentials and connection
+    mode (sessions opened with different timing settings are never shared).
+    A session is handed to one caller at a time, health-checked before
+    reuse, closed after sitting idle too long, and the total number of open
+    sessions is capped (idle sessions are evicted oldest-first to make room).
+    """
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 enabled=True, acquire_wait=DEFAULT_ACQUIRE_WAIT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.enabled = enabled
+        self.acquire_wait = acquire_wait
+        self._idle = {}      # key -> [(conn, last_used), ...]
+        self._open = 0
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def make_key(host, driver_type, username, password, mode=None):
+        # Credentials are part of the key, but never held in clear text
+        secret = hashlib.sha256(f"{username}\0{password}".encode()).hexdigest()[:16]
+        return (host, driver_type, secret, mode)
+
+    def _evict_expired(self, now):
+        """Pops sessions idle past the timeout (caller closes them outside the lock)."""
+        expired = []
+        for key in list(self._idle):
+            fresh = []
+            for conn, last_used in self._idle[key]:
+                if now - last_used > self.idle_timeout: expired.append(conn)
+                else: fresh.append((conn, last_used))
+            if fresh: self._idle[key] = fresh
+            else: del self._idle[key]
+        return expired
+
+    def _evict_oldest_idle(self):
+        """Pops the least recently used idle session, or None (caller closes it outside the lock)."""
+        oldest = None
+        for key, entries in self._idle.items():
+            for i, (_, last_used) in enumerate(entries):
+                if oldest is None or last_used < oldest[2]:
+                    oldest = (key, i, last_used)
+        if oldest is None:
+            return None
+        key, i, _ = oldest
+        conn, _ = self._idle[key].pop(i)
+        if not self._idle[key]: del self._idle[key]
+        return conn
+
+    def _discard(self, conns):
+        """Closes sessions (socket I/O, so never under the lock), then frees their slots."""
+        if not conns: return
+        for conn in conns:
+            _close(conn)
+        with self._cond:
+            self._open -= len(conns)
+            self._cond.notify_all()
+
+    def acquire(self, host, driver_type, username, password, factory, mode=None):
+        """
+        Returns a Lease on a live session, reusing an idle one when possible.
+        'mode' names the connection settings the factory uses (e.g. 'batch').
+        """
+        key = self.make_key(host, driver_type, username, password, mode)
+        if not self.enabled:
+            return Lease(key, factory(), False)
+
+        # Only bookkeeping happens under the lock: health checks, closes and
+        # handshakes do socket I/O and would stall every other audit thread
+        deadline = time.monotonic() + self.acquire_wait
+        while True:
+            doomed, candidate, reserved = [], None, False
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    doomed += self._evict_expired(now)
+
+                    # 1. REUSE (Most recently used first)
+                    if self._idle.get(key):
+                        candidate, _ = self._idle[key].pop()
+                        if not self._idle[key]: del self._idle[key]
+                        break
+
+                    # 2. MAKE ROOM UNDER THE CAP (An evicted session holds its slot until closed)
+                    if self._open < self.max_sessions:
+                        reserved = True
+                    else:
+                        victim = self._evict_oldest_idle()
+                        if victim is not None:
+                            doomed.append(victim)
+                            reserved = True
+                    if reserved:
+                        self._open += 1
+                        break
+
+                    # 3. WAIT FOR A RELEASE (All sessions busy)
+                    if doomed:
+                        break      # Closing expired sessions frees slots: retry after that
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        # Never deadlock an audit on the cap; exceed it briefly instead
+                        logger.warning(f"Session cap {self.max_sessions} reached; opening extra session to {host}")
+                        self._open += 1
+                        reserved = True
+                        break
+                    self._cond.wait(remaining)
+
+            self._discard(doomed)
+            if candidate is not None:
+                if _is_healthy(candidate):
+                    return Lease(key, candidate, True)
+                self._discard([candidate])
+                continue
+            if reserved:
+                break
+
+        # Handshake happens outside the lock
+        try:
+            conn = factory()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return Lease(key, conn, False)
+
+    def release(self, lease, discard=False):
+        """Returns a session to the pool (or closes it if broken / pooling is off)."""
+        if not self.enabled:
+            _close(lease.conn)
+            return
+        # Health check outside the lock (is_alive() writes to the socket)
+        if discard or not _is_healthy(lease.conn):
+            self._discard([lease.conn])
+            return
+        with self._cond:
+            self._idle.setdefault(lease.key, []).append((lease.conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, host, driver_type, username, password, factory, mode=None):
+        """Context manager form: broken sessions (exceptions) are discarded."""
+        lease = self.acquire(host, driver_type, username, password, factory, mode)
+        try:
+            yield lease.conn
+        except BaseException:
+            self.release(lease, discard=True)
+            raise
+        self.release(lease)
+
+    def discard_host(self, host):
+        """Drops every idle session for a host (e.g. after a credential change)."""
+        with self._cond:
+            doomed = [conn for key in [k for k in self._idle if k[0] == host] for conn, _ in self._idle.pop(key)]
+        self._discard(doomed)
+
+    def close_all(self):
+        with self._cond:
+            doomed = [conn for entries in self._idle.values() for conn, _ in entries]
+            self._idle.clear()
+        self._discard(doomed)
+
+    def stats(self):
+        with self._cond:
+            idle = sum(len(v) for v in self._idle.values())
+            return {"open": self._open, "idle": idle, "busy": self._open - idle}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Returns the process-wide pool, configured from .env on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool(
+                max_sessions=int(os.getenv("AFARA_SSH_POOL_MAX", DEFAULT_MAX_SESSIONS)),
+                idle_timeout=float(os.getenv("AFARA_SSH_POOL_IDLE", DEFAULT_IDLE_TIMEOUT)),
+                enabled=os.getenv("AFARA_SSH_POOL", "1").lower() not in ("0", "false", "no", "off")
+            )
+            atexit.register(_pool.close_all)
+        return _pool
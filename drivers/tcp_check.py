@@ -0,0 +1,216 @@
+import errno
+import logging
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+from drivers.latency import get_latency
+from drivers.rate_limit import get_rate_limiter, subnet_of
+
+# Setup Module Logger
+logger = logging.getLogger("Afara.TCPCheck")
+
+# Pre-check Defaults (Override via AFARA_TCP_CHECK / AFARA_TCP_CHECK_TIMEOUT / AFARA_TCP_CHECK_MAX_AGE)
+DEFAULT_TIMEOUT = 1.0     # Cold start, and the cap for learned timeouts
+MIN_TIMEOUT = 0.25
+MARGIN = 4.0              # Learned timeout = p99 connect time * MARGIN
+DEFAULT_MAX_AGE = 15.0    # One live-loop cycle
+MAX_PARALLEL = 256        # Sockets in flight at once (before the rate limiter's caps)
+
+# Driver family -> port its session opens
+PORTS = {
+    "cisco": 22,
+    "router": 22,
+    "crestron": 22,
+    "windows": 22,
+    "gude": 80,
+}
+
+# Port -> rate limiter transport (anything else is an SSH-style session port)
+HTTP_PORTS = (80, 443, 8080)
+
+_PENDING = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035)  # 10035: WSAEWOULDBLOCK
+
+class PortUnreachable(OSError):
+    """Raised instead of a session handshake when the pre-check found the port dead."""
+    precheck = True   # Not counted as a handshake timeout by the latency tracker
+
+def enabled():
+    return os.getenv("AFARA_TCP_CHECK", "1").lower() not in ("0", "false", "no", "off")
+
+def _cap():
+    return float(os.getenv("AFARA_TCP_CHECK_TIMEOUT", DEFAULT_TIMEOUT))
+
+def adaptive_timeout(ip, cap=None):
+    """p99 of this host's past connects * margin, within [MIN_TIMEOUT, cap]; the cap on cold start."""
+    cap = cap or _cap()
+    p99 = get_latency().percentile(ip, "tcp")
+    if p99 is None:
+        return cap
+    return round(min(cap, max(MIN_TIMEOUT, p99 * MARGIN)), 3)
+
+def _entry(is_open, rtt=None, error=None):
+    return {"open": is_open, "rtt_ms": round(rtt * 1000, 2) if rtt is not None else None, "error": error}
+
+_ERRORS = {errno.ECONNREFUSED: "refused", errno.ETIMEDOUT: "timed out",
+           errno.EHOSTUNREACH: "unreachable", errno.ENETUNREACH: "unreachable"}
+
+def _error_name(code):
+    return _ERRORS.get(code) or os.strerror(code).lower()
+
+def transport_for(port):
+    return "http" if port in HTTP_PORTS else "ssh"
+
+class TCPPrecheck:
+    """
+    Concurrent TCP Reachability Check.
+
+    Opens non-blocking connects to many (ip, port) at once and waits on a
+    selector, so dead hosts cost one short timeout per wave instead of one
+    netmiko/requests timeout each. Waves are bounded per subnet by the
+    probe rate limiter's burst size. Refused ports answer in
+    milliseconds; silent hosts give up after a per-host timeout learned
+    from past connects (capped at AFARA_TCP_CHECK_TIMEOUT). A host that
+    misses its learned timeout is retried once at the cap before it is
+    called dead.
+    """
+    def __init__(self, cap=None):
+        self.cap = cap or _cap()
+        self.latency = get_latency()
+
+    def _pass(self, targets, timeouts):
+        """
+        One connect attempt per target: {target: entry}. Connects in flight
+        per (subnet, transport) never exceed the rate limiter's burst size,
+        so the pre-check cannot out-burst the sessions it is protecting.
+        """
+        limiter = get_rate_limiter()
+        queued = {}     # (subnet, transport) -> deque of targets
+        for target in targets:
+            key = (subnet_of(target[0], limiter.prefix), transport_for(target[1]))
+            queued.setdefault(key, deque()).append(target)
+        inflight = dict.fromkeys(queued, 0)
+        results = {}
+        selector = selectors.DefaultSelector()
+
+        def start(key, target):
+            ip, port = target
+            started = time.monotonic()
+            try:
+                family, _, _, _, addr = socket.getaddrinfo(ip, port, type=socket.SOCK_STREAM)[0]
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                code = sock.connect_ex(addr)
+            except OSError as e:
+                results[target] = _entry(False, error=str(e).lower()[:40])
+                return
+            if code == 0 or code in _PENDING:
+                selector.register(sock, selectors.EVENT_WRITE, (target, started + timeouts[target], started, key))
+                inflight[key] += 1
+            else:
+                sock.close()
+                results[target] = _entry(False, error=_error_name(code))
+
+        def fill():
+            for key, waiting in queued.items():
+                subnet_cap, global_cap = limiter.caps(key[1])
+                total_cap = min(MAX_PARALLEL, global_cap or MAX_PARALLEL)
+                while waiting and (subnet_cap is None or inflight[key] < subnet_cap) \
+                        and len(selector.get_map()) < total_cap:
+                    start(key, waiting.popleft())
+
+        def finish(selector_key, entry):
+            target, _, _, key = selector_key.data
+            selector.unregister(selector_key.fileobj)
+            selector_key.fileobj.close()
+            inflight[key] -= 1
+            results[target] = entry
+
+        try:
+            fill()
+            while selector.get_map():
+                now = time.monotonic()
+                for selector_key in list(selector.get_map().values()):
+                    if selector_key.data[1] <= now:
+                        finish(selector_key, _entry(False, error="timed out"))
+                if selector.get_map():
+                    next_deadline = min(k.data[1] for k in selector.get_map().values())
+                    for selector_key, _ in selector.select(max(0.0, next_deadline - now)):
+                        target, _, started, _ = selector_key.data
+                        code = selector_key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                        if code == 0:
+                            rtt = time.monotonic() - started
+                            self.latency.record(target[0], "tcp", rtt)
+                            finish(selector_key, _entry(True, rtt))
+                        else:
+                            finish(selector_key, _entry(False, error=_error_name(code)))
+                fill()
+        finally:
+            for selector_key in list(selector.get_map().values()):
+                selector_key.fileobj.close()
+            selector.close()
+        return results
+
+    def check(self, targets):
+        """Checks [(ip, port)] concurrently. Returns {(ip, port): {'open', 'rtt_ms', 'error'}}."""
+        targets = list(dict.fromkeys(targets))
+        timeouts = {t: adaptive_timeout(t[0], self.cap) for t in targets}
+        results = self._pass(targets, timeouts)
+        # Learned timeout may be too tight for a busy host: one more try at the cap
+        retry = [t for t in targets if results[t]["error"] == "timed out" and timeouts[t] < self.cap]
+        if retry:
+            results.update(self._pass(retry, {t: self.cap for t in retry}))
+        return results
+
+# ==================================================
+# SHARED RESULTS (Read by the session drivers, one cycle at a time)
+# ==================================================
+_latest = {}  # (ip, port) -> (entry, taken_at)
+_latest_lock = threading.Lock()
+
+def publish(results, taken_at=None):
+    """Stores check results so drivers can read them without connecting again."""
+    taken_at = taken_at or time.monotonic()
+    with _latest_lock:
+        for target, entry in results.items():
+            _latest[target] = (entry, taken_at)
+
+def lookup(ip, port, max_age=None):
+    """Returns the shared entry for (ip, port) if it is fresh enough, else None."""
+    max_age = max_age if max_age is not None else float(os.getenv("AFARA_TCP_CHECK_MAX_AGE", DEFAULT_MAX_AGE))
+    with _latest_lock:
+        cached = _latest.get((ip, port))
+    if cached is None or time.monotonic() - cached[1] > max_age:
+        return None
+    return cached[0]
+
+def check_and_publish(targets):
+    """Convenience wrapper used by the orchestrator before an audit group."""
+    if not targets or not enabled(): return None
+    try:
+        results = TCPPrecheck().check(targets)
+    except Exception as e:
+        logger.warning(f"TCP pre-check failed: {e}")
+        return None
+    publish(results)
+    return results
+
+def require(ip, port):
+    """Raises PortUnreachable if (ip, port) is dead (cached for the cycle, else checked now)."""
+    if not enabled(): return
+    entry = lookup(ip, port)
+    if entry is None:
+        entry = TCPPrecheck().check([(ip, port)])[(ip, port)]
+        publish({(ip, port): entry})
+    if not entry["open"]:
+        raise PortUnreachable(f"TCP {port} {entry['error']} (pre-check)")
+
+def guard(ip, port, factory):
+    """Wraps a session factory so the handshake only starts on a reachable port."""
+    def open_session():
+        require(ip, port)
+        return factory()
+    return open_session
@@ -0,0 +1,36 @@
+"""
+Audit Depth Tiers.
+
+Every driver accepts a depth so the caller can pick how much work a probe does:
+
+    HEARTBEAT  Reachability plus one cheap status read (live monitoring).
+    STANDARD   Adds inventory fields (MAC, serial, uptime, VLANs, PoE, outlets).
+    DEEP       Adds configuration backups and peripheral discovery (commissioning).
+"""
+HEARTBEAT = "heartbeat"
+STANDARD = "standard"
+DEEP = "deep"
+
+_ORDER = {HEARTBEAT: 0, STANDARD: 1, DEEP: 2}
+
+def normalize(depth, default=DEEP):
+    """Maps user input ('Heartbeat', None, junk) onto a known tier."""
+    depth = str(depth or "").strip().lower()
+    return depth if depth in _ORDER else default
+
+def parse_depths(raw):
+    """Parses 'cisco=standard,gude=heartbeat' into {'cisco': 'standard', 'gude': 'heartbeat'}."""
+    depths = {}
+    for item in (raw or "").split(","):
+        if "=" not in item: continue
+        key, val = item.split("=", 1)
+        if val.strip().lower() in _ORDER: depths[key.strip().lower()] = val.strip().lower()
+    return depths
+
+def deeper(a, b):
+    """The more thorough of two tiers."""
+    return a if _ORDER[normalize(a)] >= _ORDER[normalize(b)] else b
+
+def includes(depth, tier):
+    """True if an audit at `depth` should perform the work belonging to `tier`."""
+    return _ORDER[normalize(depth)] >= _ORDER[tier]
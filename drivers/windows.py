@@ -1,5 +1,9 @@
 import paramiko
 import re
+from drivers import tiers, tcp_check
+from drivers.session_pool import get_pool
+from drivers.latency import get_latency
+from drivers.instrument import get_tracer
 
 class WindowsProbe:
     def __init__(self, ip, username, password, port=22):
@@ -8,10 +12,25 @@ class WindowsProbe:
         self.password = password
         self.port = port
         self.mode = "ssh" 
+        self.latency = get_latency()
+        self.tracer = get_tracer()
 
-    def run(self):
+    def _open_session(self):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.latency.timed(self.ip, "handshake", lambda: self.tracer.timed(self.ip, "connect", lambda: client.connect(
+            self.ip, 
+            port=self.port, 
+            username=self.username, 
+            password=self.password, 
+            timeout=self.latency.connect_timeout(self.ip, "handshake", 10)  # TCP connect, 10s cold start
+        ), "ssh"))
+        return client
+
+    def run(self, depth=tiers.DEEP):
         """
         Connects via SSH to Windows NUC and retrieves audit data.
+        HEARTBEAT: hostname only | STANDARD/DEEP: + OS version, serial, uptime, MAC (PowerShell)
         """
         data = {
             "status": "FAIL",
@@ -25,63 +44,58 @@ class WindowsProbe:
             "error": None
         }
 
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
         try:
-            # 1. CONNECT
-            client.connect(
-                self.ip, 
-                port=self.port, 
-                username=self.username, 
-                password=self.password, 
-                timeout=10
-            )
-            data["status"] = "PASS"
+            # 1. CONNECT (Pooled session, reused between cycles)
+            with get_pool().session(self.ip, "windows", self.username, self.password,
+                                    tcp_check.guard(self.ip, self.port, self._open_session)) as client:
+                data["status"] = "PASS"
 
-            # Helper for clean command execution
-            def run_cmd(cmd):
-                stdin, stdout, stderr = client.exec_command(cmd)
-                return stdout.read().decode('utf-8', errors='ignore').strip()
+                # Helper for clean command execution
+                def run_cmd(cmd):
+                    def execute():
+                        stdin, stdout, stderr = client.exec_command(cmd)
+                        return stdout.read().decode('utf-8', errors='ignore').strip()
+                    return self.latency.timed(self.ip, "command", lambda: self.tracer.timed(self.ip, "command", execute, cmd))
 
-            # 2. HOSTNAME
-            data["hostname"] = run_cmd("hostname")
+                # 2. HOSTNAME
+                data["hostname"] = run_cmd("hostname")
 
-            # 3. OS VERSION
-            os_out = run_cmd('systeminfo | findstr /B /C:"OS Name" /C:"OS Version"')
-            os_name = "Win"
-            os_ver = ""
-            for line in os_out.splitlines():
-                if "OS Name" in line: os_name = line.split(":", 1)[1].strip()
-                elif "OS Version" in line: os_ver = line.split(":", 1)[1].strip()
+                if not tiers.includes(depth, tiers.STANDARD):
+                    return data
+
+                # 3. OS VERSION
+                os_out = run_cmd('systeminfo | findstr /B /C:"OS Name" /C:"OS Version"')
+                os_name = "Win"
+                os_ver = ""
+                for line in os_out.splitlines():
+                    if "OS Name" in line: os_name = line.split(":", 1)[1].strip()
+                    elif "OS Version" in line: os_ver = line.split(":", 1)[1].strip()
             
-            if os_name != "Win":
-                data["version"] = f"{os_name} ({os_ver})"
+                if os_name != "Win":
+                    data["version"] = f"{os_name} ({os_ver})"
 
-            # 4. SERIAL NUMBER
-            ps_serial = 'powershell -Command "(Get-CimInstance -ClassName Win32_BIOS).SerialNumber"'
-            serial_out = run_cmd(ps_serial)
+                # 4. SERIAL NUMBER
+                ps_serial = 'powershell -Command "(Get-CimInstance -ClassName Win32_BIOS).SerialNumber"'
+                serial_out = run_cmd(ps_serial)
 
-            if not serial_out or "not recognized" in serial_out or "command not found" in serial_out:
-                serial_out = run_cmd("wmic bios get serialnumber").replace("SerialNumber", "").strip()
+                if not serial_out or "not recognized" in serial_out or "command not found" in serial_out:
+                    serial_out = run_cmd("wmic bios get serialnumber").replace("SerialNumber", "").strip()
 
-            data["serial"] = serial_out if serial_out else "Not Found"
+                data["serial"] = serial_out if serial_out else "Not Found"
 
-            # 5. UPTIME
-            # Calculates uptime via PowerShell and formats it as "Xd Yh Zm"
-            ps_uptime = "powershell -Command \"$t = New-TimeSpan -Start (Get-CimInstance Win32_OperatingSystem).LastBootUpTime; '{0}d {1}h {2}m' -f $t.Days, $t.Hours, $t.Minutes\""
-            uptime_out = run_cmd(ps_uptime)
+                # 5. UPTIME
+                # Calculates uptime via PowerShell and formats it as "Xd Yh Zm"
+                ps_uptime = "powershell -Command \"$t = New-TimeSpan -Start (Get-CimInstance Win32_OperatingSystem).LastBootUpTime; '{0}d {1}h {2}m' -f $t.Days, $t.Hours, $t.Minutes\""
+                uptime_out = run_cmd(ps_uptime)
             
-            if uptime_out and "Days" not in uptime_out:
-                 data["uptime"] = uptime_out
-
-            # 6. MAC ADDRESS
-            mac_out = run_cmd("getmac /fo csv /nh")
-            mac_match = re.search(r"([0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2})", mac_out, re.IGNORECASE)
-            if mac_match:
-                data["mac"] = mac_match.group(1).replace("-", ":")
+                if uptime_out and "Days" not in uptime_out:
+                     data["uptime"] = uptime_out
 
-            client.close()
+                # 6. MAC ADDRESS
+                mac_out = run_cmd("getmac /fo csv /nh")
+                mac_match = re.search(r"([0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2}-[0-9A-F]{2})", mac_out, re.IGNORECASE)
+                if mac_match:
+                    data["mac"] = mac_match.group(1).replace("-", ":")
 
         except Exception as e:
             data["error"] = str(e)
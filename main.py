@@ -1,4 +1,3 @@
-import time
 import os
 import datetime
 from dotenv import load_dotenv
@@ -7,16 +6,32 @@ from dotenv import load_dotenv
 from core.loader import load_project_topology
 from core.logger import SystemLogger
 from core.orchestrator import CommissioningOrchestrator
+from core.monitor import MonitorScheduler
+from core.plan import compile_plan, compile_plans
+from core.metrics_store import get_metrics_store
+from core.exporter import MetricsExporter, DEFAULT_ADDRESS as DEFAULT_EXPORTER_ADDRESS
 
-# Import Drivers
-from drivers.cisco import CiscoSwitch
-from drivers.ping_driver import PingDriver 
-from drivers.gude_driver import GudeAuditor
-from drivers.crestron_driver import CrestronAuditor
-from drivers.windows import WindowsProbe
+# Import Drivers (Transport drivers resolve lazily through the execution plans)
+from drivers.icmp_sweep import SweepRefresher
+from drivers import tiers
+from drivers.rate_limit import get_rate_limiter
 
 load_dotenv()
 
+LIVE_HEADER = f"   {'STATUS':<7} {'NAME':<25} | {'MODE':<8} | {'IP ADDRESS':<15} | {'MAC ADDRESS':<17} | {'SERIAL':<15} | {'FIRMWARE':<10} | LOCATION"
+LIVE_SEPARATOR = "   " + "-"*135
+
+# Live loop only needs PASS/FAIL: cheap heartbeat unless overridden
+MONITOR_DEPTH = tiers.normalize(os.getenv("AFARA_MONITOR_DEPTH"), tiers.HEARTBEAT)
+
+# Per-family floors: switches probe at standard depth so the PoE and port-error
+# series exist (on their own slower interval, see core.monitor.DEFAULT_INTERVALS)
+MONITOR_DEPTHS = {"cisco": tiers.STANDARD}
+MONITOR_DEPTHS.update(tiers.parse_depths(os.getenv("AFARA_MONITOR_DEPTHS")))
+
+# Values a shallow probe reports when it did not read the field
+PLACEHOLDERS = (None, "", "N/A", "---", "Unknown", "OFFLINE", "ONLINE")
+
 def main():
     logger = SystemLogger()
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -33,8 +48,15 @@ def main():
     # ==================================================
     # COMMISSIONING (Run Audit & Cache Data)
     # ==================================================
+    orchestrator = None
     try:
-        orchestrator = CommissioningOrchestrator(project_meta, devices)
+        plans = compile_plans(devices)
+        if os.getenv("AFARA_DISTRIBUTED", "0").lower() in ("1", "true", "yes", "on"):
+            # Coordinator mode: audits are sharded across probe workers (python -m core.distributed)
+            from core.distributed import DistributedOrchestrator
+            orchestrator = DistributedOrchestrator(project_meta, devices, plans=plans)
+        else:
+            orchestrator = CommissioningOrchestrator(project_meta, devices, plans=plans)
         # Update devices list with cached serials/macs
         devices = orchestrator.run_full_sequence() 
     except KeyboardInterrupt:
@@ -43,104 +65,114 @@ def main():
     except Exception as e:
         print(f"\n[ERROR] Orchestrator crashed: {e}")
         return
+    finally:
+        # Report is written; the live loop only needs the device list
+        if orchestrator: orchestrator.close()
     
     # ==================================================
     # LIVE MONITORING
     # ==================================================
     print(f"[START] Entering Live Monitoring Mode for {len(devices)} assets...\n")
-    
-    header = f"   {'STATUS':<7} {'NAME':<25} | {'MODE':<8} | {'IP ADDRESS':<15} | {'MAC ADDRESS':<17} | {'SERIAL':<15} | {'FIRMWARE':<10} | LOCATION"
-    separator = "   " + "-"*135
 
-    try:
-        while True:
-            timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-            print(f"\n--- Scan Cycle: {timestamp} ---")
-            print(header)
-            print(separator)
-            
-            for device in devices:
-                name = device['name']
-                ip = device['ip']
-                driver_type = device['driver'].lower()
-                group = device.get('group', '').lower()
-                location = f"{device['location']['floor']} > {device['location']['room']}"
-                
-                target = None
-                mode_tag = "(PING)"
-                res = {}
-
-                # 1. GUDE (HTTP)
-                if "gude" in driver_type:
-                     mode_tag = "(HTTP)"
-                     target = GudeAuditor(ip, device.get('username'), device.get('password'))
-                     full_audit = target.audit_firmware_and_config()
-                     res = {
-                         'online': (full_audit.get('status') == 'PASS'),
-                         'mac': full_audit.get('mac'),
-                         'serial': full_audit.get('serial'),
-                         'firmware': full_audit.get('firmware')
-                     }
-
-                # 2. CRESTRON (SSH)
-                elif "crestron" in driver_type:
-                     mode_tag = "(SSH)"
-                     target = CrestronAuditor(ip, device.get('username'), device.get('password'))
-                     full_audit = target.audit_firmware_and_config()
-                     res = {
-                         'online': (full_audit.get('status') == 'PASS'),
-                         'mac': full_audit.get('mac'),
-                         'serial': full_audit.get('serial'),
-                         'firmware': full_audit.get('firmware')
-                     }
-
-                # 3. WINDOWS (SSH)
-                elif "windows" in driver_type:
-                     mode_tag = "(SSH)"
-                     target = WindowsProbe(ip, device.get('username'), device.get('password'))
-                     full_audit = target.run()
-                     res = {
-                         'online': (full_audit.get('status') == 'PASS'),
-                         'mac': full_audit.get('mac'),
-                         'serial': full_audit.get('serial'),
-                         'firmware': full_audit.get('version')
-                     }
-
-                # 4. CISCO (SSH)
-                elif "cisco" in driver_type and "switch" in driver_type:
-                     target = CiscoSwitch(ip, device.get('username'), device.get('password'))
-                     mode_tag = "(SSH)"
-                     res = target.check_status()
-
-                # 5. DEFAULT (PING)
-                else:
-                     target = PingDriver(ip)
-                     mode_tag = "(PING)"
-                     res = target.check_status()
-
-                # DATA DISPLAY LOGIC
-                is_online = res.get('online', False)
-                status = "[PASS]" if is_online else "[FAIL]"
-                
-                # Fetch Persistent Info (Cached from Commissioning Step)
-                mac = res.get('mac') or device.get('mac', '---')
-                serial = res.get('serial') or device.get('serial', '---')
-                firmware = res.get('firmware') or device.get('firmware', 'N/A')
-
-                # Normalize Strings
-                if isinstance(mac, list): mac = str(mac[0])
-                if isinstance(serial, list): serial = str(serial[0])
-                
-                if not is_online:
-                    mac = "OFFLINE"
-                    if res.get('error'): mac = str(res['error'])[:17]
-                
-                print(f"   {status:<7} {name:<25} | {mode_tag:<8} | {ip:<15} | {str(mac)[:17]:<17} | {str(serial)[:15]:<15} | {str(firmware)[:10]:<10} | {location}")
-            
-            time.sleep(15)
+    # Every live result is also kept as typed samples for trends
+    metrics = get_metrics_store()
+    limiter = get_rate_limiter()
+
+    # Optional Prometheus endpoint (serves the last rendered cycle, never probes)
+    exporter = None
+    port = os.getenv("AFARA_EXPORTER_PORT")
+    if port:
+        try:
+            address = os.getenv("AFARA_EXPORTER_ADDRESS") or os.getenv("AFARA_EXPORTER_ADDR") or DEFAULT_EXPORTER_ADDRESS
+            exporter = MetricsExporter(int(port), address).start()
+            print(f"[INFO] Metrics exporter on http://{exporter.address}:{exporter.port}/metrics")
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Metrics exporter disabled: {e}")
+
+    def on_result(device, res, duration):
+        print_device_row(device, res, duration)
+        if metrics: metrics.record_result(device['ip'], res, duration)
+        if exporter: exporter.update(device, res, duration)
+
+    def on_cycle(stats):
+        limits = limiter.snapshot(reset_peaks=True)
+        print_cycle(stats, limits)
+        if metrics: metrics.flush()
+        if exporter: exporter.render(stats, limits)
+
+    scheduler = MonitorScheduler(devices, make_probe(plans), on_result, on_cycle=on_cycle)
+
+    # Background ICMP sweep feeds every ping-only probe from one socket
+    sweeper = SweepRefresher([d['ip'] for d in devices if plans[id(d)].family == 'ping'],
+                             interval=scheduler.interval)
+    sweeper.start()
 
+    try:
+        scheduler.run()
     except KeyboardInterrupt:
         print("\n\n[STOP] Halting Engine. Goodbye.")
+    finally:
+        sweeper.stop()
+        if metrics: metrics.close()
+        if exporter: exporter.stop()
+
+def make_probe(plans):
+    """Live-loop probe: executes the device's compiled plan at monitor depth (or its family's, if deeper)."""
+    def probe_device(device):
+        plan = plans.get(id(device)) or compile_plan(device)
+        return plan.execute(tiers.deeper(MONITOR_DEPTHS.get(plan.family, MONITOR_DEPTH), MONITOR_DEPTH))
+    return probe_device
+
+def print_cycle(stats, limits=()):
+    """Prints the scan-cycle banner, flagging windows where the scheduler fell behind."""
+    if stats is not None and stats.behind:
+        print(f"   [WARN] Monitor overrun: {stats.late} late / {stats.skipped} skipped / "
+              f"{stats.overruns} slow probes (max lateness {stats.max_lateness:.1f}s)")
+    # Subnets whose probes queued for a rate-limit token this window
+    for row in [r for r in limits if r['peak']][:3]:
+        print(f"   [INFO] Rate limited: {row['subnet']} {row['transport']} (peak queue {row['peak']}, "
+              f"max wait {row['max_wait_s']:.1f}s)")
+
+    timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+    print(f"\n--- Scan Cycle: {timestamp} ---")
+    print(LIVE_HEADER)
+    print(LIVE_SEPARATOR)
+
+def _prefer(live, cached):
+    """Live value unless the probe left a placeholder and commissioning cached a real one."""
+    if live in PLACEHOLDERS and cached:
+        return cached
+    return live
+
+def print_device_row(device, res, duration):
+    """Prints a live-loop row as soon as its probe completes."""
+    name = device['name']
+    ip = device['ip']
+    location = f"{device['location']['floor']} > {device['location']['room']}"
+    mode_tag = res.get('mode', "(PING)")
+
+    # DATA DISPLAY LOGIC
+    is_online = res.get('online', False)
+    status = "[PASS]" if is_online else "[FAIL]"
+    
+    # Fetch Persistent Info (Cached from Commissioning Step)
+    mac = _prefer(res.get('mac'), device.get('mac')) or '---'
+    serial = _prefer(res.get('serial'), device.get('serial')) or '---'
+    firmware = _prefer(res.get('firmware'), device.get('firmware')) or 'N/A'
+
+    # Normalize Strings
+    if isinstance(mac, list): mac = str(mac[0])
+    if isinstance(serial, list): serial = str(serial[0])
+    
+    if not is_online:
+        mac = "OFFLINE"
+        if res.get('error'): mac = str(res['error'])[:17]
+    
+    print(f"   {status:<7} {name:<25} | {mode_tag:<8} | {ip:<15} | {str(mac)[:17]:<17} | {str(serial)[:15]:<15} | {str(firmware)[:10]:<10} | {location}")
+
+    # Only ports whose error rate is climbing or sustained (standard-depth probes collect counters)
+    for entry in res.get('port_errors') or []:
+        print(f"   {'[WARN]':<7} {'':<25}   Port errors: {entry}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,7 @@
+"""
+Afara Device Simulator.
+
+Local stand-ins for the hardware the drivers audit (Cisco IOS/SMB/ISR,
+Crestron, DrayTek over SSH; Gude PDUs over HTTP) with latency, banner
+delay, auth failure and timeout faults. Run 'python -m simulator --help'.
+"""
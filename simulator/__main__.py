@@ -0,0 +1,3 @@
+from simulator.farm import main
+
+main()
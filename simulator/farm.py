@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import ipaddress
+import selectors
+import threading
+
+# Base directory configuration (allow 'python simulator/farm.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from simulator.faults import Faults
+from simulator.platforms import Identity, Gude, PLATFORMS, SCHEDULE_DRIVERS
+
+SCHEDULE_GROUPS = {
+    "cisco_ios": "Network",
+    "cisco_smb": "Network",
+    "cisco_router": "Network",
+    "draytek": "Network",
+    "crestron": "Control",
+    "gude": "Power",
+}
+
+def loopback_addresses(base, count):
+    """
+    Consecutive host addresses from 'base', skipping .0/.255. On Linux the
+    whole 127.0.0.0/8 block is routed to 'lo', so no aliases need creating;
+    on macOS/BSD add them first (ifconfig lo0 alias 127.20.0.x).
+    """
+    current = ipaddress.IPv4Address(base)
+    out = []
+    while len(out) < count:
+        if current.packed[-1] not in (0, 255):
+            out.append(str(current))
+        current += 1
+    return out
+
+class DeviceFarm:
+    """
+    Many simulated devices on loopback addresses, one per IP (the drivers
+    always connect to port 22 / 80).
+
+    All SSH listeners share a single selector thread that only accepts;
+    each session then runs on its own thread, so hundreds of idle devices
+    cost one socket each. Gude PDUs run one small HTTP server per address.
+    """
+    def __init__(self, base="127.20.0.1", seed=0, username="afara", password="afara",
+                 ssh_port=22, http_port=80):
+        self.base = base
+        self.seed = seed
+        self.username = username
+        self.password = password
+        self.ssh_port = ssh_port
+        self.http_port = http_port
+        self.devices = []   # (platform_name, device)
+        self._plan = []     # (platform_name, faults, crc_growth)
+        self._host_key = None
+        self._selector = None
+        self._sockets = []
+        self._running = False
+
+    def add(self, platform_name, count, faults=None, crc_growth=0):
+        if platform_name != "gude" and platform_name not in PLATFORMS:
+            raise ValueError(f"Unknown platform '{platform_name}'")
+        for _ in range(count):
+            self._plan.append((platform_name, faults or Faults(), crc_growth))
+        return self
+
+    def inject(self, fault, percent, **values):
+        """Sets a fault on 'percent' of the planned devices (deterministic per seed)."""
+        if not self._plan or percent <= 0: return self
+        rng = random.Random(f"{self.seed}-{fault}")
+        chosen = rng.sample(range(len(self._plan)), min(len(self._plan), round(len(self._plan) * percent / 100)))
+        for idx in chosen:
+            name, faults, growth = self._plan[idx]
+            faults = Faults(**{**faults.as_dict(), fault: True, **values})
+            self._plan[idx] = (name, faults, growth)
+        return self
+
+    # ==================================================
+    # LIFECYCLE
+    # ==================================================
+    def start(self):
+        import paramiko
+        from simulator.ssh_server import SSHDevice, listen
+        from simulator.http_server import GudeDevice
+
+        if any(name != "gude" for name, _, _ in self._plan):
+            self._host_key = paramiko.RSAKey.generate(2048)
+        self._selector = selectors.DefaultSelector()
+
+        addresses = loopback_addresses(self.base, len(self._plan))
+        for index, ((name, faults, growth), ip) in enumerate(zip(self._plan, addresses), start=1):
+            identity = Identity(ip, index, self.seed)
+            if name == "gude":
+                device = GudeDevice(ip, Gude(identity), faults, self.username, self.password, self.http_port)
+                if not faults.offline: device.start()
+            else:
+                device = SSHDevice(ip, PLATFORMS[name](identity, crc_growth=growth), faults, self._host_key,
+                                   self.username, self.password, self.ssh_port)
+            self.devices.append((name, device))
+            if name != "gude" and not faults.offline:
+                sock = listen(ip, self.ssh_port)
+                self._sockets.append(sock)
+                self._selector.register(sock, selectors.EVENT_READ, device)
+
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True, name="sim-accept").start()
+        return self
+
+    def _accept_loop(self):
+        while self._running:
+            for key, _ in self._selector.select(timeout=0.5):
+                try:
+                    conn, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                conn.setblocking(True)
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                threading.Thread(target=key.data.handle, args=(conn,), daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        for sock in self._sockets:
+            try: self._selector.unregister(sock)
+            except Exception: pass
+            sock.close()
+        for name, device in self.devices:
+            if name == "gude": device.stop()
+
+    # ==================================================
+    # SCHEDULE (What Afara should audit)
+    # ==================================================
+    def inventory(self):
+        rows = []
+        for name, device in self.devices:
+            rows.append({
+                "Name": f"SIM-{name.upper()}-{device.platform.id.index:04d}",
+                "IP": device.ip,
+                "Driver": SCHEDULE_DRIVERS[name],
+                "Username": self.username,
+                "Password": self.password,
+                "Group": SCHEDULE_GROUPS[name],
+                "Floor": f"Floor {device.platform.id.index % 10}",
+                "Room": f"Sim Rack {device.platform.id.index % 40:02d}",
+                "Platform": name,
+                "Faults": device.faults.describe(),
+            })
+        return rows
+
+    def write_schedule(self, path):
+        """Writes the farm as a project schedule (.xlsx, loadable by main.py) or as JSON."""
+        rows = self.inventory()
+        if path.lower().endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(rows, f, indent=2)
+            return path
+
+        import pandas as pd
+        info = pd.DataFrame({
+            "Key": ["Project Name", "Ref Number", "Address", "Engineer", "Mode"],
+            "Value": ["Afara Simulator Farm", f"SIM-{len(rows)}", self.base, "simulator", "Simulation"],
+        })
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame(rows).to_excel(writer, sheet_name="Devices", index=False)
+            info.to_excel(writer, sheet_name="Project Info", index=False, header=False)
+        return path
+
+    def summary(self):
+        counts = {}
+        for name, device in self.devices:
+            counts.setdefault(name, [0, 0])
+            counts[name][0] += 1
+            faults = device.faults
+            if faults.offline or faults.timeout or faults.auth_fail: counts[name][1] += 1
+        return counts
+
+def main():
+    """
+    Launches a farm of simulated devices on loopback addresses and keeps it
+    running until Ctrl+C (or --duration). Binding ports 22/80 needs root (or
+    CAP_NET_BIND_SERVICE).
+
+    Example:
+        python -m simulator --cisco-ios 200 --gude 100 --crestron 50 \\
+            --latency 40 --timeout-pct 5 --schedule sim_schedule.xlsx
+        python main.py  # with the schedule copied to project_schedule.xlsx
+    """
+    parser = argparse.ArgumentParser(description="Afara device simulator farm")
+    for name in ("cisco_ios", "cisco_smb", "cisco_router", "crestron", "draytek", "gude"):
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=0, metavar="N", dest=name)
+    parser.add_argument("--base", default="127.20.0.1", help="First loopback address")
+    parser.add_argument("--username", default="afara")
+    parser.add_argument("--password", default="afara")
+    parser.add_argument("--latency", type=float, default=0.0, help="Per-command latency (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency jitter (ms)")
+    parser.add_argument("--banner-delay", type=float, default=0.0, help="Seconds before the SSH banner")
+    parser.add_argument("--auth-fail-pct", type=float, default=0.0, help="Percent of devices rejecting logins")
+    parser.add_argument("--timeout-pct", type=float, default=0.0, help="Percent of devices that never answer")
+    parser.add_argument("--offline-pct", type=float, default=0.0, help="Percent of devices with nothing listening")
+    parser.add_argument("--hang", type=float, default=120.0, help="How long timeout devices hold the socket")
+    parser.add_argument("--crc-growth", type=int, default=0, help="CRC errors added per 'show interfaces'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--schedule", help="Write the farm inventory (.xlsx schedule or .json)")
+    parser.add_argument("--duration", type=float, default=0, help="Stop after N seconds (0 = until Ctrl+C)")
+    args = parser.parse_args()
+
+    base_faults = Faults(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                         banner_delay=args.banner_delay, hang=args.hang)
+    farm = DeviceFarm(args.base, args.seed, args.username, args.password)
+    for name in ("cisco_ios", "cisco_smb", "cisco_router", "crestron", "draytek", "gude"):
+        farm.add(name, getattr(args, name), base_faults, args.crc_growth)
+    farm.inject("auth_fail", args.auth_fail_pct)
+    farm.inject("timeout", args.timeout_pct)
+    farm.inject("offline", args.offline_pct)
+
+    if not farm._plan:
+        parser.error("No devices requested (e.g. --cisco-ios 50 --gude 20)")
+
+    try:
+        farm.start()
+    except PermissionError:
+        print("[ERROR] Binding ports 22/80 needs root or CAP_NET_BIND_SERVICE.")
+        sys.exit(1)
+    except OSError as e:
+        print(f"[ERROR] Could not bind simulator addresses: {e}")
+        sys.exit(1)
+
+    print(f"[INFO] Simulator farm up: {len(farm.devices)} devices from {args.base}")
+    for name, (total, faulty) in farm.summary().items():
+        print(f"   - {name:<13} {total:>5} ({faulty} failing)")
+    if args.schedule:
+        print(f"[INFO] Schedule written to {farm.write_schedule(args.schedule)}")
+
+    try:
+        started = time.monotonic()
+        while not args.duration or time.monotonic() - started < args.duration:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        farm.stop()
+        print("\n[INFO] Simulator farm stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import random
+import time
+
+class Faults:
+    """
+    Fault knobs for one simulated device.
+
+    latency:      seconds added before every command/HTTP response (+/- jitter)
+    banner_delay: seconds before the SSH identification string is sent
+    auth_fail:    reject every login (SSH password / HTTP basic auth)
+    timeout:      accept the TCP connection, then never answer (hang seconds)
+    offline:      scheduled but nothing listens (connection refused)
+    """
+    def __init__(self, latency=0.0, jitter=0.0, banner_delay=0.0, auth_fail=False, timeout=False, hang=120.0,
+                 offline=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.banner_delay = banner_delay
+        self.auth_fail = auth_fail
+        self.timeout = timeout
+        self.hang = hang
+        self.offline = offline
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+    def describe(self):
+        tags = []
+        if self.offline: return "offline"
+        if self.timeout: tags.append("timeout")
+        if self.auth_fail: tags.append("auth_fail")
+        if self.banner_delay: tags.append(f"banner {self.banner_delay}s")
+        if self.latency: tags.append(f"latency {self.latency * 1000:.0f}ms")
+        return ", ".join(tags) or "healthy"
+
+    def as_dict(self):
+        return {"latency": self.latency, "jitter": self.jitter, "banner_delay": self.banner_delay,
+                "auth_fail": self.auth_fail, "timeout": self.timeout, "hang": self.hang, "offline": self.offline}
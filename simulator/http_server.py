@@ -0,0 +1,75 @@
+import base64
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class GudeDevice:
+    """
+    One simulated Gude PDU: /status.json and /config.txt over HTTP.
+    Basic auth is enforced when credentials are set (the driver only sends
+    them when the schedule has both); faults apply per request.
+    """
+    def __init__(self, ip, platform, faults, username=None, password=None, port=80):
+        self.ip = ip
+        self.port = port
+        self.platform = platform
+        self.faults = faults
+        self.username = username
+        self.password = password
+        self.sessions = 0
+        self._server = None
+
+    def _authorized(self, header):
+        if self.faults.auth_fail:
+            return False
+        if not (self.username and self.password):
+            return True
+        expected = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+        return header == f"Basic {expected}"
+
+    def start(self):
+        device = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                device.sessions += 1
+                if device.faults.timeout:
+                    time.sleep(device.faults.hang)
+                    return
+                device.faults.delay()
+                if not device._authorized(self.headers.get("Authorization")):
+                    self.send_response(401)
+                    self.send_header("WWW-Authenticate", 'Basic realm="EPC"')
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                path = self.path.split("?")[0]
+                if path == "/status.json":
+                    body, kind = device.platform.status_json(), "application/json"
+                elif path == "/config.txt":
+                    body, kind = device.platform.config_txt(), "text/plain"
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.ip, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True, name=f"sim-http-{self.ip}").start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,400 @@
+"""
+Simulated CLI Platforms.
+
+Each platform answers the exact commands the Afara drivers send, in the
+format their parsers expect. Outputs are derived from the instance identity
+(hostname, serial, MAC) so every simulated device reports unique values.
+"""
+import json
+import random
+import time
+
+IOS_INVALID = "                ^\r\n% Invalid input detected at '^' marker.\r\n"
+SMB_INVALID = "% Unrecognized command\r\n"
+
+class Identity:
+    """Per-instance values (stable for a given seed)."""
+    def __init__(self, ip, index, seed=0):
+        rng = random.Random(f"{seed}-{ip}")
+        self.ip = ip
+        self.index = index
+        self.rng = rng
+        self.serial = "FOC" + "".join(rng.choice("0123456789ABCDEFGHJKLMNPRSTUVWXYZ") for _ in range(8))
+        octets = [0x00, 0x1A, 0x2B] + [rng.randint(0, 255) for _ in range(3)]
+        self.mac_octets = octets
+        self.booted = time.time() - rng.randint(3600, 400 * 86400)
+
+    def mac(self, style="colon"):
+        hexes = [f"{o:02x}" for o in self.mac_octets]
+        if style == "dotted":
+            flat = "".join(hexes)
+            return f"{flat[0:4]}.{flat[4:8]}.{flat[8:12]}"
+        if style == "dash":
+            return "-".join(hexes).upper()
+        return ":".join(hexes)
+
+    def uptime_parts(self):
+        seconds = int(time.time() - self.booted)
+        weeks, rem = divmod(seconds, 7 * 86400)
+        days, rem = divmod(rem, 86400)
+        hours, rem = divmod(rem, 3600)
+        return weeks, days, hours, rem // 60, rem % 60
+
+class Platform:
+    """Base CLI: prompt + command table. Unknown commands return the platform's error."""
+    prompt = "device>"
+    invalid = SMB_INVALID
+
+    def __init__(self, identity, crc_growth=0):
+        self.id = identity
+        self.crc_growth = crc_growth
+        self._crc = {}
+
+    def handle(self, command):
+        command = command.strip()
+        if not command:
+            return ""
+        handler = self.commands().get(command)
+        if handler is None:
+            return self.invalid
+        return handler()
+
+    def commands(self):
+        return {}
+
+# ==================================================
+# CISCO IOS (Catalyst)
+# ==================================================
+class CiscoIOS(Platform):
+    invalid = IOS_INVALID
+
+    def __init__(self, identity, crc_growth=0, ports=24):
+        super().__init__(identity, crc_growth)
+        self.hostname = f"SW-IOS-{identity.index:04d}"
+        self.prompt = f"{self.hostname}#"
+        self.ports = ports
+        # A few ports carry historic errors; 'crc_growth' makes port 2 degrade live
+        self._crc = {p: (identity.rng.randint(1, 50) if identity.rng.random() < 0.1 else 0) for p in range(1, ports + 1)}
+
+    def commands(self):
+        return {
+            "terminal length 0": lambda: "",
+            "terminal width 511": lambda: "",
+            "terminal datadump": lambda: self.invalid,
+            "show version": self.show_version,
+            "show system": lambda: self.invalid,
+            "show vlan brief": self.show_vlan,
+            "show interfaces": self.show_interfaces,
+            "show power inline": self.show_power,
+            "show running-config": self.show_run,
+            "show interface Vlan1": self.show_vlan1,
+            "enable": lambda: "",
+        }
+
+    def show_version(self):
+        w, d, h, m, _ = self.id.uptime_parts()
+        return (
+            "Cisco IOS Software, C2960X Software (C2960X-UNIVERSALK9-M), Version 15.2(7)E4, RELEASE SOFTWARE (fc2)\r\n"
+            "Technical Support: http://www.cisco.com/techsupport\r\n"
+            "Copyright (c) 1986-2021 by Cisco Systems, Inc.\r\n\r\n"
+            "ROM: Bootstrap program is C2960X boot loader\r\n\r\n"
+            f"{self.hostname} uptime is {w} weeks, {d} days, {h} hours, {m} minutes\r\n"
+            "System returned to ROM by power-on\r\n"
+            'System image file is "flash:c2960x-universalk9-mz.152-7.E4.bin"\r\n\r\n'
+            f"cisco WS-C2960X-{self.ports}PS-L (APM86XXX) processor (revision V01) with 524288K bytes of memory.\r\n"
+            f"Processor board ID {self.id.serial}\r\n"
+            f"Base ethernet MAC Address       : {self.id.mac().upper()}\r\n"
+            "Model number                    : WS-C2960X-24PS-L\r\n"
+            f"System serial number            : {self.id.serial}\r\n"
+        )
+
+    def show_vlan(self):
+        rows = ["VLAN Name                             Status    Ports",
+                "---- -------------------------------- --------- -------------------------------"]
+        for vid, name in ((1, "default"), (10, "DATA"), (20, "VOICE"), (30, "AV"), (99, "MGMT")):
+            rows.append(f"{vid:<4} {name:<32} active    Gi1/0/{vid % self.ports + 1}")
+        return "\r\n".join(rows) + "\r\n"
+
+    def show_interfaces(self):
+        if self.crc_growth:
+            self._crc[2] = self._crc.get(2, 0) + self.crc_growth
+        blocks = []
+        for p in range(1, self.ports + 1):
+            crc = self._crc.get(p, 0)
+            blocks.append(
+                f"GigabitEthernet1/0/{p} is up, line protocol is up (connected)\r\n"
+                f"  Hardware is Gigabit Ethernet, address is {self.id.mac('dotted')} (bia {self.id.mac('dotted')})\r\n"
+                "  MTU 1500 bytes, BW 1000000 Kbit/sec, DLY 10 usec,\r\n"
+                "     5 minute input rate 2000 bits/sec, 3 packets/sec\r\n"
+                f"     {crc + (crc // 2)} input errors, {crc} CRC, 0 frame, 0 overrun, 0 ignored\r\n"
+                "     0 output errors, 0 collisions, 1 interface resets\r\n"
+            )
+        return "".join(blocks)
+
+    def show_power(self):
+        used = round(15 + (self.id.index % 30) * 7.5, 1)
+        return (
+            "Module   Available     Used     Remaining\r\n"
+            "          (Watts)     (Watts)    (Watts)\r\n"
+            "------   ---------   --------   ---------\r\n"
+            f"1           370.0     {used:>6}      {370.0 - used:>6.1f}\r\n"
+        )
+
+    def show_vlan1(self):
+        return f"Vlan1 is up, line protocol is up\r\n  Hardware is EtherSVI, address is {self.id.mac('dotted')} (bia {self.id.mac('dotted')})\r\n"
+
+    def show_run(self):
+        return (
+            "Building configuration...\r\n\r\n"
+            "Current configuration : 2048 bytes\r\n!\r\n"
+            f"! Last configuration change at {time.strftime('%H:%M:%S UTC %a %b %d %Y')}\r\n!\r\n"
+            "version 15.2\r\n"
+            f"hostname {self.hostname}\r\n!\r\n"
+            "ip ssh version 2\r\n"
+            "interface Vlan1\r\n"
+            f" ip address {self.id.ip} 255.0.0.0\r\n!\r\n"
+            "line vty 0 15\r\n transport input ssh\r\n!\r\nend\r\n"
+        )
+
+# ==================================================
+# CISCO SMB (SG300/SG350)
+# ==================================================
+class CiscoSMB(CiscoIOS):
+    invalid = SMB_INVALID
+
+    def __init__(self, identity, crc_growth=0, ports=28):
+        super().__init__(identity, crc_growth, ports)
+        self.hostname = f"sg350-{identity.index:04d}"
+        self.prompt = f"{self.hostname}#"
+
+    def commands(self):
+        table = super().commands()
+        table.update({
+            "terminal length 0": lambda: self.invalid,
+            "terminal datadump": lambda: "",
+            "terminal no prompt": lambda: "",
+            "show system": self.show_system,
+            "show inventory": self.show_inventory,
+        })
+        return table
+
+    def show_version(self):
+        return (
+            "Active-image: flash://system/images/image_tesla_Sx250-350_Sx350X-550X_2.5.0.83.bin\r\n"
+            "  SW version    : 2.5.0.83 ( date  17-Aug-2019 time  11:01:30 )\r\n"
+            "  Boot version  : 1.3.5.06 ( date  21-Jul-2013 time  15:12:10 )\r\n"
+            "  HW version    : V01\r\n"
+        )
+
+    def show_system(self):
+        w, d, h, m, s = self.id.uptime_parts()
+        return (
+            "System Description:                       SG350-28P 28-Port Gigabit PoE Managed Switch\r\n"
+            f"System Up Time (days,hour:min:sec):       {w * 7 + d:02d},{h:02d}:{m:02d}:{s:02d}\r\n"
+            "System Contact:\r\n"
+            f"System Name:                              {self.hostname}\r\n"
+            f"System MAC Address:                       {self.id.mac()}\r\n"
+        )
+
+    def show_inventory(self):
+        return (
+            'NAME: "1"    DESCR: "SG350-28P 28-Port Gigabit PoE Managed Switch"\r\n'
+            f"PID: SG350-28P-K9       VID: V01      SN: {self.id.serial}\r\n"
+        )
+
+    def show_power(self):
+        used = round(10 + (self.id.index % 20) * 6.2, 1)
+        return (
+            "Power Source: Primary\r\n"
+            "Nominal Power: 195 Watts\r\n"
+            f"Used : {used}\r\nAvailable : 195.0\r\n"
+        )
+
+# ==================================================
+# CISCO IOS ROUTER (ISR)
+# ==================================================
+class CiscoRouter(CiscoIOS):
+    def __init__(self, identity, crc_growth=0):
+        super().__init__(identity, crc_growth, ports=3)
+        self.hostname = f"RTR-{identity.index:04d}"
+        self.prompt = f"{self.hostname}#"
+        self.wan_ip = f"81.{identity.index % 250}.{identity.mac_octets[4]}.{identity.mac_octets[5] or 1}"
+
+    def handle(self, command):
+        if command.strip().startswith("show ip arp"):
+            return self.show_arp()
+        return super().handle(command)
+
+    def commands(self):
+        table = super().commands()
+        table.update({
+            "show ip interface brief": self.show_ip_brief,
+            "show interfaces GigabitEthernet0/0 | include bia": self.show_bia,
+        })
+        return table
+
+    def show_version(self):
+        return super().show_version().replace("C2960X", "C1100")
+
+    def show_ip_brief(self):
+        return (
+            "Interface              IP-Address      OK? Method Status                Protocol\r\n"
+            f"GigabitEthernet0/0     {self.wan_ip:<15} YES NVRAM  up                    up\r\n"
+            f"GigabitEthernet0/1     {self.id.ip:<15} YES NVRAM  up                    up\r\n"
+            "GigabitEthernet0/2     unassigned      YES unset  administratively down down\r\n"
+        )
+
+    def show_arp(self):
+        return (
+            "Protocol  Address          Age (min)  Hardware Addr   Type   Interface\r\n"
+            f"Internet  {self.id.ip:<16} -          {self.id.mac('dotted')}  ARPA   GigabitEthernet0/1\r\n"
+        )
+
+    def show_bia(self):
+        return f"  Hardware is ISR4331-3x1GE, address is {self.id.mac('dotted')} (bia {self.id.mac('dotted')})\r\n"
+
+# ==================================================
+# CRESTRON (3-Series / 4-Series processors)
+# ==================================================
+class Crestron(Platform):
+    invalid = "Bad or Incomplete Command\r\n"
+
+    def __init__(self, identity, crc_growth=0):
+        super().__init__(identity, crc_growth)
+        self.hostname = f"CP4-{identity.index:04d}"
+        self.prompt = f"{self.hostname}>"
+
+    def commands(self):
+        return {
+            "ver": self.ver,
+            "uptime": self.uptime,
+            "ipconfig /all": self.ipconfig,
+            "reportcresnet": self.cresnet,
+            "autodiscover query table": self.autodiscover,
+            "errlog": self.errlog,
+        }
+
+    def ver(self):
+        return f"CP4 Cntrl Eng [v2.8001.00062 (Nov 11 2022), #{self.id.serial}] @E-{self.id.mac().replace(':', '')}\r\n"
+
+    def uptime(self):
+        w, d, h, m, s = self.id.uptime_parts()
+        return f"The system has been running for {w * 7 + d} days, {h} hours, {m} minutes, {s} seconds.\r\n"
+
+    def ipconfig(self):
+        return (
+            "Ethernet Adapter [LAN]:\r\n"
+            "   Link Status ............... : Connected\r\n"
+            "   DHCP ...................... : OFF\r\n"
+            f"   MAC Address ............... : {self.id.mac().replace(':', '.')}\r\n"
+            f"   IP Address ................ : {self.id.ip}\r\n"
+            "   Subnet Mask ............... : 255.0.0.0\r\n"
+        )
+
+    def cresnet(self):
+        return "02 : C2N-CBD-P\r\n03 : TSW-760\r\n"
+
+    def autodiscover(self):
+        base = self.id.index % 200
+        return (
+            "IP Address      : IP ID : Hostname    : Model\r\n"
+            f"10.20.{base}.100 :  C : NAX-{base:02d} : DM-NAX-8ZSA [v3.1.5 (Jan 10 2023), #AB12CD34] @E-c44268000001\r\n"
+            f"10.20.{base}.101 :  D : TSW-{base:02d} : TSW-1070 [v3.002.1061 (Mar 01 2023), #AB12CD35] @E-c44268000002\r\n"
+        )
+
+    def errlog(self):
+        return (
+            f"1. Notice: SYSTEM: Program started {time.strftime('%m-%d-%Y %H:%M:%S')}\r\n"
+            "2. Warning: Cresnet: Device ID 03 went offline\r\n"
+        )
+
+# ==================================================
+# DRAYTEK (Vigor 2862)
+# ==================================================
+class Draytek(Platform):
+    invalid = "% Unknown command\r\n"
+
+    def __init__(self, identity, crc_growth=0):
+        super().__init__(identity, crc_growth)
+        self.prompt = "DrayTek>"
+
+    def commands(self):
+        return {
+            "sys version": self.version,
+            "sys iface": self.iface,
+            "ip route status": self.routes,
+            "sys conf show": self.config,
+        }
+
+    def version(self):
+        return (
+            "Router Model: Vigor2862 Series\r\n"
+            "Firmware Version: 3.9.4.1_BT English\r\n"
+            "Build Date/Time: Mar 10 2021 11:20:15\r\n"
+            f"Router serial no: {self.id.serial[3:]}{self.id.index:04d}\r\n"
+        )
+
+    def iface(self):
+        return f"LAN MAC Address: {self.id.mac('dash')}\r\nWAN1 MAC Address: {self.id.mac('dash')}\r\n"
+
+    def routes(self):
+        wan = f"81.{self.id.index % 250}.{self.id.mac_octets[4]}.{self.id.mac_octets[5] or 1}"
+        return (
+            "Key: C - connected, S - static, R - RIP, * - default, ~ - private\r\n"
+            f"*      0.0.0.0/         0.0.0.0 via {wan}, WAN1\r\n"
+            f"C~     192.168.1.0/   255.255.255.0 directly connected LAN1\r\n"
+            f"C      {wan}/   255.255.255.252 directly connected WAN1\r\n"
+        )
+
+    def config(self):
+        return (
+            f"; Vigor2862 configuration\r\n; Date: {time.strftime('%Y-%m-%d %H:%M:%S')}\r\n"
+            "[SYSTEM]\r\nadmin_ssh=1\r\ntelnet=0\r\n[LAN]\r\nip=192.168.1.1\r\n"
+        )
+
+# ==================================================
+# GUDE PDU (HTTP JSON)
+# ==================================================
+class Gude:
+    """Not a CLI: renders status.json and config.txt for the HTTP simulator."""
+    def __init__(self, identity, outlets=8):
+        self.id = identity
+        self.outlets = outlets
+
+    def status_json(self):
+        rng = random.Random(time.time() // 5 + self.id.index)
+        volts = round(rng.uniform(228.0, 236.0), 1)
+        amps = round(0.5 + (self.id.index % 12) + rng.uniform(0, 0.5), 2)
+        return json.dumps({
+            "misc": {"firm_v": "1.2.4", "product_name": "Expert Power Control 8226"},
+            "ethernet": {"mac": self.id.mac()},
+            "sensor_values": [{"type": 9, "num": 1, "values": [[
+                {"v": volts}, {"v": amps}, {"v": 50.0}, {"v": 0.98}, {"v": round(volts * amps, 1)}
+            ]]}],
+            "outputs": [{"index": i, "name": f"Outlet {i}", "state": 0 if i == self.outlets else 1}
+                        for i in range(1, self.outlets + 1)],
+        })
+
+    def config_txt(self):
+        return (
+            f"# Gude EPC 8226 configuration\r\nhostname gude-{self.id.index:04d}\r\n"
+            f"ip {self.id.ip}\r\nhttp_auth 1\r\n"
+        )
+
+PLATFORMS = {
+    "cisco_ios": CiscoIOS,
+    "cisco_smb": CiscoSMB,
+    "cisco_router": CiscoRouter,
+    "crestron": Crestron,
+    "draytek": Draytek,
+}
+
+# Schedule driver string Afara should use for each simulated platform
+SCHEDULE_DRIVERS = {
+    "cisco_ios": "cisco_switch",
+    "cisco_smb": "cisco_switch",
+    "cisco_router": "cisco_router",
+    "crestron": "crestron",
+    "draytek": "draytek_router",
+    "gude": "gude_pdu",
+}
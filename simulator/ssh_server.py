@@ -0,0 +1,124 @@
+import logging
+import socket
+import threading
+import time
+
+import paramiko
+
+logger = logging.getLogger("Afara.Simulator")
+
+class _Server(paramiko.ServerInterface):
+    """Password auth + one interactive shell, nothing else."""
+    def __init__(self, device):
+        self.device = device
+        self.shell_ready = threading.Event()
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if self.device.faults.auth_fail:
+            return paramiko.AUTH_FAILED
+        if (username, password) == (self.device.username, self.device.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED_FAILED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_ready.set()
+        return True
+
+class SSHDevice:
+    """
+    One simulated SSH device (Cisco IOS/SMB/ISR, Crestron, DrayTek).
+
+    The shell echoes each line, applies the latency fault, answers from the
+    platform's command table and re-prints the prompt, so Netmiko's prompt
+    detection, command-echo verification and the pipelined CiscoSwitch batch
+    all work unmodified. Platform state (e.g. growing CRC counters) is kept
+    per device, not per session.
+    """
+    def __init__(self, ip, platform, faults, host_key, username="afara", password="afara", port=22):
+        self.ip = ip
+        self.port = port
+        self.platform = platform
+        self.faults = faults
+        self.host_key = host_key
+        self.username = username
+        self.password = password
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def handle(self, sock):
+        """Serves one accepted connection (runs on its own thread)."""
+        with self._lock: self.sessions += 1
+        transport = None
+        try:
+            if self.faults.timeout:
+                # Connection accepted, nothing ever sent: client hits its own timeout
+                time.sleep(self.faults.hang)
+                return
+            if self.faults.banner_delay:
+                time.sleep(self.faults.banner_delay)
+
+            transport = paramiko.Transport(sock)
+            transport.add_server_key(self.host_key)
+            server = _Server(self)
+            transport.start_server(server=server)
+
+            channel = transport.accept(30)
+            if channel is None or not server.shell_ready.wait(10):
+                return
+            self._shell(channel)
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            logger.debug(f"{self.ip}: session ended ({e})")
+        finally:
+            if transport: transport.close()
+            try: sock.close()
+            except OSError: pass
+
+    def _shell(self, channel):
+        platform = self.platform
+        channel.send(f"\r\n{platform.prompt}")
+        line, last_cr = "", False
+        while True:
+            data = channel.recv(4096)
+            if not data: return
+            for ch in data.decode("utf-8", "ignore"):
+                if ch in "\r\n":
+                    # '\r\n' counts as one Enter
+                    if ch == "\n" and last_cr:
+                        last_cr = False
+                        continue
+                    last_cr = ch == "\r"
+                    command, line = line, ""
+                    if command.strip() in ("exit", "quit", "logout"):
+                        channel.send(f"{command}\r\n")
+                        channel.close()
+                        return
+                    channel.send(f"{command}\r\n")
+                    if command.strip():
+                        self.faults.delay()
+                    with self._lock:
+                        output = platform.handle(command)
+                    if output and not output.endswith("\n"):
+                        output += "\r\n"
+                    channel.send(f"{output}{platform.prompt}")
+                else:
+                    last_cr = False
+                    line += ch
+
+def listen(ip, port, backlog=64):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((ip, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
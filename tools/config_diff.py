@@ -0,0 +1,47 @@
+import os
+import sys
+import argparse
+
+# Base directory configuration (allow 'python tools/config_diff.py' from anywhere)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from drivers.backup_store import BackupStore
+
+def list_versions(store, device_id):
+    """Prints the version history of one device."""
+    history = store.versions(device_id)
+    if not history:
+        print(f"[INFO] No backups recorded for '{device_id}'.")
+        return
+    for entry in history:
+        print(f"   v{entry['version']:<4} {entry['timestamp']}  {entry['hash'][:12]}  {entry['size']} bytes")
+
+def main():
+    """
+    Shows the version history or a unified diff for one device's config backups.
+    Device IDs match the index files, e.g. switch_10_20_30_1 or gude_10.20.30.80.
+    """
+    parser = argparse.ArgumentParser(description="Afara configuration backup history")
+    parser.add_argument("device_id")
+    parser.add_argument("--old", type=int, default=-2, help="Old version (1-based, or negative from latest)")
+    parser.add_argument("--new", type=int, default=-1, help="New version (1-based, or negative from latest)")
+    parser.add_argument("--list", action="store_true", help="List versions instead of diffing")
+    parser.add_argument("--root", default=os.getenv("AFARA_BACKUP_DIR", os.path.join(BASE_DIR, "backups")),
+                        help="Backup store (default: AFARA_BACKUP_DIR, e.g. backups/<project> in batch mode)")
+    args = parser.parse_args()
+
+    store = BackupStore(args.root)
+    if args.list:
+        list_versions(store, args.device_id)
+        return
+
+    if len(store.versions(args.device_id)) < 2:
+        print(f"[INFO] '{args.device_id}' has fewer than two versions; nothing to diff.")
+        return
+
+    diff = store.diff(args.device_id, args.old, args.new)
+    print(diff if diff else "[INFO] No configuration changes between those versions.")
+
+if __name__ == "__main__":
+    main()